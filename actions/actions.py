@@ -7,11 +7,15 @@ from rasa_sdk.events import SlotSet
 from rasa_sdk.executor import CollectingDispatcher
 import nl2ltl_client
 import declare_client
+from registry import registry
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
+# Parse the event log and the process specification while the action server starts, instead of on the first message
+registry.start_warm_up()
+
 
 def repeated_activity(tracker, action_name):
     # Get the list of executed actions from the tracker
@@ -190,8 +194,8 @@ class ActionConformanceCheck(Action):
         traces = conformance_check()
 
         # Create and dispatch the message to the user
-        variants = list({str(t) for t in traces})
-        examples = "\n\n".join(t.translate(str.maketrans("", "", "[]'")) for t in random.sample(variants, k=4))
+        examples = declare_client.trace_examples(traces, k=4, replace=False)
+        examples = "\n\n".join(str(t).translate(str.maketrans("", "", "[]'")) for t in examples)
         message = f"In total, there are {len(traces)} conformant traces. Here are some examples: \n\n{examples}"
         dispatcher.utter_message(text=message)
 
@@ -218,8 +222,8 @@ class ActionNonConformantCheck(Action):
         traces = conformance_check(opposite=True)
 
         # Create and dispatch the message to the user
-        variants = list({str(t) for t in traces})
-        examples = "\n\n".join(t.translate(str.maketrans("", "", "[]'")) for t in random.sample(variants, k=4))
+        examples = declare_client.trace_examples(traces, k=4, replace=False)
+        examples = "\n\n".join(str(t).translate(str.maketrans("", "", "[]'")) for t in examples)
         message = f"In total, there are {len(traces)} NON-conformant traces. Here are some examples: \n\n{examples}"
         dispatcher.utter_message(text=message)
 
@@ -265,9 +269,9 @@ class ActionBehaviorSearch(Action):
             x = connector.replace(" ", "").lower()
             message = message.replace(x, connector)
 
-        # Convert traces to text
-        variants = list({str(t) for t in traces})
-        text = "\n\n".join(t.translate(str.maketrans("", "", "[]'")) for t in random.choices(variants, k=4))
+        # Convert 4 random examples among the variants of the traces to text
+        examples = declare_client.trace_examples(traces, k=4)
+        text = "\n\n".join(str(t).translate(str.maketrans("", "", "[]'")) for t in examples)
 
         # Return the message
         dispatcher.utter_message(text=message + text)
@@ -319,9 +323,9 @@ class ActionImplicitBehaviorSearch(Action):
             x = connector.replace(" ", "").lower()
             message = message.replace(x, connector)
 
-        # Convert traces to text
-        variants = list({str(t) for t in traces})
-        text = "\n\n".join(t.translate(str.maketrans("", "", "[]'")) for t in random.choices(variants, k=4))
+        # Convert 4 random examples among the variants of the traces to text
+        examples = declare_client.trace_examples(traces, k=4)
+        text = "\n\n".join(str(t).translate(str.maketrans("", "", "[]'")) for t in examples)
 
         # Return the message
         dispatcher.utter_message(text=message + text)
@@ -1,8 +1,6 @@
 import textwrap
 
-import numpy as np
-import pm4py
-
+from registry import registry
 from src.Declare4Py.D4PyEventLog import D4PyEventLog
 from src.Declare4Py.ProcessMiningTasks.ConformanceChecking.MPDeclareResultsBrowser import MPDeclareResultsBrowser
 from src.Declare4Py.ProcessModels.LTLModel import LTLTemplate, LTLModel
@@ -83,8 +81,7 @@ def dec_to_basic_nl(specification=""):
 
 def model_discovery():
     # log_path = os.path.join("../../../", "tests", "test_logs", "Sepsis Cases.xes.gz")
-    event_log = D4PyEventLog(case_name="case:concept:name")
-    event_log.parse_xes_log('../assets/Sepsis Cases.xes.gz')
+    event_log = registry.get_event_log()
 
     discovery = DeclareMiner(log=event_log, consider_vacuity=False, min_support=1, itemsets_support=1,
                              max_declare_cardinality=2)
@@ -94,40 +91,24 @@ def model_discovery():
 
 
 def conformance_check(threshold=0.8, opposite=False):
-    # Retrieve and parse log
-    event_log = D4PyEventLog(case_name="case:concept:name")
-    event_log.parse_xes_log('../assets/Sepsis Cases.xes.gz')
-
-    # Retrieve the process specification
-    declare_model = DeclareModel().parse_from_file('../assets/model.decl')
+    # Retrieve the (cached) log and process specification
+    event_log = registry.get_event_log()
+    declare_model = registry.get_declare_model()
 
     # Perform conformance checking
     basic_checker = MPDeclareAnalyzer(log=event_log, declare_model=declare_model, consider_vacuity=True)
     conf_check_res: MPDeclareResultsBrowser = basic_checker.run()
 
-    traces = []
-
-    # Filter traces with a conformance value above the threshold
-    for idx in range(event_log.get_length()):
-        conf = conf_check_res.get_metric(trace_id=idx, metric="state")
-        perc = np.sum(conf) / len(conf)
-        if not opposite:
-            if perc > threshold:
-                traces.append(event_log.attribute_log_projection(event_log.get_concept_name())[idx])
-        else:
-            if perc < threshold:
-                traces.append(event_log.attribute_log_projection(event_log.get_concept_name())[idx])
-
-    return traces
+    # Indices of the traces with a conformance value above the threshold
+    return conf_check_res.filter_traces(threshold, opposite)
 
 
 def conformance_check_ltl(formula, connectors):
     """ Performs conformance checking with behavior input by the user.
     Input gets converted to LTL and a conformance checker is run over the event log"""
 
-    # Retrieve and parse log
-    event_log = D4PyEventLog()
-    event_log.parse_xes_log('../assets/Sepsis Cases.xes.gz')
+    # Retrieve the (cached) log
+    event_log = registry.get_event_log()
 
     # Detect and translate the type of template
     template, *nl2ltl_activities = formula.strip('()').split()
@@ -139,7 +120,7 @@ def conformance_check_ltl(formula, connectors):
     # Add phase of mapping to the closest activity name possible
 
     # Check that the activities detected by RASA are in the process
-    declare_model = DeclareModel().parse_from_file('../assets/model.decl')
+    declare_model = registry.get_declare_model()
     model_activities = declare_model.get_model_activities()
 
     # Normalize names in lists
@@ -162,26 +143,22 @@ def conformance_check_ltl(formula, connectors):
 
         # Perform conformance checking
         analyzer = LTLAnalyzer(event_log, model)
-        df = analyzer.run()
-
-        # Recover accepted cases from the log and filter those containing all activities in the constraint
-        if accepted_cases := df.loc[df['accepted'], 'case:concept:name'].tolist():
-            traces = pm4py.filter_trace_attribute_values(event_log.get_log(), 'concept:name', accepted_cases,
-                                                         case_id_key='concept:name')
-            for a in connectors:
-                traces = pm4py.filter_event_attribute_values(traces, 'concept:name', {a}, case_id_key='concept:name')
-            return pm4py.project_on_event_attribute(traces, 'concept:name')
-        else:
-            return []
+        df = analyzer.run(variants=True)
+
+        # Indices of the accepted cases containing all activities in the constraint, found on the activity index
+        return event_log.select_traces(connectors, df['accepted'].to_numpy()).tolist()
     else:
         return None
 
 
-def behavior_check_ltl(specification=None, formula=None, connectors=[]):
+def trace_examples(trace_ids, k=4, replace=True):
+    """ Draws k examples among the distinct variants of the given traces, read from the variant table of the log.
+    Without replacement the examples are distinct and at most as many as the variants """
+    variant_table = registry.get_event_log().get_variant_table()
+    return [list(variant) for variant in variant_table.sample(k, trace_ids, replace)]
+
 
-    # Load event log
-    event_log = D4PyEventLog()
-    event_log.parse_xes_log('../assets/Sepsis Cases.xes.gz')
+def behavior_check_ltl(specification=None, formula=None, connectors=[]):
 
     # Detect and translate the type of template
     template, *nl2ltl_activities = formula.strip('()').split()
@@ -191,7 +168,7 @@ def behavior_check_ltl(specification=None, formula=None, connectors=[]):
     print("Activities detected by NL2LTL:", nl2ltl_activities)
 
     # Check that the activities detected by RASA are in the process
-    declare_model = DeclareModel().parse_from_file('../assets/model.decl')
+    declare_model = registry.get_declare_model()
     model_activities = declare_model.get_model_activities()
 
     # Normalize names in lists
@@ -234,13 +211,7 @@ def consistency_check(specification=None):
 
 
 def list_activities():
-    from src.Declare4Py.D4PyEventLog import D4PyEventLog
-    from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel
-
-    event_log = D4PyEventLog(case_name="case:concept:name")
-    event_log.parse_xes_log('../assets/Sepsis Cases.xes.gz')
-
-    declare_model = DeclareModel().parse_from_file('../assets/model.decl')
+    declare_model = registry.get_declare_model()
 
     return declare_model.get_model_activities()
 
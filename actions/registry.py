@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel
+
+LOG_PATH = '../assets/Sepsis Cases.xes.gz'
+MODEL_PATH = '../assets/model.decl'
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceRegistry:
+    """ Process-wide cache of the event logs and Declare models used by the action server.
+
+    Entries are keyed by absolute file path and validated against the file mtime and size. When those change, the
+    content hash decides whether the file really has to be parsed again. """
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._error = None
+
+    def get_event_log(self, path: str = LOG_PATH) -> D4PyEventLog:
+        return self._get('log', path, self._load_event_log)
+
+    def get_declare_model(self, path: str = MODEL_PATH) -> DeclareModel:
+        return self._get('model', path, self._load_declare_model)
+
+    def warm_up(self, log_path: str = LOG_PATH, model_path: str = MODEL_PATH) -> None:
+        """ Parses the log and the model so that they are ready before the first user message """
+        start = time.time()
+        try:
+            self.get_event_log(log_path)
+            self.get_declare_model(model_path)
+        except Exception as e:
+            self._error = e
+            logger.exception("Warm up of the action server resources failed")
+            raise
+        self._error = None
+        self._ready.set()
+        logger.info(f"Action server resources ready in {time.time() - start:.2f}s")
+
+    def start_warm_up(self, log_path: str = LOG_PATH, model_path: str = MODEL_PATH) -> threading.Thread:
+        """ Runs the warm up in a background thread, so the action server can start accepting connections """
+        thread = threading.Thread(target=self.warm_up, args=(log_path, model_path), name="registry-warm-up",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        with self._lock:
+            entries = [{"kind": kind, "path": path, "mtime_ns": entry["stamp"][0], "size": entry["stamp"][1],
+                        "sha256": entry["digest"]} for (kind, path), entry in self._entries.items()]
+        return {"ready": self.is_ready(), "error": repr(self._error) if self._error else None, "entries": entries}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._ready.clear()
+
+    def _get(self, kind: str, path: str, loader):
+        path = os.path.abspath(path)
+        key = (kind, path)
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        # A lock per entry, so a slow log parse does not block the access to an already loaded model
+        with key_lock:
+            stamp = self._stamp(path)
+            entry = self._entries.get(key)
+            if entry is not None and entry["stamp"] == stamp:
+                return entry["value"]
+
+            digest = self._digest(path)
+            if entry is not None and entry["digest"] == digest:
+                entry["stamp"] = stamp
+                return entry["value"]
+
+            value = loader(path)
+            with self._lock:
+                self._entries[key] = {"stamp": stamp, "digest": digest, "value": value}
+            return value
+
+    @staticmethod
+    def _stamp(path: str):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _digest(path: str) -> str:
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    @staticmethod
+    def _load_event_log(path: str) -> D4PyEventLog:
+        # The log is mapped from its snapshot, shared with the other processes that load it and the analyzer workers
+        event_log = D4PyEventLog(case_name="case:concept:name")
+        event_log.parse_xes_log(path, snapshot=True, mmap=True)
+        return event_log
+
+    @staticmethod
+    def _load_declare_model(path: str) -> DeclareModel:
+        return DeclareModel().parse_from_file(path)
+
+
+registry = ResourceRegistry()
@@ -0,0 +1,480 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pm4py.objects.log.obj import Event, EventLog, Trace
+
+from src.Declare4Py.Utils.VersionedDirectory import VersionedDirectory
+
+"""
+Array-backed representation of an event log
+"""
+
+# Loads the given event attributes, in the order of the events of the compact log
+ColumnLoader = Callable[[Sequence[str]], Dict[str, np.ndarray]]
+# Arrays saved in the snapshots of a log, and the version of their layout
+SNAPSHOT_ARRAYS = ("codes", "offsets", "timestamps")
+SNAPSHOT_VERSION = 2
+
+
+class CompactEventLog:
+    """
+    Event log stored as flat arrays instead of pm4py Event objects. The events of a trace are contiguous, so the events
+    of trace i are the positions offsets[i]:offsets[i + 1] of the event arrays (CSR layout). The other event
+    attributes are loaded as columns only when requested, through the column loader.
+
+    Args:
+        activities: the names of the activities, the code of an activity is its position in the list.
+        codes: int32 array with the activity code of each event.
+        offsets: int64 array with the first event of each trace, plus the total number of events.
+        timestamps: int64 array with the nanoseconds since the epoch (UTC) of each event, MISSING_TIMESTAMP if absent.
+        case_ids: the interned case id of each trace.
+        activity_key: the attribute with the activity of the events.
+        timestamp_key: the attribute with the timestamp of the events.
+        case_id_key: the attribute with the case id, as named in the DataFrame format of the log.
+        attribute_names: the names of the event attributes that can be loaded with get_column.
+        column_loader: the function loading the event attributes, None if the log has no other attribute.
+        columns: the columns already loaded, by attribute.
+    """
+
+    MISSING_TIMESTAMP = np.iinfo(np.int64).min
+
+    def __init__(self, activities: List[str], codes: np.ndarray, offsets: np.ndarray, timestamps: np.ndarray,
+                 case_ids: List[str], activity_key: str = "concept:name", timestamp_key: str = "time:timestamp",
+                 case_id_key: str = "case:concept:name", attribute_names: Sequence[str] = (),
+                 column_loader: Optional[ColumnLoader] = None, columns: Optional[Dict[str, np.ndarray]] = None):
+        self.activities: List[str] = activities
+        self.codes: np.ndarray = codes
+        self.offsets: np.ndarray = offsets
+        self.timestamps: np.ndarray = timestamps
+        self.case_ids: List[str] = case_ids
+        self.activity_key: str = activity_key
+        self.timestamp_key: str = timestamp_key
+        self.case_id_key: str = case_id_key
+        self.attribute_names: List[str] = [name for name in attribute_names
+                                           if name not in (activity_key, timestamp_key, case_id_key)]
+        self.column_loader: Optional[ColumnLoader] = column_loader
+        self._columns: Dict[str, np.ndarray] = dict(columns) if columns is not None else {}
+        self._variants: Optional[Tuple[List[np.ndarray], np.ndarray]] = None
+        self._activity_index: Optional[Dict[str, np.ndarray]] = None
+        # The version of the snapshot directory the arrays are mapped from and its id in meta.json, see load
+        self.snapshot_path: Optional[str] = None
+        self.snapshot_id: Optional[str] = None
+
+    @staticmethod
+    def from_event_log(log: EventLog, activity_key: str = "concept:name", timestamp_key: str = "time:timestamp",
+                       case_id_key: str = "case:concept:name") -> CompactEventLog:
+        """
+        Builds the compact log of a pm4py EventLog. The columns of the other attributes are read from the traces of the
+        EventLog when requested, so they are kept alive by the compact log.
+        """
+        vocabulary: Dict[str, int] = {}
+        codes = []
+        timestamps = []
+        offsets = np.zeros(len(log) + 1, dtype=np.int64)
+        attribute_names = {}
+        trace_key = CompactEventLog.get_trace_key(case_id_key)
+        for idx, trace in enumerate(log):
+            for event in trace:
+                codes.append(vocabulary.setdefault(event[activity_key], len(vocabulary)))
+                timestamps.append(CompactEventLog.to_nanoseconds(event.get(timestamp_key)))
+                attribute_names.update(dict.fromkeys(event.keys()))
+            offsets[idx + 1] = len(codes)
+        case_ids = [sys.intern(str(trace.attributes.get(trace_key))) for trace in log]
+        # Only the traces read now, the log can grow afterwards (see D4PyEventLog.append_traces)
+        traces = list(log)
+
+        def load_columns(attributes: Sequence[str]) -> Dict[str, np.ndarray]:
+            return {attribute: np.array([event.get(attribute, np.nan) for trace in traces for event in trace],
+                                        dtype=object)
+                    for attribute in attributes}
+
+        return CompactEventLog(list(vocabulary), np.array(codes, dtype=np.int32), offsets,
+                               np.array(timestamps, dtype=np.int64), case_ids, activity_key, timestamp_key,
+                               case_id_key, list(attribute_names), load_columns)
+
+    @staticmethod
+    def from_dataframe(log_df: pd.DataFrame, activity_key: str = "concept:name", timestamp_key: str = "time:timestamp",
+                       case_id_key: str = "case:concept:name",
+                       column_loader: Optional[ColumnLoader] = None) -> CompactEventLog:
+        """
+        Builds the compact log of a log in the DataFrame format. The traces are ordered by the first appearance of
+        their case id and keep the order of their events, as in pm4py.convert_to_event_log.
+
+        Args:
+            log_df: the log.
+            activity_key: the column with the activities.
+            timestamp_key: the column with the timestamps.
+            case_id_key: the column with the case ids.
+            column_loader: loads the other columns when requested. If None, the columns are taken from log_df, which
+                is then kept alive by the compact log.
+        """
+        case_codes, case_ids = pd.factorize(log_df[case_id_key], sort=False)
+        order = np.argsort(case_codes, kind='stable')
+        codes, activities = pd.factorize(log_df[activity_key].to_numpy()[order], sort=False)
+        offsets = np.zeros(len(case_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(case_codes, minlength=len(case_ids)), out=offsets[1:])
+        if timestamp_key in log_df.columns:
+            timestamps = CompactEventLog.to_nanoseconds_array(log_df[timestamp_key])[order]
+        else:
+            timestamps = np.full(len(order), CompactEventLog.MISSING_TIMESTAMP, dtype=np.int64)
+
+        if column_loader is None:
+            def column_loader(attributes: Sequence[str]) -> Dict[str, np.ndarray]:
+                return {attribute: log_df[attribute].to_numpy()[order] for attribute in attributes}
+        elif not np.array_equal(order, np.arange(len(order))):
+            # The loaded columns follow the rows of the DataFrame, they are reordered as the events
+            def column_loader(attributes: Sequence[str], load=column_loader) -> Dict[str, np.ndarray]:
+                return {attribute: column[order] for attribute, column in load(attributes).items()}
+
+        return CompactEventLog([str(activity) for activity in activities], codes.astype(np.int32), offsets,
+                               timestamps, [sys.intern(str(case_id)) for case_id in case_ids], activity_key,
+                               timestamp_key, case_id_key, list(log_df.columns), column_loader)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_events(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size in bytes of the event arrays and of the loaded columns.
+        """
+        return self.codes.nbytes + self.offsets.nbytes + self.timestamps.nbytes + sum(
+            column.nbytes for column in self._columns.values())
+
+    def get_trace_codes(self, trace_id: int) -> np.ndarray:
+        return self.codes[self.offsets[trace_id]:self.offsets[trace_id + 1]]
+
+    def get_trace_activities(self, trace_id: int) -> List[str]:
+        return [self.activities[code] for code in self.get_trace_codes(trace_id).tolist()]
+
+    def get_trace_lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def get_activity_counts(self, count_once_per_case: bool = False) -> Dict[str, int]:
+        """
+        Counts the occurrences of each activity, in order of first appearance. If count_once_per_case is True, counts
+        the traces containing each activity.
+        """
+        codes = self.codes.astype(np.int64)
+        if count_once_per_case:
+            trace_of = np.repeat(np.arange(len(self)), self.get_trace_lengths())
+            codes = np.unique(trace_of * len(self.activities) + codes) % len(self.activities)
+        counts = np.bincount(codes, minlength=len(self.activities))
+        return {activity: int(count) for activity, count in zip(self.activities, counts.tolist()) if count > 0}
+
+    def get_column(self, attribute: str) -> np.ndarray:
+        """
+        Returns the values of an event attribute for all the events, loading them at the first request.
+        """
+        return self.get_columns([attribute])[attribute]
+
+    def get_columns(self, attributes: Sequence[str]) -> Dict[str, np.ndarray]:
+        missing = [attribute for attribute in attributes if attribute not in self._columns]
+        if missing:
+            if self.column_loader is None:
+                raise RuntimeError(f"The attributes {missing} cannot be loaded from this log.")
+            self._columns.update(self.column_loader(missing))
+        return {attribute: self._columns[attribute] for attribute in attributes}
+
+    def get_variants(self) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Groups the traces with the same sequence of activities.
+
+        Returns:
+            the activity codes of each variant, in order of first appearance, and the variant of each trace.
+        """
+        if self._variants is None:
+            self._variants = self.group_variants(0, len(self))
+        return self._variants
+
+    def group_variants(self, start: int, end: int) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Groups the traces from start to end (excluded) as get_variants.
+        """
+        variants: Dict[bytes, int] = {}
+        variant_codes = []
+        variant_of = np.empty(end - start, dtype=np.int64)
+        for idx, trace_id in enumerate(range(start, end)):
+            trace_codes = self.get_trace_codes(trace_id)
+            variant = variants.setdefault(trace_codes.tobytes(), len(variants))
+            if variant == len(variant_codes):
+                variant_codes.append(trace_codes)
+            variant_of[idx] = variant
+        return variant_codes, variant_of
+
+    def get_activity_positions(self, start: int = 0, end: Optional[int] = None) -> List[Dict[str, np.ndarray]]:
+        """
+        Returns for each trace a dictionary from its activities to the sorted array of their positions in the trace,
+        shared by the traces of the same variant.
+
+        Args:
+            start: the first trace.
+            end: the trace after the last one, None for the end of the log.
+        """
+        if start == 0 and end is None:
+            variant_codes, variant_of = self.get_variants()
+        else:
+            variant_codes, variant_of = self.group_variants(start, len(self) if end is None else end)
+        variant_positions = []
+        for trace_codes in variant_codes:
+            order = np.argsort(trace_codes, kind='stable')
+            sorted_codes = trace_codes[order]
+            starts = np.flatnonzero(np.diff(sorted_codes, prepend=-1))
+            variant_positions.append({self.activities[code]: positions for code, positions in
+                                      zip(sorted_codes[starts].tolist(), np.split(order, starts[1:]))})
+        return [variant_positions[variant] for variant in variant_of.tolist()]
+
+    def get_activity_index(self) -> Dict[str, np.ndarray]:
+        """
+        Returns the inverted index of the log: for each activity, the bitmap of the traces containing it, packed with
+        numpy.packbits so that the bit of trace i is the bit i of the bitmap.
+        """
+        if self._activity_index is None:
+            num_traces = len(self)
+            trace_of = np.repeat(np.arange(num_traces, dtype=np.int64), self.get_trace_lengths())
+            # The sorted (activity, trace) pairs, each activity is a contiguous range of sorted traces
+            pairs = np.unique(self.codes.astype(np.int64) * num_traces + trace_of)
+            codes, traces = np.divmod(pairs, max(num_traces, 1))
+            starts = np.searchsorted(codes, np.arange(len(self.activities) + 1))
+            self._activity_index = {}
+            for code, activity in enumerate(self.activities):
+                bits = np.zeros(num_traces, dtype=bool)
+                bits[traces[starts[code]:starts[code + 1]]] = True
+                self._activity_index[activity] = np.packbits(bits)
+        return self._activity_index
+
+    def select_traces(self, activities: Sequence[str], mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the sorted indices of the traces containing all the given activities, by intersecting their bitmaps in
+        the activity index.
+
+        Args:
+            activities: the activities that the traces must contain.
+            mask: if given, a boolean array selecting the traces among which to search.
+        """
+        index = self.get_activity_index()
+        bitmap = np.packbits(np.ones(len(self), dtype=bool) if mask is None else np.asarray(mask, dtype=bool))
+        for activity in activities:
+            if activity not in index:
+                return np.zeros(0, dtype=np.int64)
+            bitmap &= index[activity]
+        return np.flatnonzero(np.unpackbits(bitmap, count=len(self)))
+
+    def get_timestamps(self) -> pd.DatetimeIndex:
+        return pd.to_datetime(np.where(self.timestamps == self.MISSING_TIMESTAMP, np.datetime64('NaT'),
+                                       self.timestamps.view('datetime64[ns]')), utc=True)
+
+    def to_dataframe(self, attributes: Sequence[str] = None) -> pd.DataFrame:
+        """
+        Returns the log in the DataFrame format with the case id, the activity and the timestamp of the events plus the
+        given attributes, all the attributes if None.
+        """
+        if attributes is None:
+            attributes = self.attribute_names if self.column_loader is not None else []
+        lengths = self.get_trace_lengths()
+        log_df = pd.DataFrame({self.case_id_key: np.repeat(np.array(self.case_ids, dtype=object), lengths),
+                               self.activity_key: np.array(self.activities, dtype=object)[self.codes],
+                               self.timestamp_key: self.get_timestamps()})
+        for attribute, column in self.get_columns(attributes).items():
+            log_df[attribute] = column
+        return log_df
+
+    def to_event_log(self) -> EventLog:
+        """
+        Materializes the log as a pm4py EventLog with all the attributes. As in pm4py, the attributes prefixed by case:
+        become attributes of the traces, taken from their first event.
+        """
+        columns = self.get_columns(self.attribute_names) if self.column_loader is not None else {}
+        columns = {attribute: column.tolist() for attribute, column in columns.items()}
+        trace_columns = {self.get_trace_key(attribute): columns.pop(attribute) for attribute in list(columns)
+                         if attribute.startswith("case:")}
+        activities = np.array(self.activities, dtype=object)[self.codes].tolist()
+        timestamps = [None if timestamp is pd.NaT else timestamp for timestamp in self.get_timestamps()]
+        trace_key = self.get_trace_key(self.case_id_key)
+        log = EventLog(properties={'pm4py:param:activity_key': self.activity_key,
+                                   'pm4py:param:timestamp_key': self.timestamp_key})
+        offsets = self.offsets.tolist()
+        for trace_id, case_id in enumerate(self.case_ids):
+            events = []
+            for idx in range(offsets[trace_id], offsets[trace_id + 1]):
+                event = {attribute: column[idx] for attribute, column in columns.items()}
+                event[self.activity_key] = activities[idx]
+                if timestamps[idx] is not None:
+                    event[self.timestamp_key] = timestamps[idx]
+                events.append(Event(event))
+            attributes = {attribute: column[offsets[trace_id]] for attribute, column in trace_columns.items()
+                          if offsets[trace_id] < offsets[trace_id + 1]}
+            attributes[trace_key] = case_id
+            log.append(Trace(events, attributes=attributes))
+        return log
+
+    def extend(self, other: CompactEventLog) -> None:
+        """
+        Appends the traces of another compact log with the same keys. The activity codes of the other log are mapped to
+        the codes of this one, the grouped variants are extended and the activity index is rebuilt at the next call.
+        The arrays are copied, so a log mapped from a snapshot is no longer mapped.
+        """
+        num_traces, num_events = len(self), self.num_events
+        vocabulary = {activity: code for code, activity in enumerate(self.activities)}
+        mapping = np.array([vocabulary.setdefault(activity, len(vocabulary)) for activity in other.activities],
+                           dtype=np.int32)
+        self.activities = list(vocabulary)
+        self.codes = np.concatenate([self.codes, mapping[other.codes] if len(mapping) else other.codes])
+        self.offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]])
+        self.timestamps = np.concatenate([self.timestamps, other.timestamps])
+        self.case_ids = self.case_ids + other.case_ids
+
+        # The columns are loaded from both logs, NaN for the events of the log without the attribute
+        sources = [(self.column_loader, set(self.attribute_names), num_events),
+                   (other.column_loader, set(other.attribute_names), other.num_events)]
+
+        def column_loader(attributes: Sequence[str]) -> Dict[str, np.ndarray]:
+            parts = []
+            for loader, names, size in sources:
+                available = [attribute for attribute in attributes if attribute in names]
+                loaded = loader(available) if loader is not None and available else {}
+                parts.append({attribute: loaded.get(attribute, np.full(size, np.nan, dtype=object))
+                              for attribute in attributes})
+            return {attribute: np.concatenate([part[attribute] for part in parts]) for attribute in attributes}
+
+        self.attribute_names += [name for name in other.attribute_names if name not in self.attribute_names
+                                 and name not in (self.activity_key, self.timestamp_key, self.case_id_key)]
+        self.column_loader = column_loader
+        self._columns = {}
+        if self._variants is not None:
+            variant_codes, variant_of = self._variants
+            variants = {codes.tobytes(): variant for variant, codes in enumerate(variant_codes)}
+            appended = np.empty(len(other), dtype=np.int64)
+            for idx in range(len(other)):
+                trace_codes = self.get_trace_codes(num_traces + idx)
+                appended[idx] = variant = variants.setdefault(trace_codes.tobytes(), len(variants))
+                if variant == len(variant_codes):
+                    variant_codes.append(trace_codes)
+            self._variants = (variant_codes, np.concatenate([variant_of, appended]))
+        self._activity_index = None
+        self.snapshot_path = None
+        self.snapshot_id = None
+
+    def save(self, directory: str, metadata: Optional[dict] = None) -> str:
+        """
+        Saves the arrays of the log as .npy files, with the activities, the case ids and the keys in JSON files, as a
+        new version of the snapshot directory (see VersionedDirectory). The version is complete before it becomes the
+        current one, and the version a reader resolved is never modified, so a snapshot is never seen half written nor
+        mixed with another one. The loaded columns are not saved.
+
+        Args:
+            directory: the directory of the snapshot, whose previous versions are replaced.
+            metadata: other information saved in meta.json, e.g. the signature of the source file.
+
+        Returns:
+            the directory of the saved version.
+        """
+        version_path = VersionedDirectory.create_version(directory)
+        try:
+            for name in SNAPSHOT_ARRAYS:
+                np.save(os.path.join(version_path, f"{name}.npy"), getattr(self, name))
+            with open(os.path.join(version_path, "strings.json"), "w") as strings_file:
+                json.dump({"activities": self.activities, "case_ids": self.case_ids}, strings_file)
+            meta = {"version": SNAPSHOT_VERSION, "snapshot_id": os.path.basename(version_path),
+                    "activity_key": self.activity_key, "timestamp_key": self.timestamp_key,
+                    "case_id_key": self.case_id_key, "attribute_names": self.attribute_names}
+            meta.update(metadata or {})
+            with open(os.path.join(version_path, "meta.json"), "w") as meta_file:
+                json.dump(meta, meta_file)
+        except BaseException:
+            VersionedDirectory.discard(version_path)
+            raise
+        VersionedDirectory.publish(version_path)
+        return version_path
+
+    @staticmethod
+    def get_version_path(directory: str) -> str:
+        """
+        Returns the current version of a snapshot directory, the directory itself if it is already a version.
+        """
+        return VersionedDirectory.resolve(directory) or directory
+
+    @staticmethod
+    def read_snapshot_metadata(directory: str) -> Optional[dict]:
+        """
+        Returns the content of meta.json of a snapshot, None if there is no snapshot of the current version.
+
+        Args:
+            directory: the directory of the snapshot, read from its current version, or of one of its versions.
+        """
+        directory = CompactEventLog.get_version_path(directory)
+        try:
+            with open(os.path.join(directory, "meta.json")) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("version") == SNAPSHOT_VERSION else None
+
+    @staticmethod
+    def load(directory: str, column_loader: Optional[ColumnLoader] = None, mmap_mode: Optional[str] = None,
+             snapshot_id: Optional[str] = None) -> CompactEventLog:
+        """
+        Loads a log saved with save.
+
+        Args:
+            directory: the directory of the snapshot, loaded from its current version, or of one of its versions.
+            column_loader: loads the other attributes, which are not in the snapshot.
+            mmap_mode: passed to numpy.load. With 'r' the arrays are mapped read-only instead of read, so the processes
+                loading the same snapshot share its pages, and the workers of the analyzers attach to the snapshot
+                instead of receiving the traces. The snapshot_path of the log is then the loaded version, which a newer
+                save does not modify.
+            snapshot_id: if given, the id of the snapshot to load. The workers pass the snapshot_id of the log of the
+                parent process, so that they fail instead of mapping another snapshot.
+        """
+        # The version is resolved once, so the metadata and the arrays are of the same version
+        directory = CompactEventLog.get_version_path(directory)
+        meta = CompactEventLog.read_snapshot_metadata(directory)
+        if meta is None:
+            raise RuntimeError(f"{directory} is not a snapshot of a log.")
+        if snapshot_id is not None and meta.get("snapshot_id") != snapshot_id:
+            raise RuntimeError(f"{directory} is not the snapshot {snapshot_id}.")
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in SNAPSHOT_ARRAYS}
+        with open(os.path.join(directory, "strings.json")) as strings_file:
+            strings = json.load(strings_file)
+        compact_log = CompactEventLog(strings["activities"], arrays["codes"], arrays["offsets"], arrays["timestamps"],
+                                      [sys.intern(case_id) for case_id in strings["case_ids"]], meta["activity_key"],
+                                      meta["timestamp_key"], meta["case_id_key"], meta["attribute_names"],
+                                      column_loader)
+        if mmap_mode is not None:
+            compact_log.snapshot_path = directory
+            compact_log.snapshot_id = meta.get("snapshot_id")
+        return compact_log
+
+    @staticmethod
+    def get_trace_key(case_id_key: str) -> str:
+        """
+        Returns the trace attribute with the case id in a pm4py EventLog, e.g. concept:name for case:concept:name.
+        """
+        return case_id_key[len("case:"):] if case_id_key.startswith("case:") else case_id_key
+
+    @staticmethod
+    def to_nanoseconds(timestamp) -> int:
+        if timestamp is None or timestamp is pd.NaT:
+            return CompactEventLog.MISSING_TIMESTAMP
+        timestamp = pd.Timestamp(timestamp)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize('UTC')
+        return timestamp.value
+
+    @staticmethod
+    def to_nanoseconds_array(timestamps: pd.Series) -> np.ndarray:
+        timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True)).as_unit('ns')
+        values = timestamps.asi8.copy()
+        values[timestamps.isna()] = CompactEventLog.MISSING_TIMESTAMP
+        return values
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.Declare4Py.CompactEventLog import CompactEventLog
+
+"""
+Case-level co-occurrence statistics of the activities of an event log
+"""
+
+
+class CooccurrenceMatrix:
+    """
+    For each pair of activities, the number of traces containing both of them: the diagonal is the number of traces
+    containing each activity. For each activity, also the number of traces starting and ending with it. The counts are
+    computed once per variant and weighted by the frequency of the variant, then updated trace by trace with add_trace
+    when traces are appended to the log.
+
+    Args:
+        activities: the activities, in the order of the rows and columns of the matrix.
+        cooccurrence: the square matrix of the counts.
+        first: the number of traces starting with each activity.
+        last: the number of traces ending with each activity.
+        num_traces: the number of traces of the log.
+    """
+
+    def __init__(self, activities: List[str], cooccurrence: np.ndarray, first: np.ndarray, last: np.ndarray,
+                 num_traces: int):
+        self.activities: List[str] = activities
+        self.cooccurrence: np.ndarray = cooccurrence
+        self.first: np.ndarray = first
+        self.last: np.ndarray = last
+        self.num_traces: int = num_traces
+        self.index: Dict[str, int] = {activity: idx for idx, activity in enumerate(activities)}
+
+    @staticmethod
+    def from_compact_log(compact_log: CompactEventLog) -> CooccurrenceMatrix:
+        num_activities = len(compact_log.activities)
+        variant_codes, variant_of = compact_log.get_variants()
+        counts = np.bincount(variant_of, minlength=len(variant_codes))
+        cooccurrence = np.zeros((num_activities, num_activities), dtype=np.int64)
+        first = np.zeros(num_activities, dtype=np.int64)
+        last = np.zeros(num_activities, dtype=np.int64)
+        for trace_codes, count in zip(variant_codes, counts.tolist()):
+            if len(trace_codes) == 0:
+                continue
+            codes = np.unique(trace_codes)
+            cooccurrence[np.ix_(codes, codes)] += count
+            first[trace_codes[0]] += count
+            last[trace_codes[-1]] += count
+        return CooccurrenceMatrix(list(compact_log.activities), cooccurrence, first, last, len(compact_log))
+
+    def add_trace(self, activities: Sequence[str]) -> None:
+        """
+        Counts a trace appended to the log. The activities not in the matrix yet are added after the others.
+        """
+        new_activities = [activity for activity in dict.fromkeys(activities) if activity not in self.index]
+        if new_activities:
+            for activity in new_activities:
+                self.index[activity] = len(self.activities)
+                self.activities.append(activity)
+            num_new = len(new_activities)
+            self.cooccurrence = np.pad(self.cooccurrence, ((0, num_new), (0, num_new)))
+            self.first = np.pad(self.first, (0, num_new))
+            self.last = np.pad(self.last, (0, num_new))
+        self.num_traces += 1
+        if len(activities) == 0:
+            return
+        codes = np.array(sorted({self.index[activity] for activity in activities}), dtype=np.int64)
+        self.cooccurrence[np.ix_(codes, codes)] += 1
+        self.first[self.index[activities[0]]] += 1
+        self.last[self.index[activities[-1]]] += 1
+
+    def get_occurrences(self, activity: str) -> int:
+        """
+        Returns the number of traces containing the activity, 0 if it is not in the log.
+        """
+        idx = self.index.get(activity)
+        return 0 if idx is None else int(self.cooccurrence[idx, idx])
+
+    def get_cooccurrences(self, activity_a: str, activity_b: str) -> int:
+        """
+        Returns the number of traces containing both the activities.
+        """
+        idx_a, idx_b = self.index.get(activity_a), self.index.get(activity_b)
+        return 0 if idx_a is None or idx_b is None else int(self.cooccurrence[idx_a, idx_b])
+
+    def get_first(self, activity: str) -> int:
+        idx = self.index.get(activity)
+        return 0 if idx is None else int(self.first[idx])
+
+    def get_last(self, activity: str) -> int:
+        idx = self.index.get(activity)
+        return 0 if idx is None else int(self.last[idx])
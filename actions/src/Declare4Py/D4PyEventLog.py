@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import packaging
 from packaging import version
 import warnings
@@ -7,10 +9,16 @@ from mlxtend.frequent_patterns import fpgrowth, apriori
 
 import pm4py
 from pm4py.objects.log.obj import EventLog, Trace
+from pm4py.util import xes_constants
 
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Sequence, Tuple, Dict, Union
 
+import numpy as np
 from pandas import DataFrame
+from src.Declare4Py.CompactEventLog import CompactEventLog
+from src.Declare4Py.CooccurrenceMatrix import CooccurrenceMatrix
+from src.Declare4Py.VariantTable import VariantTable
+from src.Declare4Py.XESReader import XESReader
 from src.Declare4Py.Encodings.Aggregate import Aggregate
 
 
@@ -22,6 +30,10 @@ class D4PyEventLog:
         log: the input event log parsed from a XES file
         log_length: the trace number of the input log
         frequent_item_sets: list of the most frequent item sets found along the log traces, together with their support and length
+        activity_positions: for each trace, the sorted positions of each activity in the trace
+        compact_log: the array-backed representation of the log, see get_compact_log
+        variant_table: the variants of the log with their frequency and traces, see get_variant_table
+        cooccurrence_matrix: the number of traces containing each pair of activities, see get_cooccurrence_matrix
     """
 
     def __init__(self, case_name: str = "case:concept:name", log: Optional[EventLog] = None):
@@ -43,8 +55,13 @@ class D4PyEventLog:
             self.activity_key: Optional[str] = None
             self.timestamp_key: Optional[str] = None
         self.case_id_key: str = case_name
+        self.activity_positions: Optional[List[Dict[str, np.ndarray]]] = None
+        self.compact_log: Optional[CompactEventLog] = None
+        self.variant_table: Optional[VariantTable] = None
+        self.cooccurrence_matrix: Optional[CooccurrenceMatrix] = None
 
-    def parse_xes_log(self, log_path: str) -> None:
+    def parse_xes_log(self, log_path: str, compact: bool = False, attributes: Sequence[str] = (),
+                      snapshot: bool = False, mmap: bool = False) -> None:
         """
         Set the 'log' EventLog object and the 'log_length' integer by reading and parsing the log corresponding to
         given log file path.
@@ -54,6 +71,16 @@ class D4PyEventLog:
 
         Args:
             log_path: File path where the log is stored.
+            compact: if True, the file is streamed by XESReader into the compact representation of the log, without
+                building pm4py objects. The pm4py EventLog is built at the first call of get_log and the event
+                attributes other than the activity and the timestamp are read again from the file when requested.
+            attributes: with compact, the other attributes read together with the log.
+            snapshot: if True, the compact log is loaded from the snapshot saved next to the file by a previous
+                parsing, see get_snapshot_path, and the file is parsed and the snapshot saved only when the file changed
+                since then. Implies compact.
+            mmap: with snapshot, the arrays of the compact log are mapped read-only from the snapshot files instead of
+                read, so all the processes loading the log share the same memory. The worker processes of the analyzers
+                then attach to the snapshot instead of receiving the traces.
 
         Example::
 
@@ -61,6 +88,28 @@ class D4PyEventLog:
             d4py_log = D4PyEventLog()
             d4py_log.parse_xes_log(log_path)
         """
+        self.activity_positions = None
+        self.compact_log = None
+        self.variant_table = None
+        self.cooccurrence_matrix = None
+        if compact or snapshot:
+            self.log = None
+            reader = XESReader(log_path, xes_constants.DEFAULT_NAME_KEY, xes_constants.DEFAULT_TIMESTAMP_KEY,
+                               self.case_id_key)
+            mmap_mode = 'r' if mmap else None
+            if snapshot:
+                self.compact_log = self.load_snapshot(log_path, reader, mmap_mode)
+            if self.compact_log is None:
+                # The signature is taken before reading, so a file changed meanwhile does not match the snapshot
+                signature = self.get_file_signature(log_path) if snapshot else None
+                self.compact_log = reader.read(attributes)
+                version_path = self.save_snapshot(log_path, signature) if snapshot else None
+                if version_path is not None and mmap:
+                    # The saved version itself, another process may have published a newer one meanwhile
+                    self.compact_log = CompactEventLog.load(version_path, reader.read_columns, mmap_mode)
+            self.set_compact_log(self.compact_log)
+            return
+
         with warnings.catch_warnings():
             warnings.filterwarnings("ignore", category=DeprecationWarning)
             log = pm4py.read_xes(log_path)
@@ -73,18 +122,128 @@ class D4PyEventLog:
         self.log_length = len(self.log)
         self.timestamp_key = self.log._properties['pm4py:param:timestamp_key']
         self.activity_key = self.log._properties['pm4py:param:activity_key']
+        self.get_activity_positions()
+
+    def set_compact_log(self, compact_log: CompactEventLog) -> None:
+        """
+        Sets the log to a compact log, e.g. one loaded with CompactEventLog.load. The pm4py EventLog is built at the
+        first call of get_log.
+
+        Args:
+            compact_log: the compact log, with the case id key of this log.
+        """
+        self.log = None
+        self.compact_log = compact_log
+        self.activity_positions = None
+        self.variant_table = None
+        self.cooccurrence_matrix = None
+        self.log_length = len(compact_log)
+        self.timestamp_key = compact_log.timestamp_key
+        self.activity_key = compact_log.activity_key
+        self.get_activity_positions()
+        compact_log.get_activity_index()
+
+    @staticmethod
+    def get_snapshot_path(log_path: str) -> str:
+        """
+        Returns the directory with the snapshot of the compact log of a XES file.
+        """
+        return log_path + ".d4py"
+
+    @staticmethod
+    def get_file_signature(log_path: str, with_hash: bool = True) -> Dict[str, Union[int, str]]:
+        """
+        Returns the size, the modification time in nanoseconds and, if with_hash is True, the SHA-256 of a file.
+        """
+        stat = os.stat(log_path)
+        signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if with_hash:
+            sha256 = hashlib.sha256()
+            with open(log_path, "rb") as log_file:
+                for chunk in iter(lambda: log_file.read(2 ** 20), b""):
+                    sha256.update(chunk)
+            signature["sha256"] = sha256.hexdigest()
+        return signature
+
+    def load_snapshot(self, log_path: str, reader: XESReader,
+                      mmap_mode: Optional[str] = None) -> Optional[CompactEventLog]:
+        """
+        Loads the snapshot of a XES file if it is still valid: the file must have the size of the snapshotted one and
+        either its modification time or, when only the modification time differs, its SHA-256. Returns None otherwise,
+        and also when the snapshot cannot be read, so that the file is parsed instead.
+        """
+        # A process saving the snapshot meanwhile may remove the version just resolved, then the new one is tried
+        for attempt in range(2):
+            version_path = CompactEventLog.get_version_path(self.get_snapshot_path(log_path))
+            try:
+                return self._load_snapshot_version(log_path, version_path, reader, mmap_mode)
+            except (OSError, ValueError, KeyError, RuntimeError) as e:
+                if attempt == 1:
+                    print(f"The snapshot of {log_path} cannot be loaded: {e}")
+        return None
+
+    def _load_snapshot_version(self, log_path: str, version_path: str, reader: XESReader,
+                               mmap_mode: Optional[str] = None) -> Optional[CompactEventLog]:
+        meta = CompactEventLog.read_snapshot_metadata(version_path)
+        if meta is None or meta["case_id_key"] != self.case_id_key:
+            return None
+        source = meta.get("source", {})
+        signature = self.get_file_signature(log_path, with_hash=False)
+        if signature["size"] != source.get("size"):
+            return None
+        if signature["mtime_ns"] != source.get("mtime_ns"):
+            # The file was touched or copied, the content decides
+            if self.get_file_signature(log_path)["sha256"] != source.get("sha256"):
+                return None
+        return CompactEventLog.load(version_path, reader.read_columns, mmap_mode)
+
+    def save_snapshot(self, log_path: str, signature: Optional[Dict[str, Union[int, str]]] = None) -> Optional[str]:
+        """
+        Saves the compact log as the snapshot of the XES file it was parsed from. Returns the directory of the saved
+        version of the snapshot, None if the snapshot cannot be written.
+        """
+        if signature is None:
+            signature = self.get_file_signature(log_path)
+        try:
+            return self.get_compact_log().save(self.get_snapshot_path(log_path), {"source": signature})
+        except OSError as e:
+            print(f"The snapshot of {log_path} cannot be saved: {e}")
+            return None
 
     def get_log(self) -> EventLog:
         """
-        Returns the log previously fed in input.
+        Returns the log previously fed in input. A log parsed in the compact format is materialized at the first call.
 
         Returns:
             the input log.
         """
         if self.log is None:
-            raise RuntimeError("You must load a log before.")
+            if self.compact_log is None:
+                raise RuntimeError("You must load a log before.")
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", category=DeprecationWarning)
+                self.log = self.compact_log.to_event_log()
         return self.log
 
+    def get_compact_log(self) -> CompactEventLog:
+        """
+        Returns the array-backed representation of the log, built from the EventLog at the first call if the log was
+        not parsed in the compact format.
+
+        Returns:
+            the compact log.
+        """
+        if self.compact_log is None:
+            if self.log is None:
+                raise RuntimeError("You must load a log before.")
+            if isinstance(self.log, DataFrame):
+                self.compact_log = CompactEventLog.from_dataframe(self.log, self.activity_key, self.timestamp_key,
+                                                                  self.case_id_key)
+            else:
+                self.compact_log = CompactEventLog.from_event_log(self.log, self.activity_key, self.timestamp_key,
+                                                                  self.case_id_key)
+        return self.compact_log
+
     def get_length(self) -> int:
         """
         Return the length of the log, which was previously fed in input.
@@ -96,6 +255,112 @@ class D4PyEventLog:
             raise RuntimeError("You must load a log before.")
         return self.log_length
 
+    def get_activity_positions(self) -> List[Dict[str, np.ndarray]]:
+        """
+        Returns for each trace a dictionary from its activities to the sorted array of their positions in the trace.
+        The index is built once, at parsing time or at the first call, and the traces of the same variant share
+        the same dictionary.
+
+        Returns:
+            a list with a dictionary for each trace of the log.
+        """
+        if self.activity_positions is None and self.compact_log is not None:
+            self.activity_positions = self.compact_log.get_activity_positions()
+        if self.activity_positions is None:
+            if self.log is None:
+                raise RuntimeError("You must load a log before.")
+            variants: Dict[Tuple[str, ...], Dict[str, np.ndarray]] = {}
+            self.activity_positions = []
+            for trace in self.log:
+                variant = tuple(event[self.activity_key] for event in trace)
+                positions = variants.get(variant)
+                if positions is None:
+                    positions = variants[variant] = self.index_activity_positions(variant)
+                self.activity_positions.append(positions)
+        return self.activity_positions
+
+    def select_traces(self, activities: Sequence[str], mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns the sorted indices of the traces containing all the given activities, looked up in the activity index
+        of the compact log (built at parsing time for the compact logs), among the traces selected by mask if given.
+        """
+        return self.get_compact_log().select_traces(activities, mask)
+
+    def select_log(self, trace_ids: Sequence[int]) -> Union[EventLog, DataFrame]:
+        """
+        Returns the log restricted to the given traces, in the order of the log and in the format of the log.
+        """
+        log = self.get_log()
+        if isinstance(log, DataFrame):
+            case_ids = self.get_compact_log().case_ids
+            return log[log[self.case_id_key].isin([case_ids[trace_id] for trace_id in trace_ids])]
+        return EventLog([log[trace_id] for trace_id in trace_ids], attributes=log.attributes,
+                        extensions=log.extensions, classifiers=log.classifiers, omni_present=log.omni_present,
+                        properties=log.properties)
+
+    def get_variant_table(self) -> VariantTable:
+        """
+        Returns the table of the variants of the log, with the frequency and the traces of each variant. The table is
+        built from the compact log at the first call and then updated by append_traces.
+
+        Returns:
+            the variant table.
+        """
+        if self.variant_table is None:
+            self.variant_table = VariantTable.from_compact_log(self.get_compact_log())
+        return self.variant_table
+
+    def get_cooccurrence_matrix(self) -> CooccurrenceMatrix:
+        """
+        Returns the number of traces containing each pair of activities and starting and ending with each activity,
+        computed from the variants of the compact log at the first call and then updated by append_traces.
+
+        Returns:
+            the co-occurrence matrix.
+        """
+        if self.cooccurrence_matrix is None:
+            self.cooccurrence_matrix = CooccurrenceMatrix.from_compact_log(self.get_compact_log())
+        return self.cooccurrence_matrix
+
+    def append_traces(self, traces: Sequence[Trace]) -> None:
+        """
+        Appends traces at the end of the log. The compact log, the activity positions, the variant table and the
+        co-occurrence matrix are updated with the new traces only, which share the positions of the traces of the same
+        variant.
+
+        Args:
+            traces: the pm4py traces, with the activity, timestamp and case id keys of the log.
+        """
+        if isinstance(self.log, DataFrame):
+            raise RuntimeError("Traces can be appended only to a log in the EventLog format.")
+        table = self.get_variant_table()
+        positions = self.get_activity_positions()
+        appended = CompactEventLog.from_event_log(EventLog(list(traces)), self.activity_key, self.timestamp_key,
+                                                  self.case_id_key)
+        if self.log is not None:
+            for trace in traces:
+                self.log.append(trace)
+        self.compact_log.extend(appended)
+        for idx in range(len(appended)):
+            activities = appended.get_trace_activities(idx)
+            if self.cooccurrence_matrix is not None:
+                self.cooccurrence_matrix.add_trace(activities)
+            variant_id = table.add_trace(activities, appended.case_ids[idx])
+            first = table.trace_ids[variant_id][0]
+            positions.append(positions[first] if first < len(positions) else self.index_activity_positions(activities))
+        self.log_length += len(appended)
+
+    @staticmethod
+    def index_activity_positions(activities: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Returns a dictionary from the activities of a sequence to the sorted array of their positions.
+        """
+        positions: Dict[str, List[int]] = {}
+        for position, activity in enumerate(activities):
+            positions.setdefault(activity, []).append(position)
+        return {activity: np.array(activity_positions, dtype=np.int64)
+                for activity, activity_positions in positions.items()}
+
     def get_concept_name(self) -> str:
         if self.log_length is None:
             raise RuntimeError("You must load a log before.")
@@ -125,12 +390,13 @@ class D4PyEventLog:
             Returns filtered log on specified variants.
 
         """
-        if self.log is None:
-            raise RuntimeError("You must load a log before.")
+        if self.log is None and self.compact_log is not None and attribute == self.activity_key:
+            # The activities of a compact log are counted without building the pm4py log
+            return self.compact_log.get_activity_counts(count_once_per_case)
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.get_event_attribute_values(self.log, attribute, count_once_per_case, self.case_id_key)
+            return pm4py.get_event_attribute_values(self.get_log(), attribute, count_once_per_case, self.case_id_key)
         else:
-            event_attribute_val = pm4py.get_event_attribute_values(self.log, attribute)
+            event_attribute_val = pm4py.get_event_attribute_values(self.get_log(), attribute)
             return event_attribute_val
 
     def get_start_activities(self) -> Dict[str, int]:
@@ -141,12 +407,10 @@ class D4PyEventLog:
             Returns a dictionary containing all start activities.
 
         """
-        if self.log is None:
-            raise RuntimeError("You must load a log before.")
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.get_start_activities(self.log, self.activity_key, self.timestamp_key, self.case_id_key)
+            return pm4py.get_start_activities(self.get_log(), self.activity_key, self.timestamp_key, self.case_id_key)
         else:
-            start_activities = pm4py.get_start_activities(self.log)
+            start_activities = pm4py.get_start_activities(self.get_log())
             return start_activities
 
     def get_end_activities(self) -> Dict[str, int]:
@@ -158,27 +422,28 @@ class D4PyEventLog:
             Returns a dictionary containing all end activities.
 
         """
-        if self.log is None:
-            raise RuntimeError("You must load a log before.")
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.get_end_activities(self.log, self.activity_key, self.timestamp_key, self.case_id_key)
+            return pm4py.get_end_activities(self.get_log(), self.activity_key, self.timestamp_key, self.case_id_key)
         else:
-            end_activities = pm4py.get_end_activities(self.log)
+            end_activities = pm4py.get_end_activities(self.get_log())
             return end_activities
 
     def get_variants(self) -> Dict[Tuple[str], List[Trace]]:
         """
-        Retrieves all variants from the log.
+        Retrieves all variants from the log, read from the variant table unless the log is in the DataFrame format.
 
         Returns:
             Returns a dictionary containing all variants in the log.
         """
-        if self.log is None:
-            raise RuntimeError("You must load a log before.")
+        if not isinstance(self.log, DataFrame):
+            log = self.get_log()
+            table = self.get_variant_table()
+            return {variant: [log[trace_id] for trace_id in trace_ids]
+                    for variant, trace_ids in zip(table.variants, table.trace_ids)}
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.get_variants(self.log, self.activity_key, self.timestamp_key, self.case_id_key)
+            return pm4py.get_variants(self.get_log(), self.activity_key, self.timestamp_key, self.case_id_key)
         else:
-            return pm4py.get_variants(self.log)
+            return pm4py.get_variants(self.get_log())
     """
     def get_log_alphabet_attribute(self, attribute_name: str = None) -> List[str]:
         if self.log is None:
@@ -193,10 +458,8 @@ class D4PyEventLog:
         return list(attribute_values)
     """
     def get_trace(self, id_trace: int = None) -> Trace:
-        if self.log is None:
-            raise RuntimeError("You must load a log before.")
         try:
-            return self.log[id_trace]
+            return self.get_log()[id_trace]
         except IndexError:
             print("The index of the trace must be lower than the log size.")
         except TypeError as e:
@@ -210,6 +473,11 @@ class D4PyEventLog:
             nested lists, the outer one addresses traces while the inner one contains event activity names.
         """
         projection = []
+        if self.log is None and self.compact_log is not None and attribute_name == self.activity_key:
+            compact_log = self.compact_log
+            activities = np.array(compact_log.activities, dtype=object)[compact_log.codes].tolist()
+            offsets = compact_log.offsets.tolist()
+            return [activities[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
         if self.log is None:
             raise RuntimeError("You must load a log before.")
         try:
@@ -223,6 +491,9 @@ class D4PyEventLog:
         return projection
 
     def to_dataframe(self):
+        if self.log is None and self.compact_log is not None:
+            self.log = self.compact_log.to_dataframe()
+            return
         if self.log is None:
             raise RuntimeError("You must load a log before.")
         if isinstance(self.log, DataFrame):
@@ -230,8 +501,12 @@ class D4PyEventLog:
         with warnings.catch_warnings():
             warnings.filterwarnings("ignore", category=DeprecationWarning)
             self.log = pm4py.convert_to_dataframe(self.log)
+        self.activity_positions = None
 
     def to_eventlog(self):
+        if self.log is None and self.compact_log is not None:
+            self.get_log()
+            return
         if self.log is None:
             raise RuntimeError("You must load a log before.")
         if isinstance(self.log, EventLog):
@@ -254,14 +529,24 @@ class D4PyEventLog:
             algorithm: the algorithm for extracting frequent itemsets, choose between 'fpgrowth' (default) and 'apriori'.
             len_itemset: the maximum length of the extracted itemsets.
         """
-        if self.log is None:
+        if self.log is None and self.compact_log is None:
             raise RuntimeError("You must load a log before.")
         if not 0 <= min_support <= 1:
             raise RuntimeError("Min. support must be in range [0, 1].")
 
-        with warnings.catch_warnings():
-            warnings.filterwarnings("ignore", category=DeprecationWarning)
-            log_df = pm4py.convert_to_dataframe(self.log)
+        if self.compact_log is not None:
+            # Only the encoded attributes are loaded from the compact log
+            compact_log = self.compact_log
+            base_columns = (compact_log.case_id_key, compact_log.activity_key, compact_log.timestamp_key)
+            attributes = [attr_name for attr_name in categorical_attributes if attr_name not in base_columns]
+            for attr_name in attributes:
+                if attr_name not in compact_log.attribute_names:
+                    raise RuntimeError(f"{attr_name} attribute does not exist. Check the log.")
+            log_df = compact_log.to_dataframe(attributes)
+        else:
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", category=DeprecationWarning)
+                log_df = pm4py.convert_to_dataframe(self.log)
 
         for attr_name in categorical_attributes:
             if attr_name not in log_df.columns:
@@ -296,14 +581,12 @@ class D4PyEventLog:
             return frequent_itemsets[(frequent_itemsets['length'] <= len_itemset)]
 
     def save_xes(self, path: str):
-        if self.log is None:
-            raise RuntimeError("You must load a log before.")
         if type(path) is not str:
             raise RuntimeError("The path must be  a string.")
         try:
             if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-                pm4py.write_xes(self.log, path, case_id_key=self.case_id_key)
+                pm4py.write_xes(self.get_log(), path, case_id_key=self.case_id_key)
             else:
-                pm4py.write_xes(self.log, path)
+                pm4py.write_xes(self.get_log(), path)
         except FileNotFoundError as e:
             print(f"{e} is no a valid path")
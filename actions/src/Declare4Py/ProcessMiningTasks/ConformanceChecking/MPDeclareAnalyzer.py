@@ -1,15 +1,50 @@
 from __future__ import annotations
 
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pm4py.objects.log.obj import Trace
+
+from src.Declare4Py.CompactEventLog import CompactEventLog
 from src.Declare4Py.D4PyEventLog import D4PyEventLog
 from src.Declare4Py.ProcessMiningTasks.AbstractConformanceChecking import AbstractConformanceChecking
-from src.Declare4Py.ProcessMiningTasks.ConformanceChecking import MPDeclareResultsBrowser
+from src.Declare4Py.ProcessMiningTasks.ConformanceChecking.MPDeclareResultsBrowser import MPDeclareResultsBrowser
 from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel
 from src.Declare4Py.Utils.Declare.Checkers import ConstraintChecker
+from src.Declare4Py.Utils.Declare.IncrementalCheckers import SinglePassConstraintChecker
+from src.Declare4Py.Utils.utils import Utils
 
 """
 Provides basic conformance checking functionalities
 """
 
+# Checker built once in each worker process by _init_check_worker
+_worker_checker: Optional[SinglePassConstraintChecker] = None
+# Compact log mapped from its snapshot by _init_check_worker, None if the chunks carry the traces
+_worker_log: Optional[CompactEventLog] = None
+
+
+def _init_check_worker(declare_model: DeclareModel, consider_vacuity: bool, concept_name: str,
+                       snapshot_path: Optional[str] = None, snapshot_id: Optional[str] = None) -> None:
+    global _worker_checker, _worker_log
+    compiled_rules = ConstraintChecker.compile_model(declare_model, consider_vacuity)
+    _worker_checker = SinglePassConstraintChecker(declare_model, consider_vacuity, concept_name, compiled_rules)
+    if snapshot_path is not None:
+        # The version of the snapshot the parent process mapped, checked against its id
+        _worker_log = CompactEventLog.load(snapshot_path, mmap_mode='r', snapshot_id=snapshot_id)
+
+
+def _check_chunk(chunk: Tuple[List[Trace], List[Dict[str, np.ndarray]]]) -> MPDeclareResultsBrowser:
+    if _worker_log is not None:
+        # The chunk is a range of traces of the mapped log
+        lo, hi = chunk
+        traces = [_worker_log.get_trace_codes(trace_id) for trace_id in range(lo, hi)]
+        return MPDeclareAnalyzer.check_traces(_worker_checker, traces, _worker_log.get_activity_positions(lo, hi))
+    traces, positions = chunk
+    return MPDeclareAnalyzer.check_traces(_worker_checker, traces, positions)
+
 
 class MPDeclareAnalyzer(AbstractConformanceChecking):
 
@@ -17,14 +52,15 @@ class MPDeclareAnalyzer(AbstractConformanceChecking):
         super().__init__(log, declare_model)
         self.consider_vacuity = consider_vacuity
 
-    def run(self) -> MPDeclareResultsBrowser:
+    def run(self, jobs: int = 0) -> MPDeclareResultsBrowser:
         """
         Performs conformance checking for the provided event log and DECLARE model.
 
         Parameters
         ----------
-        consider_vacuity : bool
-            True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+        jobs : int
+            number of processes checking the traces, 0 or 1 to check them in the current process and -1 to use all
+            the CPUs. The log is split in contiguous ranges of traces and the results keep the order of the log.
 
         Returns
         -------
@@ -39,9 +75,50 @@ class MPDeclareAnalyzer(AbstractConformanceChecking):
         if self.process_model is None:
             raise RuntimeError("You must load the DECLARE model before checking the model.")
 
-        log_checkers_results = []
-        for trace in self.event_log.get_log():
-            log_checkers_results.append(ConstraintChecker().check_trace_conformance(trace, self.process_model,
-                                                                                    self.consider_vacuity,
-                                                                                    self.event_log.activity_key))
-        return MPDeclareResultsBrowser(log_checkers_results, self.process_model.serialized_constraints)
+        # The conditions of the constraints are parsed and compiled once for the whole log, then each trace is
+        # traversed once for all the constraints
+        compiled_rules = ConstraintChecker.compile_model(self.process_model, self.consider_vacuity)
+        checker = SinglePassConstraintChecker(self.process_model, self.consider_vacuity, self.event_log.activity_key,
+                                              compiled_rules)
+        snapshot_path, snapshot_id = None, None
+        if checker.needs_events:
+            g_log = self.event_log.get_log()
+        else:
+            # Only the length of the traces is needed, the activity codes of the compact log stand for the events
+            compact_log = self.event_log.get_compact_log()
+            g_log = [compact_log.get_trace_codes(trace_id) for trace_id in range(len(compact_log))]
+            snapshot_path, snapshot_id = compact_log.snapshot_path, compact_log.snapshot_id
+        workers = Utils.get_workers(jobs)
+        if workers == 1 or len(g_log) < 2:
+            return self.check_traces(checker, g_log, self.event_log.get_activity_positions())
+
+        shards = self.get_shards(len(g_log), workers)
+        if snapshot_path is not None:
+            # The workers attach to the mapped snapshot of the log and receive only the ranges of traces
+            chunks = shards
+        else:
+            positions = self.event_log.get_activity_positions()
+            chunks = [(g_log[lo:hi], positions[lo:hi]) for lo, hi in shards]
+        # The compiled conditions cannot be pickled, so each worker compiles the model once in the initializer
+        with multiprocessing.Pool(processes=workers, initializer=_init_check_worker,
+                                  initargs=(self.process_model, self.consider_vacuity,
+                                            self.event_log.activity_key, snapshot_path, snapshot_id)) as pool:
+            parts = pool.map(_check_chunk, chunks)
+        return MPDeclareResultsBrowser.concatenate(parts)
+
+    @staticmethod
+    def check_traces(checker: SinglePassConstraintChecker, traces,
+                     positions: List[Dict[str, np.ndarray]]) -> MPDeclareResultsBrowser:
+        results = MPDeclareResultsBrowser(None, checker.decl_model.serialized_constraints, len(traces))
+        for trace_id, trace in enumerate(traces):
+            results.set_trace_results(trace_id, checker.check_trace_conformance(trace, positions[trace_id]))
+        return results
+
+    @staticmethod
+    def get_shards(num_traces: int, workers: int) -> List[Tuple[int, int]]:
+        """
+        Splits the traces in one contiguous range for each worker, the sizes differ by at most one trace.
+        """
+        workers = min(workers, num_traces)
+        bounds = [num_traces * worker // workers for worker in range(workers + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
@@ -1,14 +1,53 @@
 from __future__ import annotations
 
+import json
+import multiprocessing
+import os
 from abc import ABC
+from math import ceil
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
+from pm4py.objects.log.obj import Trace
+
+from src.Declare4Py.CompactEventLog import CompactEventLog
 from src.Declare4Py.D4PyEventLog import D4PyEventLog
 from src.Declare4Py.ProcessMiningTasks.AbstractDiscovery import AbstractDiscovery
 from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel, DeclareModelTemplate
 from src.Declare4Py.Utils.Declare.Checkers import ConstraintChecker
+from src.Declare4Py.Utils.Declare.IncrementalCheckers import SinglePassConstraintChecker
+from src.Declare4Py.Utils.Declare.Subsumption import SubsumptionPlanner
+from src.Declare4Py.Utils.Declare.SupportBounds import SupportBounds
+from src.Declare4Py.Utils.Declare.TraceStates import TraceState
+from src.Declare4Py.Utils.VersionedDirectory import VersionedDirectory
+from src.Declare4Py.Utils.utils import Utils
+
+
+# Arrays of the state of update saved by DeclareMiner.save, next to the snapshot of the log
+MINER_ARRAYS = ("satisfied", "discovered", "variant_satisfied", "variant_checked")
+MINER_SNAPSHOT_VERSION = 2
+
+# Miner built once in each worker process by _init_mining_worker, on the compact log of the parent process
+_worker_miner: Optional[DeclareMiner] = None
+
 
+def _init_mining_worker(log_arrays: Optional[tuple], snapshot_path: Optional[str], snapshot_id: Optional[str],
+                        consider_vacuity: bool, min_support: float) -> None:
+    global _worker_miner
+    if snapshot_path is not None:
+        # The version of the snapshot the parent process mapped, checked against its id
+        compact_log = CompactEventLog.load(snapshot_path, mmap_mode='r', snapshot_id=snapshot_id)
+    else:
+        compact_log = CompactEventLog(*log_arrays)
+    # The positions of the activities and the co-occurrence matrix are computed again in each worker
+    event_log = D4PyEventLog(case_name=compact_log.case_id_key)
+    event_log.set_compact_log(compact_log)
+    _worker_miner = DeclareMiner(event_log, consider_vacuity, min_support)
 
 
+def _check_shard(candidates: List[dict]) -> Tuple[List[bool], int]:
+    return _worker_miner.check_candidates(candidates), _worker_miner.saved_checks
+
 
 """
 Provides basic discovery functionalities
@@ -36,14 +75,33 @@ class DeclareMiner(AbstractDiscovery, ABC):
         self.consider_vacuity: bool = consider_vacuity
         self.itemsets_support: float = itemsets_support
         self.max_declare_cardinality: int = max_declare_cardinality
+        self.variant_positions: Optional[List[Tuple[Dict[str, np.ndarray], int, int]]] = None
+        # Number of candidates of the last run decided from the template hierarchy, without checking them
+        self.saved_checks: int = 0
+        # Candidates tracked by update, with the number of traces satisfying them and whether they are discovered
+        self.candidates: List[dict] = []
+        self.candidate_ids: Dict[Tuple[str, Optional[int], Tuple[str, ...]], int] = {}
+        self.satisfied: Optional[np.ndarray] = None
+        self.discovered: Optional[np.ndarray] = None
+        self.counting_checker: Optional[SinglePassConstraintChecker] = None
+        # For each variant of the log, by its id in the variant table, whether its traces satisfy each tracked
+        # candidate, and the number of candidates checked on it (the following ones are not checked yet)
+        self.variant_satisfied: np.ndarray = np.zeros((0, 0), dtype=bool)
+        self.variant_checked: np.ndarray = np.zeros(0, dtype=np.int64)
 
-    def run(self) -> DeclareModel:
+    def run(self, jobs: int = 0) -> DeclareModel:
         """
         Performs discovery of the supported DECLARE templates for the provided log by using the computed frequent item
-        sets.
+        sets. The item sets are read from the co-occurrence matrix of the log as in update, so run followed by update
+        gives the same model, with the constraints in the same order, as run on the log with the new traces.
 
         Parameters
         ----------
+        jobs : int
+            number of processes checking the candidate constraints, 0 or 1 to check them in the current process and -1
+            to use all the CPUs. The candidates are split in shards of activities and item sets, and the constraints of
+            the discovered model keep the order of the sequential run.
+
         consider_vacuity : bool
             True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
 
@@ -66,67 +124,400 @@ class DeclareMiner(AbstractDiscovery, ABC):
         if self.max_declare_cardinality <= 0:
             raise RuntimeError("Cardinality must be greater than 0.")
 
-        frequent_item_sets = self.event_log.compute_frequent_itemsets(min_support=self.itemsets_support,
-                                                                      case_id_col=self.event_log.get_case_name(),
-                                                                      categorical_attributes=[self.event_log.get_concept_name()],
-                                                                      algorithm='fpgrowth', remove_column_prefix=True)
+        self.variant_positions = self.get_variant_positions(self.event_log)
+        candidates = self.get_candidates(self.get_frequent_item_sets())
+        self.candidates, self.candidate_ids, self.satisfied = candidates, {}, None
+        workers = Utils.get_workers(jobs)
+        shards = self.get_shards(candidates, workers)
+        if workers == 1 or len(shards) < 2:
+            decisions = self.check_candidates(candidates)
+        else:
+            # The workers attach to the mapped snapshot of the log, or receive the arrays of the compact log, and only
+            # the shards of candidates and their outcomes are exchanged
+            compact_log = self.event_log.get_compact_log()
+            snapshot_path = compact_log.snapshot_path
+            log_arrays = None
+            if snapshot_path is None:
+                log_arrays = (compact_log.activities, compact_log.codes, compact_log.offsets, compact_log.timestamps,
+                              compact_log.case_ids, compact_log.activity_key, compact_log.timestamp_key,
+                              compact_log.case_id_key)
+            with multiprocessing.Pool(processes=workers, initializer=_init_mining_worker,
+                                      initargs=(log_arrays, snapshot_path, compact_log.snapshot_id,
+                                                self.consider_vacuity, self.min_support)) as pool:
+                parts = pool.map(_check_shard, [candidates[lo:hi] for lo, hi in shards])
+            decisions = [supported for shard_decisions, _ in parts for supported in shard_decisions]
+            self.saved_checks = sum(saved_checks for _, saved_checks in parts)
+        self.set_model([constraint for constraint, supported in zip(candidates, decisions) if supported])
+        return self.process_model
+
+    def update(self, new_traces: Sequence[Trace]) -> List[dict]:
+        """
+        Appends traces to the log and updates the discovered model with them. The miner keeps, for each candidate
+        constraint, the number of traces satisfying it: the first update counts them on the whole log, the next ones
+        only on the new traces, once per variant. The frequent item sets are read from the co-occurrence matrix of the
+        log, which is updated with the new traces too; the candidates of the item sets becoming frequent are counted
+        on the whole log. The candidates of the item sets no longer frequent are still counted, so that they do not
+        need to be counted again if they become frequent again. The counters are saved and loaded with save and load,
+        so that they are not counted again on the whole log by a new process.
+
+        The model is the one run would discover on the whole log, with the constraints in the same order.
+
+        Args:
+            new_traces: the pm4py traces, with the activity, timestamp and case id keys of the log.
+
+        Returns:
+            the constraints added to or removed from the model, in the order they are tracked.
+        """
+        if self.event_log is None:
+            raise RuntimeError("You must load a log before.")
+        self.count_log()
+
+        first_trace = self.event_log.get_length()
+        self.event_log.append_traces(new_traces)
+        self.variant_positions = None
+        self.count_satisfied(range(len(self.candidates)), first_trace)
+        self.track_candidates(self.get_candidates(self.get_frequent_item_sets()))
+
+        discovered = self.get_discovered()
+        changed = np.flatnonzero(discovered != self.discovered).tolist()
+        self.discovered = discovered
+        self.set_model(self.get_discovered_constraints())
+        return [self.candidates[idx] for idx in changed]
+
+    def count_log(self) -> None:
+        """
+        Starts tracking the candidates, if they are not tracked yet: the candidates of the last run and of the frequent
+        item sets of the log, with the traces of the whole log satisfying them.
+        """
+        if self.satisfied is not None:
+            return
+        candidates, self.candidates, self.candidate_ids = self.candidates, [], {}
+        self.variant_satisfied = np.zeros((0, 0), dtype=bool)
+        self.variant_checked = np.zeros(0, dtype=np.int64)
+        self.satisfied = np.zeros(0, dtype=np.int64)
+        self.discovered = np.zeros(0, dtype=bool)
+        self.track_candidates(candidates + self.get_candidates(self.get_frequent_item_sets()))
+        self.discovered = self.get_discovered()
+
+    def get_discovered_constraints(self) -> List[dict]:
+        """
+        Returns the tracked candidates in the model, in the order run checks them.
+        """
+        ids = (self.candidate_ids[SubsumptionPlanner.get_key(constraint)]
+               for constraint in self.get_candidates(self.get_frequent_item_sets()))
+        return [self.candidates[idx] for idx in ids if self.discovered[idx]]
+
+    def set_model(self, constraints: List[dict]) -> None:
+        self.process_model.activities = list(self.event_log.get_cooccurrence_matrix().activities)
+        self.process_model.constraints = constraints
+        self.process_model.serialized_constraints = []
+        self.process_model.set_constraints()
+
+    def save(self, directory: str) -> None:
+        """
+        Saves the state of update in a directory: the compact log as a snapshot (see CompactEventLog.save), the
+        parameters of the miner, the tracked candidates with the number of traces satisfying them, and their states on
+        the variants of the log. The candidates are counted on the whole log first if they are not tracked yet. As the
+        snapshots of the logs, the state is saved as a new version of the directory (see VersionedDirectory), so a
+        miner being loaded meanwhile reads the whole previous state or the whole new one.
+
+        Args:
+            directory: the directory, whose previous versions are replaced.
+        """
+        if self.event_log is None:
+            raise RuntimeError("You must load a log before.")
+        self.count_log()
+        version_path = VersionedDirectory.create_version(directory)
+        try:
+            self.event_log.get_compact_log().save(os.path.join(version_path, "log"))
+            for name in MINER_ARRAYS:
+                np.save(os.path.join(version_path, f"{name}.npy"), getattr(self, name))
+            meta = {"version": MINER_SNAPSHOT_VERSION, "consider_vacuity": self.consider_vacuity,
+                    "min_support": self.min_support, "itemsets_support": self.itemsets_support,
+                    "max_declare_cardinality": self.max_declare_cardinality,
+                    "candidates": [SubsumptionPlanner.get_key(constraint) for constraint in self.candidates]}
+            with open(os.path.join(version_path, "miner.json"), "w") as meta_file:
+                json.dump(meta, meta_file)
+        except BaseException:
+            VersionedDirectory.discard(version_path)
+            raise
+        VersionedDirectory.publish(version_path)
+
+    @staticmethod
+    def load(directory: str, mmap: bool = False) -> DeclareMiner:
+        """
+        Loads a miner saved with save, with its log and the discovered model, ready to be updated with new traces.
+
+        Args:
+            directory: the directory of the saved miner.
+            mmap: if True, the arrays of the log are mapped read-only from the snapshot, see CompactEventLog.load. They
+                are copied by the first update.
+        """
+        # The version is resolved once, so all the files are of the same save
+        directory = VersionedDirectory.resolve(directory) or directory
+        try:
+            with open(os.path.join(directory, "miner.json")) as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            meta = None
+        if meta is None or meta.get("version") != MINER_SNAPSHOT_VERSION:
+            raise RuntimeError(f"{directory} is not a saved DeclareMiner.")
+        compact_log = CompactEventLog.load(os.path.join(directory, "log"), mmap_mode='r' if mmap else None)
+        event_log = D4PyEventLog(case_name=compact_log.case_id_key)
+        event_log.set_compact_log(compact_log)
+        miner = DeclareMiner(event_log, meta["consider_vacuity"], meta["min_support"], meta["itemsets_support"],
+                             meta["max_declare_cardinality"])
+        for template_str, n, activities in meta["candidates"]:
+            constraint = {"template": DeclareModelTemplate.get_template_from_string(template_str),
+                          "activities": list(activities), "condition": ("", "")}
+            if n is not None:
+                constraint["n"] = n
+            miner.candidate_ids[SubsumptionPlanner.get_key(constraint)] = len(miner.candidates)
+            miner.candidates.append(constraint)
+        for name in MINER_ARRAYS:
+            setattr(miner, name, np.load(os.path.join(directory, f"{name}.npy")))
+        miner.set_model(miner.get_discovered_constraints())
+        return miner
+
+    def get_frequent_item_sets(self) -> List[frozenset]:
+        """
+        Returns the activities and the pairs of activities occurring in at least itemsets_support of the traces, the
+        only item sets get_candidates uses, from the co-occurrence matrix of the log. The activities are sorted, so the
+        item sets do not depend on the order of the activities in the log.
+        """
+        matrix = self.event_log.get_cooccurrence_matrix()
+        if matrix.num_traces == 0:
+            return []
+        frequent = sorted(activity for activity in matrix.activities
+                          if matrix.get_occurrences(activity) / matrix.num_traces >= self.itemsets_support)
+        item_sets = [frozenset([activity]) for activity in frequent]
+        for idx, activity_a in enumerate(frequent):
+            for activity_b in frequent[idx + 1:]:
+                if matrix.get_cooccurrences(activity_a, activity_b) / matrix.num_traces >= self.itemsets_support:
+                    item_sets.append(frozenset([activity_a, activity_b]))
+        return item_sets
+
+    def track_candidates(self, candidates: List[dict]) -> None:
+        """
+        Adds the candidates not tracked yet and counts the traces of the whole log satisfying them.
+        """
+        first = len(self.candidates)
+        for constraint in candidates:
+            key = SubsumptionPlanner.get_key(constraint)
+            if key not in self.candidate_ids:
+                self.candidate_ids[key] = len(self.candidates)
+                self.candidates.append(constraint)
+        if len(self.candidates) == first:
+            return
+        self.satisfied = np.concatenate([self.satisfied, np.zeros(len(self.candidates) - first, dtype=np.int64)])
+        self.discovered = np.concatenate([self.discovered, np.zeros(len(self.candidates) - first, dtype=bool)])
+        self.counting_checker = None
+        self.count_satisfied(range(first, len(self.candidates)))
+
+    def count_satisfied(self, constraint_ids: Sequence[int], first_trace: int = 0) -> None:
+        """
+        Adds the traces of the log from first_trace on satisfying each of the given tracked candidates to their
+        counters. The states of the candidates on each variant of the variant table are kept, so a variant is checked
+        only once for each candidate, also when traces of the variant are appended later.
+        """
+        if len(constraint_ids) == 0:
+            return
+        if self.counting_checker is None:
+            tmp_model = DeclareModel()
+            tmp_model.constraints = list(self.candidates)
+            tmp_model.set_constraints()
+            self.counting_checker = SinglePassConstraintChecker(tmp_model, self.consider_vacuity,
+                                                                self.event_log.activity_key)
+        table = self.event_log.get_variant_table()
+        positions = self.event_log.get_activity_positions()
+        num_variants, num_candidates = len(table), len(self.candidates)
+        # Rows for the new variants and columns for the new candidates, not checked yet
+        rows, cols = self.variant_satisfied.shape
+        if rows < num_variants or cols < num_candidates:
+            variant_satisfied = np.zeros((num_variants, num_candidates), dtype=bool)
+            variant_satisfied[:rows, :cols] = self.variant_satisfied
+            self.variant_satisfied = variant_satisfied
+            self.variant_checked = np.concatenate([self.variant_checked,
+                                                   np.zeros(num_variants - rows, dtype=np.int64)])
+        counts = np.bincount(table.get_variant_of()[first_trace:], minlength=num_variants)
+        for variant_id in np.flatnonzero(counts).tolist():
+            num_checked = int(self.variant_checked[variant_id])
+            if num_checked < num_candidates:
+                states = self.counting_checker.check_positions(positions[table.trace_ids[variant_id][0]],
+                                                               len(table.variants[variant_id]),
+                                                               range(num_checked, num_candidates))
+                self.variant_satisfied[variant_id, num_checked:] = [state == TraceState.SATISFIED for state in states]
+                self.variant_checked[variant_id] = num_candidates
+        constraint_ids = list(constraint_ids)
+        self.satisfied[constraint_ids] += counts @ self.variant_satisfied[:, constraint_ids].astype(np.int64)
 
-        tpm_activities = self.event_log.get_event_attribute_values(self.event_log.get_concept_name())
-        if not isinstance(tpm_activities, list):
-            self.process_model.activities = tpm_activities.keys()
+    def get_discovered(self) -> np.ndarray:
+        """
+        Returns whether each tracked candidate is in the model: its item set is frequent and it is satisfied by at
+        least min_support of the traces.
+        """
+        num_traces = self.event_log.get_length()
+        if num_traces == 0:
+            return np.zeros(len(self.candidates), dtype=bool)
+        frequent = set(self.get_frequent_item_sets())
+        is_frequent = np.fromiter((frozenset(constraint['activities']) in frequent for constraint in self.candidates),
+                                  dtype=bool, count=len(self.candidates))
+        return is_frequent & (self.satisfied > 0) & (self.satisfied / num_traces >= self.min_support)
 
-        for item_set in frequent_item_sets['itemsets']:
+    def get_candidates(self, item_sets) -> List[dict]:
+        """
+        Returns the constraints to check for the frequent item sets: the unary templates (for each cardinality up to
+        max_declare_cardinality when supported) on the single activities, the binary templates on the pairs in both
+        directions. The activities of a pair are sorted, so the order of the candidates does not depend on the hashes
+        of the item sets.
+        """
+        candidates = []
+        for item_set in item_sets:
             length = len(item_set)
             if length == 1:
                 for template in DeclareModelTemplate.get_unary_templates():
-                    constraint = {"template": template, "activities": list(item_set), "condition": ("", "")}
-
                     if not template.supports_cardinality:
-                        constraint_satisfaction = ConstraintChecker().constraint_checking_with_support(constraint,
-                                                                                                       self.event_log,
-                                                                                                       self.consider_vacuity,
-                                                                                                       self.min_support)
-                        # self.basic_discovery_results,= self.discover_constraint(self.event_log, constraint,
-                        #                                                        self.consider_vacuity)
-                        if constraint_satisfaction:
-                            self.process_model.constraints.append(constraint.copy())
+                        candidates.append({"template": template, "activities": list(item_set), "condition": ("", "")})
                     else:
                         for i in range(self.max_declare_cardinality):
-                            constraint['n'] = i + 1
-                            constraint_satisfaction = ConstraintChecker().constraint_checking_with_support(constraint,
-                                                                                                           self.event_log,
-                                                                                                           self.consider_vacuity,
-                                                                                                           self.min_support)
-                            # self.basic_discovery_results,= self.discover_constraint(self.event_log, constraint,
-                            #                                                        self.consider_vacuity)
-                            if constraint_satisfaction:
-                                self.process_model.constraints.append(constraint.copy())
-
+                            candidates.append({"template": template, "activities": list(item_set),
+                                               "condition": ("", ""), "n": i + 1})
             elif length == 2:
+                activities = sorted(item_set)
                 for template in DeclareModelTemplate.get_binary_not_shortcut_templates():
-                    # constraint = {"template": templ, "activities": ', '.join(item_set), "condition": ("", "", "")}
-                    constraint = {"template": template, "activities": list(item_set), "condition": ("", "")}
-                    # self.basic_discovery_results,= self.discover_constraint(self.event_log, constraint,
-                    #                                                        self.consider_vacuity)
-                    constraint_satisfaction = ConstraintChecker().constraint_checking_with_support(constraint,
-                                                                                                   self.event_log,
-                                                                                                   self.consider_vacuity,
-                                                                                                   self.min_support)
-                    if constraint_satisfaction:
-                        self.process_model.constraints.append(constraint.copy())
-                    # constraint['activities'] = ', '.join(reversed(list(item_set)))
-
-                    constraint['activities'] = list(reversed(list(item_set)))
-                    # self.basic_discovery_results,= self.discover_constraint(self.event_log, constraint,
-                    #                                                        self.consider_vacuity)
-                    constraint_satisfaction = ConstraintChecker().constraint_checking_with_support(constraint,
-                                                                                                   self.event_log,
-                                                                                                   self.consider_vacuity,
-                                                                                                   self.min_support)
-                    if constraint_satisfaction:
-                        self.process_model.constraints.append(constraint.copy())
-        self.process_model.set_constraints()
-        return self.process_model
+                    candidates.append({"template": template, "activities": list(activities), "condition": ("", "")})
+                    candidates.append({"template": template, "activities": list(reversed(activities)),
+                                       "condition": ("", "")})
+        return candidates
+
+    @staticmethod
+    def get_shards(candidates: List[dict], workers: int, shards_per_worker: int = 4) -> List[Tuple[int, int]]:
+        """
+        Splits the candidates in contiguous ranges with roughly the same number of candidates, about shards_per_worker
+        for each worker. The candidates on the same activities, in any order, are never split: the subsumption
+        hierarchy only relates them, so each shard is planned as in the sequential run.
+        """
+        starts = [idx for idx in range(len(candidates))
+                  if idx == 0 or set(candidates[idx]['activities']) != set(candidates[idx - 1]['activities'])]
+        num_shards = max(1, min(len(starts), workers * shards_per_worker))
+        bounds = [0]
+        for start in starts[1:]:
+            if start >= len(candidates) * len(bounds) / num_shards:
+                bounds.append(start)
+        bounds.append(len(candidates))
+        return [(lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:]) if lo < hi]
+
+    def check_candidates(self, candidates: List[dict]) -> List[bool]:
+        """
+        Checks whether each candidate constraint is satisfied by at least min_support of the traces. The candidates
+        whose support is bounded below the minimum support by the co-occurrence matrix of the log are not checked at
+        all. The others are checked in rounds planned by SubsumptionPlanner along the subsumption hierarchy of the
+        templates, so that the outcome of many candidates is inferred from the candidates implying them or implied by
+        them; the number of candidates not checked thanks to it is kept in saved_checks. In each round, the candidates
+        without conditions are checked together with check_positions, the others one by one with check_support.
+        """
+        tmp_model = DeclareModel()
+        tmp_model.constraints = list(candidates)
+        tmp_model.set_constraints()
+        checker = SinglePassConstraintChecker(tmp_model, self.consider_vacuity, self.event_log.activity_key)
+        bounds = SupportBounds(self.event_log.get_cooccurrence_matrix(), self.consider_vacuity)
+        planner = SubsumptionPlanner(candidates)
+        # The bound of a constraint is never above the bounds of the constraints it implies, so the constraints
+        # implying a candidate out of bounds are out of bounds too
+        for idx, constraint in enumerate(candidates):
+            if not bounds.can_reach(constraint, self.min_support):
+                planner.decisions[idx] = False
+
+        round_ids = planner.get_round()
+        while round_ids:
+            positional_ids = [idx for idx in round_ids if checker.positional[idx]]
+            for idx in round_ids:
+                if not checker.positional[idx]:
+                    planner.decide(idx, self.check_support(candidates[idx]))
+            for idx, supported in zip(positional_ids, self.check_positions(checker, positional_ids)):
+                planner.decide(idx, supported)
+            round_ids = planner.get_round()
+        self.saved_checks = planner.num_inferred
+        return [bool(decision) for decision in planner.decisions]
+
+    def check_positions(self, checker: SinglePassConstraintChecker, constraint_ids: List[int]) -> List[bool]:
+        """
+        Checks whether each of the given constraints of the checker, without conditions, is satisfied by at least
+        min_support of the traces, with a single traversal of the variants of the log. The satisfied traces of each
+        constraint are counted while the variants are visited from the most frequent one, and a constraint is no longer
+        checked once its counter reaches the minimum support or cannot reach it with the remaining traces.
+        """
+        supported = np.zeros(len(constraint_ids), dtype=bool)
+        num_traces = self.event_log.get_length()
+        if num_traces == 0 or not constraint_ids:
+            return supported.tolist()
+        if self.variant_positions is None:
+            self.variant_positions = self.get_variant_positions(self.event_log)
+        ids = np.array(constraint_ids, dtype=np.int64)
+        min_sat = ceil(num_traces * self.min_support)
+        sat_ctr = np.zeros(len(constraint_ids), dtype=np.int64)
+        unchecked = num_traces
+        active = np.arange(len(constraint_ids))
+        for positions, length, count in sorted(self.variant_positions, key=lambda variant: -variant[2]):
+            if len(active) == 0:
+                break
+            states = checker.check_positions(positions, length, ids[active].tolist())
+            sat_ctr[active] += count * np.fromiter((state == TraceState.SATISFIED for state in states), dtype=bool,
+                                                   count=len(states))
+            unchecked -= count
+            # The constraints above the minimum support, or that cannot reach it, are decided
+            reached = (sat_ctr[active] > 0) & (sat_ctr[active] / num_traces >= self.min_support)
+            supported[active[reached]] = True
+            active = active[~reached & (unchecked >= min_sat - sat_ctr[active])]
+        return supported.tolist()
+
+    def check_support(self, constraint: dict) -> bool:
+        """
+        Checks whether a constraint is satisfied by at least min_support of the traces. Constraints without conditions
+        are checked once per variant on the positions of its activities, without reading the events; the others are
+        checked on each trace with ConstraintChecker.constraint_checking_with_support.
+        """
+        tmp_model = DeclareModel()
+        tmp_model.constraints.append(constraint)
+        tmp_model.set_constraints()
+        checker = SinglePassConstraintChecker(tmp_model, self.consider_vacuity, self.event_log.activity_key)
+        if checker.needs_events:
+            return ConstraintChecker().constraint_checking_with_support(constraint, self.event_log,
+                                                                        self.consider_vacuity, self.min_support)
+
+        if self.variant_positions is None:
+            self.variant_positions = self.get_variant_positions(self.event_log)
+        num_traces = self.event_log.get_length()
+        min_sat = ceil(num_traces * self.min_support)
+        sat_ctr = 0
+        unchecked = num_traces
+        for positions, length, count in self.variant_positions:
+            trc_res = checker.check_trace_conformance(range(length), positions)
+            if trc_res[0] is None:
+                break
+            unchecked -= count
+            if trc_res[0].state == TraceState.SATISFIED:
+                sat_ctr += count
+                # If the constraint is already above the minimum support, return it directly
+                if sat_ctr / num_traces >= self.min_support:
+                    return True
+            # If there aren't enough more traces to reach the minimum support, return nothing
+            if unchecked < min_sat - sat_ctr:
+                return False
+        return False
+
+    @staticmethod
+    def get_variant_positions(event_log: D4PyEventLog,
+                              first_trace: int = 0) -> List[Tuple[Dict[str, np.ndarray], int, int]]:
+        """
+        Returns the activity positions, the length and the number of traces of each variant of the log, among the
+        traces from first_trace on. The traces of a variant share the same positions dictionary.
+        """
+        variants: Dict[int, List] = {}
+        for positions in event_log.get_activity_positions()[first_trace:]:
+            variants.setdefault(id(positions), [positions, 0])[1] += 1
+        return [(positions, sum(len(activity_positions) for activity_positions in positions.values()), count)
+                for positions, count in variants.values()]
 
     """
     def filter_discovery(self, min_support: float = 0, output_path: str = None) \
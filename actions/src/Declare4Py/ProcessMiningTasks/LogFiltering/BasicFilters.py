@@ -1,5 +1,7 @@
 from src.Declare4Py.D4PyEventLog import D4PyEventLog
 
+import numpy as np
+
 import pm4py
 from pm4py.objects.log.obj import EventLog
 from typing import Union, Set, List
@@ -26,10 +28,10 @@ class BasicFilters:
 
         """
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_time_range(self.event_log.log, start_date, end_date, mode, 
+            return pm4py.filter_time_range(self.event_log.get_log(), start_date, end_date, mode, 
                                            self.event_log.timestamp_key, self.event_log.case_id_key)
         else:
-            filtered_time_range = pm4py.filter_time_range(self.event_log.log, start_date, end_date, mode)
+            filtered_time_range = pm4py.filter_time_range(self.event_log.get_log(), start_date, end_date, mode)
             return filtered_time_range
 
     def filter_case_performance(self, min_performance: float, max_performance: float) -> EventLog:
@@ -45,10 +47,10 @@ class BasicFilters:
 
         """
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_case_performance(self.event_log.log, min_performance, max_performance,
+            return pm4py.filter_case_performance(self.event_log.get_log(), min_performance, max_performance,
                                                  self.event_log.timestamp_key, self.event_log.case_id_key)
         else:
-            filtered_case_performance = pm4py.filter_case_performance(self.event_log.log, min_performance,
+            filtered_case_performance = pm4py.filter_case_performance(self.event_log.get_log(), min_performance,
                                                                       max_performance)
             return filtered_case_performance
 
@@ -66,10 +68,10 @@ class BasicFilters:
 
         """
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_start_activities(self.event_log.log, activities, retain, self.activity_key,
+            return pm4py.filter_start_activities(self.event_log.get_log(), activities, retain, self.activity_key,
                                                  self.event_log.timestamp_key, self.event_log.case_id_key)
         else:
-            filtered_start_activities = pm4py.filter_start_activities(self.event_log.log, activities)
+            filtered_start_activities = pm4py.filter_start_activities(self.event_log.get_log(), activities)
             return filtered_start_activities
 
     def filter_end_activities(self, activities: [Set[str], List[str]], retain: bool = True) -> EventLog:
@@ -86,50 +88,45 @@ class BasicFilters:
 
         """
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_end_activities(self.event_log.log, activities, retain, self.activity_key,
+            return pm4py.filter_end_activities(self.event_log.get_log(), activities, retain, self.activity_key,
                                                self.event_log.timestamp_key, self.event_log.case_id_key)
         else:
-            filter_activities = pm4py.filter_end_activities(self.event_log.log, activities)
+            filter_activities = pm4py.filter_end_activities(self.event_log.get_log(), activities)
             return filter_activities
 
     def filter_variants_top_k(self, k: int) -> EventLog:
         """
-        Keeps the top-k variants of the log.
+        Keeps the top-k variants of the log, read from the variant table of the log. The kept traces stay in the order
+        of the log.
 
         Args:
             k: number of variants that should be kept
-            activity_key: attribute to be used for the activity
 
         Returns:
             Returns log containing top-k variants.
 
         """
-        if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_variants_top_k(self.event_log.log, k, self.activity_key, self.event_log.timestamp_key,
-                                               self.event_log.case_id_key)
-        else:
-            variants_top_k = pm4py.filter_variants_top_k(self.event_log.log, k)
-            return variants_top_k
+        variant_table = self.event_log.get_variant_table()
+        return self.event_log.select_log(variant_table.get_trace_ids(variant_table.get_top_k(k)))
 
     def filter_variants(self, variants: [Set[str], List[str]], retain: bool = True) -> EventLog:
         """
-        Filter a log by a specified set of variants.
+        Filter a log by a specified set of variants, looked up in the variant table of the log.
 
         Args:
             variants: collection of variants to filter;
                 A variant should be specified as a list of tuples of activity names, e.g., [('a', 'b', 'c')]
             retain: if True all traces conforming to the specified variants are retained; if False, all those traces are removed
-            activity_key: attribute to be used for the activity
 
         Returns:
             Returns filtered log on specified variants.
         """
-        if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_variants(self.event_log.log, variants, retain, self.activity_key,
-                                         self.event_log.timestamp_key, self.event_log.case_id_key)
-        else:
-            filtered_variants = pm4py.filter_variants(self.event_log.log, variants)
-            return filtered_variants
+        variant_table = self.event_log.get_variant_table()
+        variant_ids = [variant_table.get_variant_id(variant) for variant in variants]
+        trace_ids = variant_table.get_trace_ids([variant_id for variant_id in variant_ids if variant_id is not None])
+        if not retain:
+            trace_ids = np.setdiff1d(np.arange(variant_table.num_traces), trace_ids)
+        return self.event_log.select_log(trace_ids.tolist())
 
     def filter_event_attribute_values(self, attribute_key: str, values: Union[Set[str], List[str]], level: str = "case",
                                       retain: bool = True, ) -> EventLog:
@@ -149,9 +146,9 @@ class BasicFilters:
 
         """
         if packaging.version.parse(pm4py.__version__) > packaging.version.Version("2.3.1"):
-            return pm4py.filter_event_attribute_values(self.event_log.log, attribute_key, values, level, retain,
+            return pm4py.filter_event_attribute_values(self.event_log.get_log(), attribute_key, values, level, retain,
                                                        self.event_log.case_id_key)
         else:
-            filtered_event_attribute_val = pm4py.filter_event_attribute_values(self.event_log.log, attribute_key,
+            filtered_event_attribute_val = pm4py.filter_event_attribute_values(self.event_log.get_log(), attribute_key,
                                                                                values, level, retain)
             return filtered_event_attribute_val
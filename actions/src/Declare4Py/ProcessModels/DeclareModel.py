@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import functools
 import re
 import typing
 from abc import ABC
+from datetime import timedelta
 from enum import Enum
 
 from src.Declare4Py.ProcessModels.LTLModel import LTLModel
@@ -339,6 +341,68 @@ class DeclareModelConditionParserUtility:
         except Exception:
             raise SyntaxError
 
+    def compile_data_cond(self, cond: str) -> typing.Optional[typing.Callable]:
+        """
+        Parse and compile the data condition into a function of the activation (A) and target (T) events
+        Parameters
+        ----------
+        cond: str
+            Could be activation or target condition
+
+        Returns
+        -------
+            a function f(A, T) returning the truth value of the condition, None if the condition is always true
+        """
+        return self._compile("data", cond)
+
+    def compile_time_cond(self, condition: str) -> typing.Optional[typing.Callable]:
+        """
+        Parse and compile the time condition into a function of the activation (A) and target (T) events
+        Parameters
+        ----------
+        condition: str
+
+        Returns
+        -------
+            a function f(A, T) returning the truth value of the condition, None if the condition is always true
+        """
+        return self._compile("time", condition)
+
+    @staticmethod
+    def conjunction(*conditions: typing.Optional[typing.Callable]) -> typing.Optional[typing.Callable]:
+        """
+        Combines compiled conditions, evaluated left to right, into a single one. None (always true) are dropped
+        """
+        conditions = [condition for condition in conditions if condition is not None]
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        if len(conditions) == 2:
+            first, second = conditions
+            return lambda A, T: first(A, T) and second(A, T)
+        return lambda A, T: all(condition(A, T) for condition in conditions)
+
+    _condition_globals = {'__builtins__': None, 'timedelta': timedelta, 'abs': abs, 'float': float}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _compile(kind: str, condition: str) -> typing.Optional[typing.Callable]:
+        # Conditions are shared by many constraints (and by the candidates of the miner), so they are compiled once.
+        # The cache is bounded, since long-running processes such as the action server parse conditions of many models
+        parser = DeclareModelConditionParserUtility()
+        py_cond = parser.parse_time_cond(condition) if kind == "time" else parser.parse_data_cond(condition)
+        if py_cond == "True":
+            return None
+        try:
+            return eval(compile(f"lambda A, T: {py_cond}", "<condition>", "eval"),
+                        DeclareModelConditionParserUtility._condition_globals)
+        except SyntaxError:
+            # Malformed conditions fail only when they are evaluated, as they did when evaluated from source
+            def function(A, T):
+                raise SyntaxError(f"Condition not properly formatted: {condition}")
+            return function
+
 
 class DeclareModelAttributeType(str, Enum):
     """An Enum class that specifies types of attributes of the Declare model
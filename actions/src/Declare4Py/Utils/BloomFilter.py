@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import math
+from typing import Hashable
+
+"""
+Fixed-size approximate set of hashable items
+"""
+
+
+class BloomFilter:
+    """
+    Set of items that only answers membership, in a fixed number of bits: an added item is always found, an item never
+    added is found with probability about false_positive_rate as long as at most capacity items are added, and more
+    often beyond. Items cannot be removed. The items are hashed with hash, so the filter is only valid in the process
+    that filled it.
+
+    Args:
+        capacity: the number of items the filter is sized for.
+        false_positive_rate: the probability of finding an item never added, when the filter holds capacity items.
+    """
+
+    def __init__(self, capacity: int, false_positive_rate: float = 0.001):
+        if capacity < 1:
+            raise RuntimeError(f"{capacity} not a valid capacity. Allowed values goes from 1.")
+        if not 0 < false_positive_rate < 1:
+            raise RuntimeError("The false positive rate must be in range (0, 1).")
+        self.num_bits: int = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        self.num_hashes: int = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.num_items: int = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: Hashable):
+        # Double hashing, the second hash is odd so that the positions differ
+        first = hash(item)
+        second = hash((item, 0x9E3779B9)) | 1
+        return ((first + i * second) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, item: Hashable) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.num_items += 1
+
+    def __contains__(self, item: Hashable) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self) -> int:
+        return self.num_items
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+        self.num_items = 0
@@ -0,0 +1,625 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel, DeclareModelTemplate
+from src.Declare4Py.Utils.Declare.Checkers import CheckerResult, ConstraintChecker, TemplateConstraintChecker
+from src.Declare4Py.Utils.Declare.TraceStates import TraceState
+
+"""
+Single-pass conformance checking of all the constraints of a model on completed traces.
+
+Each supported template has an incremental checker that consumes only the events whose activity appears in the
+constraint and computes the same CheckerResult as the corresponding TemplateConstraintChecker.mp* method. Constraints
+without conditions are instead answered from the sorted positions of their activities in the trace, without looking
+at the events.
+"""
+
+NO_POSITIONS = np.empty(0, dtype=np.int64)
+
+
+def binary_state(num_activations: int, num_violations: int, vacuous_satisfaction: bool) -> TraceState:
+    if not vacuous_satisfaction and num_activations == 0:
+        return TraceState.VIOLATED
+    return TraceState.VIOLATED if num_violations > 0 else TraceState.SATISFIED
+
+
+class IncrementalChecker:
+    """
+    Base class of the incremental checkers. The engine calls reset at the beginning of each trace, on_event for each
+    event whose activity is in the activities of the constraint and result at the end of the trace.
+    """
+
+    def __init__(self, activities: List[str], rules: dict, concept_name: str = "concept:name"):
+        self.activities: List[str] = activities
+        self.rules: dict = rules
+        self.concept_name: str = concept_name
+
+    def reset(self) -> None:
+        pass
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        pass
+
+    def result(self, trace: list) -> CheckerResult:
+        raise NotImplementedError
+
+    def is_positional(self) -> bool:
+        """
+        True if the constraint has no conditions, so check_positions gives its result.
+        """
+        return self.rules["activation_time"] is None and self.rules["correlation_time"] is None
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        """
+        Computes the result of an unconditioned constraint from the positions of the activities in a trace.
+
+        Args:
+            positions: dictionary from the activities of the trace to the sorted array of their positions.
+            length: the number of events of the trace.
+        """
+        raise NotImplementedError
+
+    def get_positions(self, positions: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        return positions.get(self.activities[0], NO_POSITIONS), positions.get(self.activities[-1], NO_POSITIONS)
+
+
+class BinaryChecker(IncrementalChecker):
+    """
+    Base class of the binary templates, whose activations are either matched by a target or not. A match fulfills
+    the activation, or violates it for the negative templates.
+    """
+
+    negative = False
+    num_pendings: Optional[int] = 0
+
+    def matched_result(self, num_activations: int, num_matched: int) -> CheckerResult:
+        if self.negative:
+            num_fulfillments, num_violations = num_activations - num_matched, num_matched
+        else:
+            num_fulfillments, num_violations = num_matched, num_activations - num_matched
+        return CheckerResult(num_fulfillments=num_fulfillments, num_violations=num_violations,
+                             num_pendings=self.num_pendings, num_activations=num_activations,
+                             state=binary_state(num_activations, num_violations, self.rules["vacuous_satisfaction"]))
+
+
+def count_alternations(activations: np.ndarray, targets: np.ndarray) -> int:
+    """
+    Counts the targets preceded by an activation after the previous target, an event that is both an activation and
+    a target counts as preceding itself.
+    """
+    if len(activations) == 0 or len(targets) == 0:
+        return 0
+    seen = np.searchsorted(activations, targets, side='right')
+    return int(seen[0] > 0) + int(np.count_nonzero(seen[1:] != seen[:-1]))
+
+
+def count_successors(positions: np.ndarray, successors: np.ndarray) -> int:
+    """
+    Counts the positions p such that p + 1 is in the successors.
+    """
+    if len(positions) == 0 or len(successors) == 0:
+        return 0
+    following = positions + 1
+    found = successors.take(np.searchsorted(successors, following), mode='clip')
+    return int(np.count_nonzero(found == following))
+
+
+class CardinalityChecker(IncrementalChecker):
+
+    def reset(self) -> None:
+        self.num_activations = 0
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activation_rules = self.rules["activation_time"]
+        if activation_rules is None or activation_rules(event, trace[0]):
+            self.num_activations += 1
+
+    def get_state(self, n: int) -> TraceState:
+        raise NotImplementedError
+
+    def result(self, trace: list) -> CheckerResult:
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=self.get_state(self.rules["n"]))
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        self.num_activations = len(positions.get(self.activities[0], NO_POSITIONS))
+        return self.result([])
+
+
+class ExistenceChecker(CardinalityChecker):
+
+    def get_state(self, n: int) -> TraceState:
+        return TraceState.VIOLATED if self.num_activations < n else TraceState.SATISFIED
+
+
+class AbsenceChecker(CardinalityChecker):
+
+    def get_state(self, n: int) -> TraceState:
+        return TraceState.VIOLATED if self.num_activations >= n else TraceState.SATISFIED
+
+
+class ExactlyChecker(CardinalityChecker):
+
+    def get_state(self, n: int) -> TraceState:
+        return TraceState.SATISFIED if self.num_activations == n else TraceState.VIOLATED
+
+
+class InitChecker(IncrementalChecker):
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.check_event(trace[0])
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        return self.position_result(positions, 0)
+
+    def position_result(self, positions: Dict[str, np.ndarray], position: int) -> CheckerResult:
+        # The position is either the first or the last of the trace, so it can only be the first or the last one of
+        # the activity
+        activations = positions.get(self.activities[0], NO_POSITIONS)
+        state = TraceState.VIOLATED
+        if len(activations) and position in (activations[0], activations[-1]):
+            state = TraceState.SATISFIED
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=state)
+
+    def check_event(self, event: dict) -> CheckerResult:
+        activation_rules = self.rules["activation"]
+        state = TraceState.VIOLATED
+        if event[self.concept_name] == self.activities[0]:
+            if activation_rules is None or activation_rules(event, None):
+                state = TraceState.SATISFIED
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=state)
+
+
+class EndChecker(InitChecker):
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.check_event(trace[-1])
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        return self.position_result(positions, length - 1)
+
+
+class ChoiceChecker(IncrementalChecker):
+
+    def reset(self) -> None:
+        self.a_or_b_occurs = False
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activation_rules = self.rules["activation_time"]
+        if not self.a_or_b_occurs and (activation_rules is None or activation_rules(event, trace[0])):
+            self.a_or_b_occurs = True
+
+    def result(self, trace: list) -> CheckerResult:
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=TraceState.SATISFIED if self.a_or_b_occurs else TraceState.VIOLATED)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        self.a_or_b_occurs = any(len(activity_positions) for activity_positions in self.get_positions(positions))
+        return self.result([])
+
+
+class ExclusiveChoiceChecker(IncrementalChecker):
+
+    def reset(self) -> None:
+        self.a_occurs = False
+        self.b_occurs = False
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activation_rules = self.rules["activation_time"]
+        activity = event[self.concept_name]
+        if not self.a_occurs and activity == self.activities[0]:
+            if activation_rules is None or activation_rules(event, trace[0]):
+                self.a_occurs = True
+        if not self.b_occurs and activity == self.activities[1]:
+            if activation_rules is None or activation_rules(event, trace[0]):
+                self.b_occurs = True
+
+    def result(self, trace: list) -> CheckerResult:
+        state = TraceState.SATISFIED if self.a_occurs ^ self.b_occurs else TraceState.VIOLATED
+        return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
+                             state=state)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        a, b = self.get_positions(positions)
+        self.a_occurs, self.b_occurs = len(a) > 0, len(b) > 0
+        return self.result([])
+
+
+class RespondedExistenceChecker(BinaryChecker):
+    """
+    An activation is fulfilled by any target of the trace, before or after it. The targets already seen are kept to
+    check the new activations, the activations not fulfilled yet are checked against the new targets.
+    """
+
+    def reset(self) -> None:
+        self.pendings = []
+        self.targets = []
+        self.num_matched = 0
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
+        activity = event[self.concept_name]
+        if activity == self.activities[0]:
+            if activation_rules is None or activation_rules(event, None):
+                if any(correlation_rules is None or correlation_rules(event, T) for T in self.targets):
+                    self.num_matched += 1
+                else:
+                    self.pendings.append(event)
+
+        if activity == self.activities[1]:
+            if self.pendings:
+                self.pendings, num_matched = TemplateConstraintChecker.match_pendings(self.pendings, event,
+                                                                                      correlation_rules)
+                self.num_matched += num_matched
+            self.targets.append(event)
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.matched_result(self.num_matched + len(self.pendings), self.num_matched)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        a, b = self.get_positions(positions)
+        return self.matched_result(len(a), len(a) if len(b) else 0)
+
+
+class NotRespondedExistenceChecker(RespondedExistenceChecker):
+    negative = True
+
+
+class ResponseChecker(BinaryChecker):
+
+    def reset(self) -> None:
+        self.pendings = []
+        self.num_matched = 0
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
+        activity = event[self.concept_name]
+        if activity == self.activities[0]:
+            if activation_rules is None or activation_rules(event, None):
+                self.pendings.append(event)
+
+        if self.pendings and activity == self.activities[1]:
+            self.pendings, num_matched = TemplateConstraintChecker.match_pendings(self.pendings, event,
+                                                                                  correlation_rules)
+            self.num_matched += num_matched
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.matched_result(self.num_matched + len(self.pendings), self.num_matched)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        # An activation is matched by a target at the same or at a later position
+        a, b = self.get_positions(positions)
+        if len(a) == 0 or len(b) == 0:
+            return self.matched_result(len(a), 0)
+        return self.matched_result(len(a), int(np.searchsorted(a, b[-1], side='right')))
+
+
+class NotResponseChecker(ResponseChecker):
+    negative = True
+
+
+class AlternateResponseChecker(BinaryChecker):
+
+    def reset(self) -> None:
+        self.pending = None
+        self.num_activations = 0
+        self.num_fulfillments = 0
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activity = event[self.concept_name]
+        if activity == self.activities[0]:
+            activation_rules = self.rules["activation"]
+            if activation_rules is None or activation_rules(event, None):
+                self.pending = event
+                self.num_activations += 1
+
+        if activity == self.activities[1] and self.pending is not None:
+            correlation_rules = self.rules["correlation_time"]
+            if correlation_rules is None or correlation_rules(self.pending, event):
+                self.pending = None
+                self.num_fulfillments += 1
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.matched_result(self.num_activations, self.num_fulfillments)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        # A target fulfills the last activation after the previous target
+        a, b = self.get_positions(positions)
+        return self.matched_result(len(a), count_alternations(a, b))
+
+
+class ChainResponseChecker(BinaryChecker):
+    """
+    Looks ahead at the event following each activation, the trace is completed so it is always available.
+    """
+
+    def reset(self) -> None:
+        self.num_activations = 0
+        self.num_matched = 0
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        if event[self.concept_name] != self.activities[0]:
+            return
+        activation_rules = self.rules["activation"]
+        if activation_rules is None or activation_rules(event, None):
+            self.num_activations += 1
+            if index < len(trace) - 1 and trace[index + 1][self.concept_name] == self.activities[1]:
+                correlation_rules = self.rules["correlation_time"]
+                if correlation_rules is None or correlation_rules(event, trace[index + 1]):
+                    self.num_matched += 1
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.matched_result(self.num_activations, self.num_matched)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        a, b = self.get_positions(positions)
+        return self.matched_result(len(a), count_successors(a, b))
+
+
+class NotChainResponseChecker(ChainResponseChecker):
+    negative = True
+
+
+class PrecedenceChecker(BinaryChecker):
+
+    alternate = False
+    num_pendings = None
+
+    def reset(self) -> None:
+        self.num_activations = 0
+        self.num_matched = 0
+        self.Ts = []
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        activity = event[self.concept_name]
+        if activity == self.activities[0]:
+            self.Ts.append(event)
+
+        if activity == self.activities[1]:
+            activation_rules = self.rules["activation"]
+            if activation_rules is None or activation_rules(event, None):
+                self.num_activations += 1
+                correlation_rules = self.rules["correlation_time"]
+                for T in self.Ts:
+                    if correlation_rules is None or correlation_rules(event, T):
+                        self.num_matched += 1
+                        break
+                if self.alternate:
+                    self.Ts = []
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.matched_result(self.num_activations, self.num_matched)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        # An activation is matched by a target at the same or at an earlier position
+        a, b = self.get_positions(positions)
+        if self.alternate:
+            return self.matched_result(len(b), count_alternations(a, b))
+        if len(a) == 0 or len(b) == 0:
+            return self.matched_result(len(b), 0)
+        return self.matched_result(len(b), len(b) - int(np.searchsorted(b, a[0])))
+
+
+class AlternatePrecedenceChecker(PrecedenceChecker):
+    alternate = True
+
+
+class NotPrecedenceChecker(PrecedenceChecker):
+    negative = True
+
+
+class ChainPrecedenceChecker(BinaryChecker):
+
+    num_pendings = None
+
+    def reset(self) -> None:
+        self.num_activations = 0
+        self.num_matched = 0
+
+    def on_event(self, index: int, event: dict, trace: list) -> None:
+        if event[self.concept_name] != self.activities[1]:
+            return
+        activation_rules = self.rules["activation"]
+        if activation_rules is None or activation_rules(event, None):
+            self.num_activations += 1
+            if index != 0 and trace[index - 1][self.concept_name] == self.activities[0]:
+                correlation_rules = self.rules["correlation_time"]
+                if correlation_rules is None or correlation_rules(event, trace[index - 1]):
+                    self.num_matched += 1
+
+    def result(self, trace: list) -> CheckerResult:
+        return self.matched_result(self.num_activations, self.num_matched)
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int) -> CheckerResult:
+        a, b = self.get_positions(positions)
+        return self.matched_result(len(b), count_successors(a, b))
+
+
+class NotChainPrecedenceChecker(ChainPrecedenceChecker):
+    negative = True
+
+
+# Keyed by template name, the members of DeclareModelTemplate are empty strings for hashing and comparisons
+INCREMENTAL_CHECKERS = {
+    DeclareModelTemplate.EXISTENCE.templ_str: ExistenceChecker,
+    DeclareModelTemplate.ABSENCE.templ_str: AbsenceChecker,
+    DeclareModelTemplate.EXACTLY.templ_str: ExactlyChecker,
+    DeclareModelTemplate.INIT.templ_str: InitChecker,
+    DeclareModelTemplate.END.templ_str: EndChecker,
+    DeclareModelTemplate.CHOICE.templ_str: ChoiceChecker,
+    DeclareModelTemplate.EXCLUSIVE_CHOICE.templ_str: ExclusiveChoiceChecker,
+    DeclareModelTemplate.RESPONDED_EXISTENCE.templ_str: RespondedExistenceChecker,
+    DeclareModelTemplate.RESPONSE.templ_str: ResponseChecker,
+    DeclareModelTemplate.ALTERNATE_RESPONSE.templ_str: AlternateResponseChecker,
+    DeclareModelTemplate.CHAIN_RESPONSE.templ_str: ChainResponseChecker,
+    DeclareModelTemplate.PRECEDENCE.templ_str: PrecedenceChecker,
+    DeclareModelTemplate.ALTERNATE_PRECEDENCE.templ_str: AlternatePrecedenceChecker,
+    DeclareModelTemplate.CHAIN_PRECEDENCE.templ_str: ChainPrecedenceChecker,
+    DeclareModelTemplate.NOT_RESPONDED_EXISTENCE.templ_str: NotRespondedExistenceChecker,
+    DeclareModelTemplate.NOT_RESPONSE.templ_str: NotResponseChecker,
+    DeclareModelTemplate.NOT_PRECEDENCE.templ_str: NotPrecedenceChecker,
+    DeclareModelTemplate.NOT_CHAIN_RESPONSE.templ_str: NotChainResponseChecker,
+    DeclareModelTemplate.NOT_CHAIN_PRECEDENCE.templ_str: NotChainPrecedenceChecker,
+}
+
+# Templates whose result only depends on the first or the last event, they do not need the events of the trace
+POSITIONAL_TEMPLATES = (DeclareModelTemplate.INIT.templ_str, DeclareModelTemplate.END.templ_str)
+
+
+class SinglePassConstraintChecker:
+    """
+    Checks all the constraints of a model on completed traces with a single traversal of each trace. Every event is
+    dispatched, through an index from activities to checkers, only to the constraints it can activate or fulfill.
+
+    The results are the same of ConstraintChecker.check_trace_conformance. Constraints without conditions are checked
+    on the positions of their activities and do not need the events. Templates without an incremental checker are
+    checked with TemplateConstraintChecker.
+
+    Args:
+        decl_model: the Declare model.
+        consider_vacuity: True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+        concept_name: the attribute with the activity of the events.
+        compiled_rules: the rules returned by ConstraintChecker.compile_model, compiled if None.
+        max_cached_variants: maximum number of variants whose positional results are kept, see
+            check_trace_conformance.
+    """
+
+    def __init__(self, decl_model: DeclareModel, consider_vacuity: bool = False, concept_name: str = "concept:name",
+                 compiled_rules: List[Optional[dict]] = None, max_cached_variants: int = 1024):
+        self.decl_model: DeclareModel = decl_model
+        self.concept_name: str = concept_name
+        if compiled_rules is None:
+            compiled_rules = ConstraintChecker.compile_model(decl_model, consider_vacuity)
+        self.compiled_rules: List[Optional[dict]] = compiled_rules
+        # For each constraint its incremental checker, None if it is checked by TemplateConstraintChecker
+        self.checkers: List[Optional[IncrementalChecker]] = []
+        self.index: Dict[str, List[int]] = {}
+        # Constraints without conditions, answered from the positions of the activities
+        self.positional: List[bool] = []
+        for idx, constraint in enumerate(decl_model.constraints):
+            checker_class = INCREMENTAL_CHECKERS.get(constraint['template'].templ_str)
+            if checker_class is None or compiled_rules[idx] is None:
+                self.checkers.append(None)
+                self.positional.append(False)
+                continue
+            checker = checker_class(constraint['activities'], compiled_rules[idx], concept_name)
+            self.checkers.append(checker)
+            self.positional.append(checker.is_positional())
+            if not self.positional[-1] and constraint['template'].templ_str not in POSITIONAL_TEMPLATES:
+                for activity in dict.fromkeys(constraint['activities']):
+                    self.index.setdefault(activity, []).append(idx)
+        self.has_positional: bool = any(self.positional)
+        # LRU of the results of the positional checks for each positions dictionary, kept with the dictionary to keep
+        # its id valid
+        self.max_cached_variants: int = max_cached_variants
+        self.variant_results: OrderedDict[int, Tuple[Dict[str, np.ndarray], List[Optional[CheckerResult]]]] = \
+            OrderedDict()
+        self.event_checkers: List[IncrementalChecker] = [checker for checker, positional in
+                                                         zip(self.checkers, self.positional)
+                                                         if checker is not None and not positional]
+
+    def clear_cache(self) -> None:
+        """
+        Drops the cached results of the variants, e.g. when the checker is reused on another log.
+        """
+        self.variant_results.clear()
+
+    @property
+    def needs_events(self) -> bool:
+        """
+        False if all the constraints are answered from the positions of the activities, the trace passed to
+        check_trace_conformance can then be any sequence with its length.
+        """
+        return bool(self.event_checkers) or any(checker is None and rules is not None
+                                                for checker, rules in zip(self.checkers, self.compiled_rules))
+
+    def check_positions(self, positions: Dict[str, np.ndarray], length: int,
+                        constraint_ids: Sequence[int]) -> List[TraceState]:
+        """
+        Returns the states of the given constraints on a trace, which must all be positional (see positional), from
+        the positions of the activities and the length of the trace only. Unlike check_trace_conformance, the results
+        are not cached with the positions.
+        """
+        checkers = self.checkers
+        return [checkers[idx].check_positions(positions, length).state for idx in constraint_ids]
+
+    def check_trace_conformance(self, trace, positions: Dict[str, np.ndarray] = None) -> List[Optional[CheckerResult]]:
+        """
+        Checks the constraints of the model on a trace. The results are in the order of the constraints of the model,
+        one for each constraint: the constraints that cannot be checked, because their conditions are not properly
+        formatted, have None.
+
+        Args:
+            trace: the trace.
+            positions: the sorted positions of each activity in the trace, see D4PyEventLog.get_activity_positions.
+                They are computed from the trace if None.
+        """
+        for checker in self.event_checkers:
+            checker.reset()
+        positional_results = None
+        if positions is not None:
+            # The traces of the same variant share the positions, and so the results of the positional checks
+            cached = self.variant_results.get(id(positions))
+            if cached is not None and cached[0] is positions:
+                positional_results = cached[1]
+                self.variant_results.move_to_end(id(positions))
+        if positional_results is None and self.has_positional:
+            shared = positions is not None
+            if not shared:
+                positions = D4PyEventLog.index_activity_positions([event[self.concept_name] for event in trace])
+            length = len(trace)
+            positional_results = [checker.check_positions(positions, length) if positional else None
+                                  for checker, positional in zip(self.checkers, self.positional)]
+            if shared and self.max_cached_variants > 0:
+                self.variant_results[id(positions)] = (positions, positional_results)
+                self.variant_results.move_to_end(id(positions))
+                if len(self.variant_results) > self.max_cached_variants:
+                    self.variant_results.popitem(last=False)
+
+        checkers = self.checkers
+        failed = set()
+        if self.index:
+            for index, event in enumerate(trace):
+                constraint_ids = self.index.get(event[self.concept_name])
+                if constraint_ids is None:
+                    continue
+                for idx in constraint_ids:
+                    if idx in failed:
+                        continue
+                    try:
+                        checkers[idx].on_event(index, event, trace)
+                    except SyntaxError:
+                        failed.add(idx)
+
+        trace_results = []
+        for idx, constraint in enumerate(self.decl_model.constraints):
+            rules = self.compiled_rules[idx]
+            if rules is None:
+                trace_results.append(None)
+                continue
+            try:
+                if idx in failed:
+                    raise SyntaxError
+                if self.positional[idx]:
+                    trace_results.append(positional_results[idx])
+                elif checkers[idx] is None:
+                    trace_results.append(TemplateConstraintChecker(trace, True, constraint['activities'], rules,
+                                                                   self.concept_name).get_template(
+                        constraint['template'])())
+                else:
+                    trace_results.append(checkers[idx].result(trace))
+            except SyntaxError:
+                trace_results.append(None)
+                # TODO: use python logger
+                print('Condition not properly formatted for constraint "'
+                      + self.decl_model.serialized_constraints[idx] + '".')
+        return trace_results
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from src.Declare4Py.CooccurrenceMatrix import CooccurrenceMatrix
+from src.Declare4Py.ProcessModels.DeclareModel import DeclareModelTemplate
+
+"""
+Upper bounds of the support of Declare constraints, read from the co-occurrence matrix of the log.
+"""
+
+# Binary templates whose activations are fulfilled only by a target in the trace
+POSITIVE_TEMPLATES = {template.templ_str for template in (
+    DeclareModelTemplate.RESPONDED_EXISTENCE, DeclareModelTemplate.RESPONSE, DeclareModelTemplate.ALTERNATE_RESPONSE,
+    DeclareModelTemplate.CHAIN_RESPONSE, DeclareModelTemplate.PRECEDENCE, DeclareModelTemplate.ALTERNATE_PRECEDENCE,
+    DeclareModelTemplate.CHAIN_PRECEDENCE)}
+NEGATIVE_TEMPLATES = {template.templ_str for template in (
+    DeclareModelTemplate.NOT_RESPONDED_EXISTENCE, DeclareModelTemplate.NOT_RESPONSE,
+    DeclareModelTemplate.NOT_PRECEDENCE, DeclareModelTemplate.NOT_CHAIN_RESPONSE,
+    DeclareModelTemplate.NOT_CHAIN_PRECEDENCE)}
+
+
+class SupportBounds:
+    """
+    Bounds the number of traces that can satisfy a constraint before checking it. For instance, without vacuity a trace
+    satisfies Response[a, b] only if it contains both a and b. The conditions of a constraint only restrict the events
+    that activate or fulfill it, so the bounds relying on every occurrence of an activity being an activation are not
+    used for the constraints with conditions. The templates without a bound are bounded by the number of traces.
+
+    Args:
+        matrix: the co-occurrence matrix of the log.
+        consider_vacuity: True means that vacuously satisfied traces are considered as satisfied, violated otherwise.
+    """
+
+    def __init__(self, matrix: CooccurrenceMatrix, consider_vacuity: bool):
+        self.matrix: CooccurrenceMatrix = matrix
+        self.consider_vacuity: bool = consider_vacuity
+
+    def get_bound(self, constraint: dict) -> int:
+        """
+        Returns an upper bound of the number of traces of the log satisfying the constraint.
+        """
+        matrix = self.matrix
+        num_traces = matrix.num_traces
+        template = constraint['template']
+        templ_str = template.templ_str
+        activities = constraint['activities']
+        conditioned = any(condition and condition.strip() for condition in constraint.get('condition', ()))
+
+        if not template.is_binary:
+            occurrences = matrix.get_occurrences(activities[0])
+            if templ_str == DeclareModelTemplate.INIT.templ_str:
+                return matrix.get_first(activities[0])
+            if templ_str == DeclareModelTemplate.END.templ_str:
+                return matrix.get_last(activities[0])
+            if templ_str in (DeclareModelTemplate.EXISTENCE.templ_str, DeclareModelTemplate.EXACTLY.templ_str):
+                return occurrences if constraint['n'] >= 1 else num_traces
+            if templ_str == DeclareModelTemplate.ABSENCE.templ_str and constraint['n'] == 1 and not conditioned:
+                return num_traces - occurrences
+            return num_traces
+
+        activity_a, activity_b = activities[0], activities[1]
+        both = matrix.get_cooccurrences(activity_a, activity_b)
+        if templ_str == DeclareModelTemplate.CHOICE.templ_str:
+            return matrix.get_occurrences(activity_a) + matrix.get_occurrences(activity_b) - both
+        if templ_str == DeclareModelTemplate.EXCLUSIVE_CHOICE.templ_str:
+            either = matrix.get_occurrences(activity_a) + matrix.get_occurrences(activity_b) - both
+            return either if conditioned else either - both
+        activation = activity_b if template.reverseActivationTarget else activity_a
+        if templ_str in POSITIVE_TEMPLATES:
+            # An activation is fulfilled only if the target is in the trace, without activations the trace is
+            # satisfied only with vacuity
+            if not self.consider_vacuity:
+                return both
+            return num_traces if conditioned else num_traces - matrix.get_occurrences(activation) + both
+        if templ_str in NEGATIVE_TEMPLATES and not self.consider_vacuity:
+            return matrix.get_occurrences(activation)
+        return num_traces
+
+    def can_reach(self, constraint: dict, min_support: float) -> bool:
+        """
+        False if the constraint cannot be satisfied by any trace or by at least min_support of the traces, so it does
+        not need to be checked.
+        """
+        bound = self.get_bound(constraint)
+        return bound > 0 and bound / self.matrix.num_traces >= min_support
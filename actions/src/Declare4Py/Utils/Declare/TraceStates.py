@@ -6,4 +6,6 @@ class TraceState(str, Enum):
     SATISFIED = "Satisfied"
     POSSIBLY_VIOLATED = "Possibly Violated"
     POSSIBLY_SATISFIED = "Possibly Satisfied"
+    # The monitor no longer knows the state of the case
+    UNKNOWN = "Unknown"
 
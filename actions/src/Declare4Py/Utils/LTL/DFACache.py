@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import stat
+import threading
+import warnings
+from collections import OrderedDict
+from importlib import metadata
+from typing import Optional
+
+from logaut import ltl2dfa
+from pylogics.parsers import parse_ltl
+from pythomata.impl.symbolic import SymbolicAutomaton
+
+from src.Declare4Py.Utils.LTL.CompiledDFA import CompiledDFA
+from src.Declare4Py.Utils.utils import Utils
+
+"""
+Caching of the automata compiled from LTL formulas
+"""
+
+CACHE_FORMAT_VERSION = 1
+# Libraries whose objects are pickled in the persistent cache, their versions are part of the keys of the files
+PICKLED_LIBRARIES = ("logaut", "pylogics", "pythomata")
+DEFAULT_CACHE_DIR = os.environ.get("DECLARE4PY_DFA_CACHE",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "declare4py", "dfa"))
+
+
+class DFACache:
+    """
+    Two-level cache of minimized automata: an in-memory LRU and a directory of pickled automata that survives
+    restarts. Entries are keyed by the normalized formula and the backend used to build the automaton, the files also
+    by the versions of the libraries of the pickled automata. A file that cannot be loaded is a cache miss, and only
+    the files of the current user that no one else can write are unpickled.
+
+    Args:
+        max_size: maximum number of automata kept in memory.
+        cache_dir: directory of the persistent cache, None disables it.
+    """
+
+    def __init__(self, max_size: int = 128, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.max_size: int = max_size
+        self.cache_dir: Optional[str] = cache_dir
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(formula: str, backend: str) -> str:
+        return f"{backend}|{Utils.normalize_formula(formula)}"
+
+    def get_dfa(self, formula: str, backend: str = "lydia", parsed_formula=None) -> SymbolicAutomaton:
+        """
+        Returns the minimized automaton of a formula, building it only if it is not cached in memory nor on disk.
+
+        Args:
+            formula: the LTL formula, normalized before being used as a key.
+            backend: the logaut backend, either lydia or ltlf2dfa.
+            parsed_formula: the already parsed formula, if available.
+        """
+        return self._get_entry(formula, backend, parsed_formula)["dfa"]
+
+    def get_compiled(self, formula: str, backend: str = "lydia", parsed_formula=None) -> CompiledDFA:
+        """
+        Returns the explicit transition table of a formula, see CompiledDFA.
+        """
+        entry = self._get_entry(formula, backend, parsed_formula)
+        if entry.get("compiled") is None:
+            entry["compiled"] = CompiledDFA(entry["dfa"], backend)
+        return entry["compiled"]
+
+    def clear(self, persistent: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+        if persistent and self.cache_dir is not None and os.path.isdir(self.cache_dir):
+            for file_name in os.listdir(self.cache_dir):
+                if file_name.endswith(".dfa"):
+                    os.remove(os.path.join(self.cache_dir, file_name))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_entry(self, formula: str, backend: str, parsed_formula) -> dict:
+        key = self.get_key(formula, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        dfa = self._load(key)
+        if dfa is None:
+            if parsed_formula is None:
+                parsed_formula = parse_ltl(Utils.normalize_formula(formula))
+            dfa = ltl2dfa(parsed_formula, backend=backend)
+            dfa = dfa.minimize()
+            self._store(key, dfa)
+
+        entry = {"dfa": dfa, "compiled": None}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def get_library_versions() -> str:
+        versions = []
+        for library in PICKLED_LIBRARIES:
+            try:
+                versions.append(f"{library}={metadata.version(library)}")
+            except metadata.PackageNotFoundError:
+                versions.append(f"{library}=unknown")
+        return ",".join(versions)
+
+    def _get_file_key(self, key: str) -> str:
+        # The pickles of other versions of the libraries may not load, or load different objects
+        return f"{CACHE_FORMAT_VERSION}|{LIBRARY_VERSIONS}|{key}"
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(self._get_file_key(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.dfa")
+
+    @staticmethod
+    def _is_trusted(path: str) -> bool:
+        """
+        Unpickling runs code, so only the files of the current user that no one else can write are loaded.
+        """
+        if not hasattr(os, "getuid"):
+            return True
+        file_stat = os.stat(path)
+        return file_stat.st_uid == os.getuid() and not file_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+    def _load(self, key: str) -> Optional[SymbolicAutomaton]:
+        if self.cache_dir is None:
+            return None
+        # Any failure, e.g. a pickle of objects no longer importable, is a cache miss and the automaton is rebuilt
+        try:
+            path = self._path(key)
+            if not self._is_trusted(path):
+                return None
+            with open(path, "rb") as file:
+                stored_key, dfa = pickle.load(file)
+        except Exception:
+            return None
+        return dfa if stored_key == self._get_file_key(key) else None
+
+    def _store(self, key: str, dfa: SymbolicAutomaton) -> None:
+        if self.cache_dir is None:
+            return
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            path = self._path(key)
+            # Write to a temporary file first, so that concurrent processes never read a partial pickle
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                pickle.dump((self._get_file_key(key), dfa), file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, AttributeError, TypeError) as e:
+            warnings.warn(f"Unable to store the automaton in the cache: {e}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+
+LIBRARY_VERSIONS = DFACache.get_library_versions()
+
+
+dfa_cache = DFACache()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import random
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.Declare4Py.CompactEventLog import CompactEventLog
+
+"""
+Table of the trace variants of an event log
+"""
+
+Variant = Tuple[str, ...]
+
+
+class VariantTable:
+    """
+    The variants of a log, i.e. the distinct sequences of activities of its traces. The id of a variant is its rank in
+    order of first appearance in the log; for each variant the table keeps its activities and the indices and case ids
+    of its traces, so its frequency is the number of its traces. The table is built once from the compact log and is
+    kept up to date trace by trace with add_trace when traces are appended to the log.
+    """
+
+    def __init__(self):
+        self.variants: List[Variant] = []
+        self.trace_ids: List[List[int]] = []
+        self.case_ids: List[List[str]] = []
+        self._index: Dict[Variant, int] = {}
+        self._variant_of = array('q')
+        self._variant_of_array: Optional[np.ndarray] = None
+
+    @staticmethod
+    def from_compact_log(compact_log: CompactEventLog) -> VariantTable:
+        """
+        Builds the table from the variants grouped by the compact log, see CompactEventLog.get_variants.
+        """
+        table = VariantTable()
+        variant_codes, variant_of = compact_log.get_variants()
+        table.variants = [tuple(compact_log.activities[code] for code in codes.tolist()) for codes in variant_codes]
+        table._index = {variant: variant_id for variant_id, variant in enumerate(table.variants)}
+        # The traces sorted by variant, each variant is a contiguous range of sorted traces
+        order = np.argsort(variant_of, kind='stable')
+        bounds = np.cumsum(np.bincount(variant_of, minlength=len(variant_codes)))[:-1]
+        table.trace_ids = [trace_ids.tolist() for trace_ids in np.split(order, bounds)] if len(variant_codes) else []
+        table.case_ids = [[compact_log.case_ids[trace_id] for trace_id in trace_ids] for trace_ids in table.trace_ids]
+        table._variant_of = array('q', variant_of.tolist())
+        return table
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    @property
+    def num_traces(self) -> int:
+        return len(self._variant_of)
+
+    def add_trace(self, activities: Sequence[str], case_id: str) -> int:
+        """
+        Adds a trace after the last one of the table.
+
+        Returns:
+            the id of the variant of the trace, a new one if no trace of the table has its activities.
+        """
+        variant = tuple(activities)
+        variant_id = self._index.setdefault(variant, len(self.variants))
+        if variant_id == len(self.variants):
+            self.variants.append(variant)
+            self.trace_ids.append([])
+            self.case_ids.append([])
+        self.trace_ids[variant_id].append(self.num_traces)
+        self.case_ids[variant_id].append(case_id)
+        self._variant_of.append(variant_id)
+        self._variant_of_array = None
+        return variant_id
+
+    def get_variant_id(self, activities: Sequence[str]) -> Optional[int]:
+        return self._index.get(tuple(activities))
+
+    def get_variant_of(self) -> np.ndarray:
+        """
+        Returns the variant id of each trace.
+        """
+        if self._variant_of_array is None:
+            self._variant_of_array = np.array(self._variant_of, dtype=np.int64)
+        return self._variant_of_array
+
+    def get_frequencies(self) -> np.ndarray:
+        return np.array([len(trace_ids) for trace_ids in self.trace_ids], dtype=np.int64)
+
+    def get_top_k(self, k: int) -> List[int]:
+        """
+        Returns the ids of the k most frequent variants, by decreasing frequency. As in pm4py, the variants with the
+        same frequency are ranked by decreasing sequence of activities.
+        """
+        ranking = sorted(range(len(self)), key=lambda variant_id: (len(self.trace_ids[variant_id]),
+                                                                   self.variants[variant_id]), reverse=True)
+        return ranking[:max(k, 0)]
+
+    def get_trace_ids(self, variant_ids: Sequence[int]) -> np.ndarray:
+        """
+        Returns the sorted indices of the traces of the given variants.
+        """
+        trace_ids = [self.trace_ids[variant_id] for variant_id in set(variant_ids)]
+        return np.sort(np.concatenate(trace_ids)).astype(np.int64) if trace_ids else np.zeros(0, dtype=np.int64)
+
+    def get_variant_ids(self, trace_ids: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        Returns the sorted ids of the variants of the given traces, of all the traces if None.
+        """
+        if trace_ids is None:
+            return np.arange(len(self), dtype=np.int64)
+        return np.unique(self.get_variant_of()[np.asarray(trace_ids, dtype=np.int64)])
+
+    def sample(self, k: int, trace_ids: Optional[Sequence[int]] = None, replace: bool = True) -> List[Variant]:
+        """
+        Draws k variants uniformly among the distinct variants of the given traces, of all the traces if None.
+
+        Args:
+            k: the number of variants.
+            trace_ids: the traces whose variants are drawn.
+            replace: if False, the variants are distinct and at most as many as the variants of the traces.
+        """
+        variant_ids = self.get_variant_ids(trace_ids).tolist()
+        if not variant_ids:
+            return []
+        if replace:
+            drawn = random.choices(variant_ids, k=k)
+        else:
+            drawn = random.sample(variant_ids, k=min(k, len(variant_ids)))
+        return [self.variants[variant_id] for variant_id in drawn]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the table with a row for each variant: its id, activities, frequency and case ids.
+        """
+        return pd.DataFrame({"variant": np.arange(len(self), dtype=np.int64), "activities": self.variants,
+                             "frequency": self.get_frequencies(), "case_ids": self.case_ids})
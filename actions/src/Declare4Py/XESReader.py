@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import gzip
+import sys
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+from src.Declare4Py.CompactEventLog import CompactEventLog
+
+"""
+Streaming reader of XES files
+"""
+
+# Types of the XES attributes (the local name of their tag) and their raw value
+RawValue = Tuple[str, str]
+
+
+class XESReader:
+    """
+    Reads a XES (or .xes.gz) file directly into a CompactEventLog with iterparse, without building pm4py objects. Only
+    the activity, the timestamp and the case id are read, plus the requested attributes. The elements of a trace are
+    dropped once parsed and the timestamps are converted in batches, so the memory used besides the arrays of the log
+    is bounded by the size of a trace.
+
+    Args:
+        log_path: the path of the XES file.
+        activity_key: the event attribute with the activity.
+        timestamp_key: the event attribute with the timestamp.
+        case_id_key: the attribute with the case id, named as in the DataFrame format of the log, i.e. prefixed by
+            case: if it is a trace attribute.
+        batch_size: the number of timestamps converted at once.
+    """
+
+    def __init__(self, log_path: str, activity_key: str = "concept:name", timestamp_key: str = "time:timestamp",
+                 case_id_key: str = "case:concept:name", batch_size: int = 65536):
+        self.log_path: str = log_path
+        self.activity_key: str = activity_key
+        self.timestamp_key: str = timestamp_key
+        self.case_id_key: str = case_id_key
+        self.batch_size: int = batch_size
+
+    def read(self, attributes: Sequence[str] = ()) -> CompactEventLog:
+        """
+        Reads the log. The other attributes are read again from the file when they are requested to the compact log.
+
+        Args:
+            attributes: the attributes loaded in the same pass, the trace attributes are prefixed by case:.
+        """
+        scan = self.scan(attributes, True)
+        return CompactEventLog(list(scan["activities"]), scan["codes"], scan["offsets"], scan["timestamps"],
+                               scan["case_ids"], self.activity_key, self.timestamp_key, self.case_id_key,
+                               scan["attribute_names"], self.read_columns, scan["columns"])
+
+    def read_columns(self, attributes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """
+        Reads the values of the given attributes for all the events, in the order of the file. The values of the trace
+        attributes, prefixed by case:, are repeated for each event of the trace.
+        """
+        return self.scan(attributes, False)["columns"]
+
+    def scan(self, attributes: Sequence[str], with_events: bool) -> dict:
+        """
+        Parses the file once. If with_events is False, only the lengths of the traces and the requested attributes are
+        collected.
+        """
+        trace_attributes = {CompactEventLog.get_trace_key(attribute): attribute for attribute in attributes
+                            if attribute.startswith("case:")}
+        event_attributes = [attribute for attribute in attributes if not attribute.startswith("case:")]
+        trace_id_key = CompactEventLog.get_trace_key(self.case_id_key)
+        activity_key = self.activity_key if with_events else None
+        timestamp_key = self.timestamp_key if with_events else None
+
+        vocabulary: Dict[Optional[str], int] = {}
+        codes = array('i')
+        timestamps = array('q')
+        batch: List[Optional[str]] = []
+        offsets = array('q', [0])
+        case_ids: List[str] = []
+        # Dictionaries keep the attribute names in order of first appearance
+        event_names: Dict[str, None] = {}
+        trace_names: Dict[str, None] = {}
+        event_values: Dict[str, List[Optional[RawValue]]] = {attribute: [] for attribute in event_attributes}
+        trace_values: Dict[str, List[Optional[RawValue]]] = {attribute: [] for attribute in trace_attributes}
+        num_events = 0
+
+        with self.open() as xes_file:
+            for _, elem in etree.iterparse(xes_file, events=("end",), tag=("{*}event", "{*}trace"),
+                                           huge_tree=True):
+                if elem.tag.endswith("event"):
+                    activity = timestamp = None
+                    found: Dict[str, RawValue] = {}
+                    for child in elem:
+                        key = child.get("key")
+                        if key is None:
+                            continue
+                        if key == activity_key:
+                            activity = child.get("value")
+                        elif key == timestamp_key:
+                            timestamp = child.get("value")
+                        if key in event_values:
+                            found[key] = (etree.QName(child).localname, child.get("value"))
+                        if with_events:
+                            event_names[key] = None
+                    for attribute, values in event_values.items():
+                        values.append(found.get(attribute))
+                    if with_events:
+                        codes.append(vocabulary.setdefault(activity, len(vocabulary)))
+                        batch.append(timestamp)
+                        if len(batch) == self.batch_size:
+                            timestamps.extend(self.to_nanoseconds(batch))
+                            batch = []
+                    num_events += 1
+                    elem.clear()
+                else:
+                    found = {}
+                    for child in elem:
+                        key = child.get("key")
+                        if key is None:
+                            continue
+                        if key == trace_id_key:
+                            case_ids.append(sys.intern(str(child.get("value"))))
+                        if key in trace_values:
+                            found[key] = (etree.QName(child).localname, child.get("value"))
+                        if with_events:
+                            trace_names[key] = None
+                    for attribute, values in trace_values.items():
+                        values.append(found.get(attribute))
+                    if len(case_ids) < len(offsets):
+                        case_ids.append(sys.intern(str(len(offsets) - 1)))
+                    offsets.append(num_events)
+                    # Drops the trace and the traces before it, which stay attached to the log element otherwise
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
+
+        if batch:
+            timestamps.extend(self.to_nanoseconds(batch))
+        offsets = np.frombuffer(offsets, dtype=np.int64).copy()
+        lengths = np.diff(offsets)
+        columns = {attribute: self.to_column(values) for attribute, values in event_values.items()}
+        columns.update({attribute: np.repeat(self.to_column(trace_values[key]), lengths)
+                        for key, attribute in trace_attributes.items()})
+        return {"activities": [str(activity) for activity in vocabulary],
+                "codes": np.frombuffer(codes, dtype=np.int32).copy(),
+                "timestamps": np.frombuffer(timestamps, dtype=np.int64).copy(),
+                "offsets": offsets, "case_ids": case_ids,
+                "attribute_names": list(event_names) + ["case:" + name for name in trace_names],
+                "columns": columns}
+
+    @staticmethod
+    def to_nanoseconds(values: List[Optional[str]]) -> np.ndarray:
+        return CompactEventLog.to_nanoseconds_array(pd.to_datetime(pd.Series(values), utc=True, format='ISO8601'))
+
+    def open(self):
+        if self.log_path.endswith(".gz"):
+            return gzip.open(self.log_path, "rb")
+        return open(self.log_path, "rb")
+
+    @staticmethod
+    def to_column(values: List[Optional[RawValue]]) -> np.ndarray:
+        """
+        Converts the raw values of an attribute with the types used by pm4py in the DataFrame format: integers and
+        floats are numeric arrays (float with NaN when some values are missing), dates are timestamps in UTC and the
+        other values are strings, NaN when missing.
+        """
+        types = {value[0] for value in values if value is not None}
+        missing = [value is None for value in values]
+        raw = [None if value is None else value[1] for value in values]
+        if types == {"int"} and not any(missing):
+            return np.array(raw, dtype=np.int64)
+        if types and types <= {"int", "float"}:
+            return np.array([np.nan if value is None else float(value) for value in raw], dtype=np.float64)
+        if types == {"date"}:
+            return pd.Series(pd.to_datetime(pd.Series(raw), utc=True, format='ISO8601')).to_numpy()
+        if types == {"boolean"}:
+            column = np.array([np.nan if value is None else value.lower() == "true" for value in raw], dtype=object)
+            return column if any(missing) else column.astype(bool)
+        return np.array([np.nan if value is None else value for value in raw], dtype=object)
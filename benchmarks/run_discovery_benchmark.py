@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from pm4py.objects.log.obj import EventLog
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessMiningTasks.Discovery.DeclareMiner import DeclareMiner
+
+"""
+Checks that the incremental discovery of DeclareMiner gives the model of a full run, and compares their times. The
+miner runs on the first traces of the log, then, as a job started for each batch of new traces would do, it is saved,
+loaded and updated with the batch. After each batch its model must be the one run discovers on the same traces.
+
+Example::
+
+    python -m benchmarks.run_discovery_benchmark "assets/Sepsis Cases.xes.gz" --initial 0.5 --batches 4
+"""
+
+
+def slice_log(event_log: D4PyEventLog, lo: int, hi: int) -> D4PyEventLog:
+    g_log = event_log.get_log()
+    log = EventLog(list(g_log)[lo:hi], attributes=g_log.attributes, extensions=g_log.extensions,
+                   omni_present=g_log.omni_present, classifiers=g_log.classifiers, properties=g_log.properties)
+    return D4PyEventLog(case_name=event_log.case_id_key, log=log)
+
+
+def get_model(miner: DeclareMiner):
+    return list(miner.process_model.activities), list(miner.process_model.serialized_constraints)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark of the incremental DeclareMiner")
+    parser.add_argument("log_path")
+    parser.add_argument("--initial", type=float, default=0.5, help="fraction of the traces of the first run")
+    parser.add_argument("--batches", type=int, default=4, help="number of updates with the remaining traces")
+    parser.add_argument("--min-support", type=float, default=0.8)
+    parser.add_argument("--itemsets-support", type=float, default=0.5)
+    parser.add_argument("--vacuity", action="store_true", help="consider vacuously satisfied traces as satisfied")
+    args = parser.parse_args()
+
+    event_log = D4PyEventLog(case_name="case:concept:name")
+    event_log.parse_xes_log(args.log_path)
+    traces = list(event_log.get_log())
+    first = int(len(traces) * args.initial)
+    params = (args.vacuity, args.min_support, args.itemsets_support)
+
+    miner = DeclareMiner(slice_log(event_log, 0, first), *params)
+    miner.run()
+    bounds = [first + (len(traces) - first) * batch // args.batches for batch in range(args.batches + 1)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        miner_path = os.path.join(tmp_dir, "miner")
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            miner.save(miner_path)
+            miner = DeclareMiner.load(miner_path)
+            start = time.perf_counter()
+            miner.update(traces[lo:hi])
+            update_time = time.perf_counter() - start
+
+            full_miner = DeclareMiner(slice_log(event_log, 0, hi), *params)
+            start = time.perf_counter()
+            full_miner.run()
+            run_time = time.perf_counter() - start
+            if get_model(miner) != get_model(full_miner):
+                raise RuntimeError(f"The model updated with the traces up to {hi} differs from the one of run.")
+            print(f"traces={hi}: update {update_time:.3f}s, run {run_time:.3f}s, "
+                  f"constraints: {len(miner.process_model.constraints)}")
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+
+from pm4py.objects.log.obj import EventLog
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessMiningTasks.ConformanceChecking.LTLAnalyzer import LTLAnalyzer
+from src.Declare4Py.ProcessModels.LTLModel import LTLTemplate
+
+"""
+Compares the sequential and the multi-process replay of LTLAnalyzer.
+
+Example::
+
+    python -m benchmarks.run_ltl_benchmark "assets/Sepsis Cases.xes.gz" --repeat 50 --jobs 1 2 4
+"""
+
+
+def replicate_log(event_log: D4PyEventLog, repeat: int) -> D4PyEventLog:
+    g_log = event_log.get_log()
+    log = EventLog(list(g_log) * repeat, attributes=g_log.attributes, extensions=g_log.extensions,
+                   omni_present=g_log.omni_present, classifiers=g_log.classifiers, properties=g_log.properties)
+    return D4PyEventLog(case_name=event_log.case_id_key, log=log)
+
+
+def build_models(event_log: D4PyEventLog, num_models: int):
+    activities = sorted(event_log.get_event_attribute_values(event_log.activity_key).items(), key=lambda x: -x[1])
+    activities = [activity for activity, _ in activities]
+    models = []
+    for activity_a, activity_b in itertools.permutations(activities, 2):
+        if len(models) == num_models:
+            break
+        models.append(LTLTemplate('response').fill_template([activity_a], [activity_b]))
+    return models
+
+
+def r_time(function, runs: int):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark of the LTLAnalyzer replay")
+    parser.add_argument("log_path")
+    parser.add_argument("--repeat", type=int, default=20, help="number of copies of the log to replay")
+    parser.add_argument("--models", type=int, default=10, help="number of Response formulas to check")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, -1])
+    parser.add_argument("--runs", type=int, default=3, help="the best time over the runs is reported")
+    args = parser.parse_args()
+
+    event_log = D4PyEventLog(case_name="case:concept:name")
+    event_log.parse_xes_log(args.log_path)
+    event_log = replicate_log(event_log, args.repeat)
+    models = build_models(event_log, args.models)
+    analyzer = LTLAnalyzer(event_log, models[0])
+    print(f"Traces: {event_log.get_length()}, events: {sum(len(trace) for trace in event_log.get_log())}, "
+          f"formulas: {len(models)}")
+
+    # Build the automata before timing, so that only the replay is measured
+    analyzer.run_many(models)
+
+    baseline, expected = r_time(lambda: analyzer.run_many(models, jobs=1), args.runs)
+    print(f"jobs=1: {baseline:.3f}s")
+    for jobs in args.jobs:
+        if jobs == 1:
+            continue
+        elapsed, result = r_time(lambda: analyzer.run_many(models, jobs=jobs), args.runs)
+        if not result.equals(expected):
+            raise RuntimeError(f"The verdicts computed with jobs={jobs} differ from the sequential ones.")
+        print(f"jobs={jobs}: {elapsed:.3f}s, speedup {baseline / elapsed:.2f}x")
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import os
+import tempfile
+import time
+import tracemalloc
+
+from lxml import etree
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.XESReader import XESReader
+
+"""
+Compares the pm4py loader of D4PyEventLog with the streaming XESReader, on a log and on a copy of the log enlarged
+with the given number of replicas of each trace.
+
+Example::
+
+    python -m benchmarks.run_xes_benchmark "assets/Sepsis Cases.xes.gz" --repeat 1 10
+"""
+
+
+def replicate_xes(log_path: str, repeat: int, output_path: str) -> None:
+    """
+    Writes a copy of a XES file where each trace is repeated, the case ids of the replicas are suffixed by _<k>.
+    """
+    reader = XESReader(log_path)
+    header = b""
+    with reader.open() as xes_file:
+        while b"<trace" not in header:
+            chunk = xes_file.read(2 ** 20)
+            if not chunk:
+                raise RuntimeError(f"{log_path} has no trace.")
+            header += chunk
+    header = header[:header.index(b"<trace")]
+    with reader.open() as xes_file, gzip.open(output_path, "wb") as output:
+        output.write(header)
+        for _, trace in etree.iterparse(xes_file, events=("end",), tag="{*}trace", huge_tree=True):
+            case_id = next((child for child in trace if child.get("key") == "concept:name"), None)
+            original = case_id.get("value") if case_id is not None else ""
+            for k in range(repeat):
+                if case_id is not None:
+                    case_id.set("value", f"{original}_{k}")
+                output.write(etree.tostring(trace))
+            trace.clear()
+            while trace.getprevious() is not None:
+                del trace.getparent()[0]
+        output.write(b"</log>\n")
+
+
+def load(log_path: str, compact: bool) -> D4PyEventLog:
+    event_log = D4PyEventLog(case_name="case:concept:name")
+    event_log.parse_xes_log(log_path, compact=compact)
+    return event_log
+
+
+def r_time(function, runs: int):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(function) -> int:
+    """
+    Peak of the memory allocated through Python while running the function, the buffers of the XML parser excluded.
+    """
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark of the XES loaders")
+    parser.add_argument("log_path")
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 10], help="replicas of each trace")
+    parser.add_argument("--runs", type=int, default=3, help="the best time over the runs is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for repeat in args.repeat:
+            log_path = args.log_path
+            if repeat > 1:
+                log_path = os.path.join(tmp_dir, f"replicated_{repeat}.xes.gz")
+                replicate_xes(args.log_path, repeat, log_path)
+
+            pm4py_time, pm4py_log = r_time(lambda: load(log_path, False), args.runs)
+            stream_time, stream_log = r_time(lambda: load(log_path, True), args.runs)
+            expected = [[event[pm4py_log.activity_key] for event in trace] for trace in pm4py_log.get_log()]
+            compact_log = stream_log.get_compact_log()
+            if expected != [compact_log.get_trace_activities(i) for i in range(len(compact_log))]:
+                raise RuntimeError(f"The traces read by XESReader differ from the pm4py ones with repeat={repeat}.")
+            num_events = compact_log.num_events
+            del pm4py_log, stream_log, compact_log
+
+            pm4py_peak = peak_memory(lambda: load(log_path, False))
+            stream_peak = peak_memory(lambda: load(log_path, True))
+            print(f"repeat={repeat}, events: {num_events}")
+            print(f"  pm4py:     {pm4py_time:.3f}s, peak {pm4py_peak / 2 ** 20:.1f} MB")
+            print(f"  XESReader: {stream_time:.3f}s, peak {stream_peak / 2 ** 20:.1f} MB, "
+                  f"speedup {pm4py_time / stream_time:.2f}x, memory {pm4py_peak / max(stream_peak, 1):.1f}x less")
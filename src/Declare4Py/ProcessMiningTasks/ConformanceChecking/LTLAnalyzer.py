@@ -1,34 +1,71 @@
 from __future__ import annotations
 
 import multiprocessing
+from typing import Optional, Sequence, Tuple
 
 from pm4py.objects.log.obj import Trace
 from pythomata.impl.symbolic import SymbolicDFA
 
+from src.Declare4Py.CompactEventLog import CompactEventLog
 from src.Declare4Py.D4PyEventLog import D4PyEventLog
 from src.Declare4Py.ProcessMiningTasks.AbstractConformanceChecking import AbstractConformanceChecking
 from src.Declare4Py.ProcessModels.LTLModel import LTLModel
+from src.Declare4Py.Utils.LTL.CompiledDFA import CompiledDFA
+from src.Declare4Py.Utils.LTL.DFACache import dfa_cache
 from src.Declare4Py.Utils.utils import Utils
-from logaut import ltl2dfa
 from functools import reduce
+import numpy as np
 import pandas
 
 """
 Provides basic conformance checking functionalities
 """
 
+# Automata shipped once to each worker process by _init_replay_worker
+_worker_automata = None
+# Codes and offsets of the log mapped from its snapshot by _init_replay_worker, None if the chunks carry the traces
+_worker_traces: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+
+def _init_replay_worker(transitions: np.ndarray, initial_states: np.ndarray, accepting: np.ndarray,
+                        sink: np.ndarray, snapshot_path: Optional[str] = None,
+                        snapshot_id: Optional[str] = None) -> None:
+    global _worker_automata, _worker_traces
+    _worker_automata = (transitions, initial_states, accepting, sink)
+    if snapshot_path is not None:
+        compact_log = CompactEventLog.load(snapshot_path, mmap_mode='r', snapshot_id=snapshot_id)
+        _worker_traces = (compact_log.codes, compact_log.offsets)
+
+
+def _replay_chunk(chunk: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, int]:
+    if _worker_traces is not None:
+        # The chunk is a range of traces of the mapped log
+        lo, hi = chunk
+        codes, offsets = _worker_traces
+        codes, offsets = codes[offsets[lo]:offsets[hi]], offsets[lo:hi + 1] - offsets[lo]
+    else:
+        codes, offsets = chunk
+    transitions, initial_states, accepting, sink = _worker_automata
+    final_states, consumed = CompiledDFA.replay_batch(transitions, initial_states, codes, offsets, sink)
+    return accepting[final_states], consumed
+
 
 class LTLAnalyzer(AbstractConformanceChecking):
 
     def __init__(self, log: D4PyEventLog, ltl_model: LTLModel):
         super().__init__(log, ltl_model)
+        # Number of events replayed by the last run, the replay of a trace stops once its verdict cannot change
+        self.consumed_events: Optional[int] = None
 
     @staticmethod
     def run_single_trace(trace: Trace, dfa: SymbolicDFA, backend, activity_key: str = 'concept:name'):
+        return LTLAnalyzer.run_single_variant([event[activity_key] for event in trace], dfa, backend)
+
+    @staticmethod
+    def run_single_variant(variant: Sequence[str], dfa: SymbolicDFA, backend) -> bool:
         current_states = {dfa.initial_state}
 
-        for event in trace:
-            event = event[activity_key]
+        for event in variant:
             symbol = Utils.parse_activity(event)
 
             if backend == 'lydia':
@@ -44,6 +81,9 @@ class LTLAnalyzer(AbstractConformanceChecking):
                 map(lambda x: dfa.get_successors(x, temp), current_states),
                 set(),
             )
+            if not current_states:
+                # No run of the automaton survives, the trace is rejected whatever follows
+                break
 
         is_accepted = any(dfa.is_accepting(state) for state in current_states)
         return is_accepted
@@ -82,8 +122,7 @@ class LTLAnalyzer(AbstractConformanceChecking):
         if self.process_model is None:
             raise RuntimeError("You must load the LTL model before checking the model.")
         backend2dfa = self.process_model.backend
-        dfa = ltl2dfa(self.process_model.parsed_formula, backend=backend2dfa) #lydia
-        dfa = dfa.minimize()
+        dfa = dfa_cache.get_dfa(self.process_model.formula, backend2dfa, self.process_model.parsed_formula)
         g_log = self.event_log.get_log()
         activity_key = self.event_log.activity_key
         results = []
@@ -94,40 +133,107 @@ class LTLAnalyzer(AbstractConformanceChecking):
 
         return pandas.DataFrame(results, columns=[self.event_log.case_id_key, "accepted"])
 
-    def run(self, jobs: int = 0):
-        workers = jobs
-
-        if jobs == 1 or jobs == 0:
-            sequential = True
-        elif jobs == -1:
-            workers = multiprocessing.cpu_count()
-            sequential = False
-        elif jobs > 1:
-            workers = jobs
-            sequential = False
-        else:
-            raise RuntimeError(f"{jobs} not a valid number of jobs. Allowed values goes from -1.")
+    def run(self, jobs: int = 0, variants: bool = False) -> pandas.DataFrame:
+        """
+        Performs conformance checking for the provided event log and an input LTL model.
 
-        backend2dfa = self.process_model.backend
-        dfa = ltl2dfa(self.process_model.parsed_formula, backend=backend2dfa)  # lydia
-        dfa = dfa.minimize()
-        #pdb.set_trace()
-        g_log = self.event_log.get_log()
-        activity_key = self.event_log.activity_key
-        #pdb.set_trace()
+        Args:
+            jobs: number of worker processes. 0 or 1 run sequentially, -1 uses all the available cores.
+            variants: if True, the DFA is replayed once for each distinct sequence of activities and the verdict is
+                assigned to all the traces following that variant.
+
+        Returns:
+            A pandas Dataframe containing the id of the traces and the result of the conformance check
+        """
+        results = self.run_many([self.process_model], jobs=jobs, variants=variants)
+        results.columns = [self.event_log.case_id_key, "accepted"]
+        return results
 
-        if sequential:
-            results = []
-            for trace in g_log:
-                is_accepted = self.run_single_trace(trace, dfa, backend2dfa, activity_key)
-                results.append([trace.attributes[activity_key], is_accepted])
+    def run_many(self, models: Sequence[LTLModel], jobs: int = 0, variants: bool = False) -> pandas.DataFrame:
+        """
+        Performs conformance checking of several LTL models with a single traversal of the event log. The automata of
+        all the models are advanced together on each trace (or on each variant).
+
+        Args:
+            models: the LTL models to check.
+            jobs: number of worker processes. 0 or 1 run sequentially, -1 uses all the available cores.
+            variants: if True, each distinct sequence of activities is replayed only once.
+
+        Returns:
+            A pandas Dataframe containing the id of the traces and one boolean column for each model, named after its
+            formula, with the result of the conformance check
+        """
+        if self.event_log is None:
+            raise RuntimeError("You must load the log before checking the model.")
+        if any(model is None for model in models) or len(models) == 0:
+            raise RuntimeError("You must load the LTL model before checking the model.")
+        workers = Utils.get_workers(jobs)
+
+        # The automata are replayed on the activity codes of the compact log
+        compact_log = self.event_log.get_compact_log()
+        vocabulary = compact_log.activities
+        if variants:
+            variant_codes, variant_of = compact_log.get_variants()
+            codes = np.concatenate(variant_codes) if variant_codes else compact_log.codes[:0]
+            offsets = np.zeros(len(variant_codes) + 1, dtype=np.int64)
+            np.cumsum([len(trace_codes) for trace_codes in variant_codes], out=offsets[1:])
+        else:
+            variant_of = None
+            codes, offsets = compact_log.codes, compact_log.offsets
+
+        automata = [dfa_cache.get_compiled(model.formula, model.backend, model.parsed_formula) for model in models]
+        transitions, initial_states, accepting, sink = CompiledDFA.stack(automata, vocabulary)
+        if workers == 1:
+            final_states, self.consumed_events = CompiledDFA.replay_batch(transitions, initial_states, codes, offsets,
+                                                                          sink)
+            verdicts = accepting[final_states]
         else:
-            traces = g_log._list
-            with multiprocessing.Pool(processes=workers) as pool:
-                results = pool.map(self.run_single_trace_par, zip(traces, [dfa] * len(traces),
-                                                                  [activity_key] * len(traces)))
+            # The workers attach to the snapshot of the log, if it is mapped, instead of receiving the traces
+            snapshot_path = compact_log.snapshot_path if variant_of is None else None
+            verdicts, self.consumed_events = self.replay_parallel(transitions, initial_states, accepting, sink, codes,
+                                                                  offsets, workers, snapshot_path=snapshot_path,
+                                                                  snapshot_id=compact_log.snapshot_id)
 
-        return pandas.DataFrame(results, columns=[self.event_log.case_id_key, "accepted"])
+        if variant_of is not None:
+            verdicts = verdicts[variant_of]
+
+        results = pandas.DataFrame(verdicts, columns=[model.formula for model in models])
+        results.insert(0, self.event_log.case_id_key, compact_log.case_ids)
+        return results
+
+    @staticmethod
+    def replay_parallel(transitions: np.ndarray, initial_states: np.ndarray, accepting: np.ndarray,
+                        sink: np.ndarray, codes: np.ndarray, offsets: np.ndarray, workers: int,
+                        chunks_per_worker: int = 4, snapshot_path: Optional[str] = None,
+                        snapshot_id: Optional[str] = None) -> Tuple[np.ndarray, int]:
+        """
+        Replays an encoded log with a pool of processes. The automata are sent once to each worker through the pool
+        initializer, while the traces are sent as contiguous chunks of codes with roughly the same number of events.
+        If snapshot_path is given, codes and offsets are those of the snapshot: each worker maps it once and the
+        chunks are only ranges of traces. The snapshot_path is a version of the snapshot (see CompactEventLog.load), so
+        the workers map the snapshot of the parent process even if a newer one was saved meanwhile, and with
+        snapshot_id they check its id before using it.
+
+        Returns:
+            the verdicts of the traces, in the original order, and the number of consumed events.
+        """
+        num_traces = len(offsets) - 1
+        num_chunks = max(1, min(num_traces, workers * chunks_per_worker))
+        bounds = np.searchsorted(offsets, np.linspace(0, offsets[-1], num_chunks + 1), side='left')
+        bounds[0], bounds[-1] = 0, num_traces
+        bounds = np.unique(bounds)
+        if snapshot_path is not None:
+            chunks = [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        else:
+            chunks = [(codes[offsets[lo]:offsets[hi]], offsets[lo:hi + 1] - offsets[lo])
+                      for lo, hi in zip(bounds[:-1], bounds[1:])]
+        with multiprocessing.Pool(processes=workers, initializer=_init_replay_worker,
+                                  initargs=(transitions, initial_states, accepting, sink, snapshot_path,
+                                            snapshot_id)) as pool:
+            results = pool.map(_replay_chunk, chunks)
+        if not results:
+            return np.zeros((0, len(initial_states)), dtype=bool), 0
+        return np.concatenate([verdicts for verdicts, _ in results]), sum(consumed for _, consumed in results)
 
     def run_aggregate(self) -> pandas.DataFrame:
         """
@@ -141,8 +247,8 @@ class LTLAnalyzer(AbstractConformanceChecking):
             raise RuntimeError("You must load the log before checking the model.")
         if self.process_model is None:
             raise RuntimeError("You must load the LTL model before checking the model.")
-        dfa = ltl2dfa(self.process_model.parsed_formula, backend=self.process_model.backend)
-        dfa = dfa.minimize()
+        dfa = dfa_cache.get_dfa(self.process_model.formula, self.process_model.backend,
+                                self.process_model.parsed_formula)
         group = self.event_log.groupby(self.event_log.case_id_key, as_index=True)
         results = group[self.event_log.activity_key].aggregate(self.run_single_trace, dfa=dfa, engine='cython')
 
@@ -1,6 +1,8 @@
 from __future__ import annotations
-from typing import List, Union, Optional
+from typing import Dict, List, Union, Optional
 from src.Declare4Py.Utils.Declare.Checkers import CheckerResult
+from src.Declare4Py.Utils.Declare.TraceStates import TraceState
+import numpy as np
 import pandas as pd
 
 """
@@ -8,55 +10,156 @@ Initializes class ConformanceCheckingResults
 
 Attributes
 -------
-    dict_results : dict
-        dictionary of conformance checking results
+    metrics : dict
+        dictionary with a (traces x constraints) array of conformance checking results for each metric
 """
 
+METRICS = ["num_activations", "num_violations", "num_fulfillments", "num_pendings", "state"]
+# Codes of the states in the state array, the position in the list is the code
+STATES = [TraceState.VIOLATED, TraceState.SATISFIED, TraceState.POSSIBLY_VIOLATED, TraceState.POSSIBLY_SATISFIED]
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+# Marks the missing values, i.e. the None metrics of the CheckerResult objects
+MISSING = -1
+
 
 class MPDeclareResultsBrowser:
+    """
+    Columnar storage of the results of MPDeclareAnalyzer: one dense array of shape (traces, constraints) for each
+    metric, int8 for the states and int32 for the counters.
+
+    Args:
+        matrix_results: the CheckerResult objects of each trace, one for each constraint (None if not checked), None
+            to allocate empty results for num_traces traces that are then filled with set_trace_results.
+        serialized_constraints: the constraints of the model.
+        num_traces: the number of traces, only used when matrix_results is None.
+    """
 
-    def __init__(self, matrix_results: List[List[CheckerResult]], serialized_constraints: List[str]):
+    def __init__(self, matrix_results: Optional[List[List[CheckerResult]]], serialized_constraints: List[str],
+                 num_traces: int = 0):
         self.serialized_constraints = serialized_constraints
-        self.model_check_res: List[List[CheckerResult]] = matrix_results
+        if matrix_results is not None:
+            num_traces = len(matrix_results)
+        shape = (num_traces, len(serialized_constraints))
+        self.metrics: Dict[str, np.ndarray] = {metric: np.full(shape, MISSING, dtype=np.int32)
+                                               for metric in METRICS if metric != "state"}
+        self.metrics["state"] = np.full(shape, MISSING, dtype=np.int8)
+        if matrix_results is not None:
+            for trace_id, trace_results in enumerate(matrix_results):
+                self.set_trace_results(trace_id, trace_results)
+
+    def set_trace_results(self, trace_id: int, trace_results: List[Optional[CheckerResult]]) -> None:
+        """
+        Stores the results of a trace, one for each constraint of the model in its order, None for the constraints
+        that were not checked.
+        """
+        if len(trace_results) != len(self.serialized_constraints):
+            raise RuntimeError(f"Expected {len(self.serialized_constraints)} results for trace {trace_id}, one for "
+                               f"each constraint, got {len(trace_results)}.")
+        for constr_id, result_checker in enumerate(trace_results):
+            if result_checker is None:
+                continue
+            for metric in METRICS:
+                value = getattr(result_checker, metric)
+                if value is None:
+                    continue
+                self.metrics[metric][trace_id, constr_id] = STATE_CODES[value] if metric == "state" else value
+
+    @staticmethod
+    def concatenate(parts: List[MPDeclareResultsBrowser]) -> MPDeclareResultsBrowser:
+        """
+        Joins the results of consecutive slices of a log, in the order of the list.
+        """
+        results = MPDeclareResultsBrowser(None, parts[0].serialized_constraints)
+        results.metrics = {metric: np.concatenate([part.metrics[metric] for part in parts]) for metric in METRICS}
+        return results
+
+    @property
+    def model_check_res(self) -> List[List[CheckerResult]]:
+        """
+        The results as CheckerResult objects, rebuilt from the arrays.
+        """
+        results = []
+        states = self.metrics["state"]
+        for trace_id in range(states.shape[0]):
+            trace_res = []
+            for constr_id in range(states.shape[1]):
+                if states[trace_id, constr_id] == MISSING:
+                    continue
+                values = {metric: self._to_value(self.metrics[metric][trace_id, constr_id])
+                          for metric in METRICS if metric != "state"}
+                trace_res.append(CheckerResult(state=STATES[states[trace_id, constr_id]], **values))
+            results.append(trace_res)
+        return results
 
     def get_metric(self, metric: str, trace_id: int = None, constr_id: int = None) -> Union[pd.DataFrame, List, int]:
         if type(metric) is not str:
             raise RuntimeError("You must specify a metric among num_activations, num_violations, num_fulfillments, "
                                "num_pendings, state.")
-        if metric not in ["num_activations", "num_violations", "num_fulfillments", "num_pendings", "state"]:
+        if metric not in METRICS:
             raise RuntimeError("You must specify a metric among num_activations, num_violations, num_fulfillments, "
                                "num_pendings, state.")
+        values = self.get_metric_array(metric)
         results = []
         if trace_id is None and constr_id is None:
-            for trace_res in self.model_check_res:
-                tmp_list = []
-                for result_checker in trace_res:
-                    tmp_list.append(self.retrieve_metric(result_checker, metric))
-                results.append(tmp_list)
-            results = pd.DataFrame(results, columns=self.serialized_constraints)
+            results = self._to_frame(values)
         elif trace_id is not None and constr_id is None:
-            for result_checker in self.model_check_res[trace_id]:
-                results.append(self.retrieve_metric(result_checker, metric))
+            results = self._to_list(values[trace_id])
         elif trace_id is None and constr_id is not None:
-            for trace_res in self.model_check_res:
-                result_checker = trace_res[constr_id]
-                results.append(self.retrieve_metric(result_checker, metric))
+            results = self._to_list(values[:, constr_id])
         else:
             try:
-                if metric == "state":
-                    results = 0 if getattr(self.model_check_res[trace_id][constr_id], metric).value == 'Violated' else 1
-                else:
-                    results = getattr(self.model_check_res[trace_id][constr_id], metric)
+                results = self._to_value(values[trace_id, constr_id])
             except IndexError:
                 print("The index of the trace must be lower than the log size. The index of the constraint must be "
                       "lower than the total number of constraints in the Declare model.")
             except TypeError as e:
                 print(f"The index of the trace/constraint must be integers or slices, not {e}.")
-            except AttributeError:
-                print("You must specify a metric among num_activations, num_violations, num_fulfillments, "
-                      "num_pendings, state.")
         return results
 
+    def get_metric_array(self, metric: str) -> np.ndarray:
+        """
+        Returns the (traces x constraints) array of a metric, missing values are -1. The state is 0 for the violated
+        constraints and 1 otherwise, as in get_metric.
+        """
+        if metric == "state":
+            states = self.metrics["state"]
+            return np.where(states == MISSING, MISSING, states != STATE_CODES[TraceState.VIOLATED]).astype(np.int8)
+        return self.metrics[metric]
+
+    def get_trace_conformance(self) -> np.ndarray:
+        """
+        Returns the fraction of the constraints that are not violated by each trace.
+        """
+        states = self.metrics["state"]
+        checked = (states != MISSING).sum(axis=1)
+        satisfied = ((states != MISSING) & (states != STATE_CODES[TraceState.VIOLATED])).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return satisfied / checked
+
+    def filter_traces(self, threshold: float, opposite: bool = False) -> np.ndarray:
+        """
+        Returns the indices of the traces whose conformance is above the threshold (below if opposite is True).
+        """
+        conformance = self.get_trace_conformance()
+        return np.flatnonzero(conformance < threshold if opposite else conformance > threshold)
+
+    def _to_frame(self, values: np.ndarray) -> pd.DataFrame:
+        results = pd.DataFrame(values.astype(np.int64), columns=self.serialized_constraints)
+        missing = values == MISSING
+        for col in np.flatnonzero(missing.any(axis=0)):
+            # Same dtypes of a DataFrame built from lists with None: float with NaN, object if all missing
+            column = values[:, col].astype(object if missing[:, col].all() else float)
+            column[missing[:, col]] = None if missing[:, col].all() else np.nan
+            results.isetitem(int(col), column)
+        return results
+
+    @staticmethod
+    def _to_value(value) -> Optional[int]:
+        return None if value == MISSING else int(value)
+
+    def _to_list(self, values: np.ndarray) -> List[Optional[int]]:
+        return [None if value == MISSING else value for value in values.tolist()]
+
     @staticmethod
     def retrieve_metric(result_checker: CheckerResult, metric: str) -> Optional[int]:
         try:
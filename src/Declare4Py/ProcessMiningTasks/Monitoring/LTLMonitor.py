@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import pandas
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessMiningTasks.AbstractMonitoring import AbstractMonitoring
+from src.Declare4Py.ProcessModels.LTLModel import LTLModel
+from src.Declare4Py.Utils.BloomFilter import BloomFilter
+from src.Declare4Py.Utils.Declare.TraceStates import TraceState
+from src.Declare4Py.Utils.LTL.DFACache import dfa_cache
+
+"""
+Provides online monitoring of running cases against an LTL model
+"""
+
+
+class LTLMonitor(AbstractMonitoring):
+    """
+    Event-at-a-time monitor of an LTL model. The monitor keeps, for each running case, only the current state of the
+    compiled automaton of the formula, so processing an event costs a table lookup.
+
+    After each event the monitor answers with a RV-LTL verdict computed on the automaton:
+
+    - SATISFIED: every continuation of the case satisfies the formula;
+    - VIOLATED: no continuation of the case satisfies the formula;
+    - POSSIBLY_SATISFIED: the case satisfies the formula if it ends now, but it can still be violated;
+    - POSSIBLY_VIOLATED: the case violates the formula if it ends now, but it can still be satisfied.
+
+    Cases whose verdict is SATISFIED or VIOLATED cannot change it anymore, so they are kept apart from the open ones
+    with their verdict only.
+
+    The memory of the monitor is bounded by max_cases and max_evicted_cases. A case dropped beyond both is forgotten:
+    by default a later event of a forgotten case starts it from scratch, so its verdicts only cover the events after
+    that one. With max_forgotten_cases the forgotten cases are kept in a Bloom filter and answer UNKNOWN instead, at the
+    price of wrongly answering UNKNOWN for about one new case in a thousand once a case has been forgotten, and more
+    beyond max_forgotten_cases forgotten cases. The counters evicted_cases and forgotten_cases tell whether the limits
+    were reached.
+
+    Args:
+        log: the event log replayed by run, None if the monitor is only fed through process_event.
+        ltl_model: the LTL model to monitor.
+        max_cases: maximum number of running cases kept in memory. When it is exceeded, the least recently updated
+            case with a definitive verdict is dropped, or the least recently updated open case if there is none, and
+            counted in evicted_cases. The ids of the dropped cases are remembered, up to max_evicted_cases of them:
+            their later events and close_case keep answering the definitive verdict, or UNKNOWN for an open case,
+            instead of restarting the case from scratch.
+        max_evicted_cases: maximum number of ids of dropped cases remembered with their verdict. Beyond it, the least
+            recently updated one is forgotten and counted in forgotten_cases.
+        max_forgotten_cases: 0 to start the forgotten cases from scratch at their next event. Otherwise, the number
+            of forgotten cases the Bloom filter of the forgotten cases is sized for; their later events and close_case
+            answer UNKNOWN. The filter takes about 1.8 bytes per case and is allocated when the first case is
+            forgotten.
+
+    Attributes:
+        evicted_cases: the number of cases dropped beyond max_cases.
+        forgotten_cases: the number of dropped cases forgotten beyond max_evicted_cases.
+    """
+
+    def __init__(self, log: Optional[D4PyEventLog], ltl_model: LTLModel, max_cases: int = 10000,
+                 max_evicted_cases: int = 100000, max_forgotten_cases: int = 0):
+        super().__init__(log, ltl_model)
+        if max_cases < 1:
+            raise RuntimeError(f"{max_cases} not a valid number of cases. Allowed values goes from 1.")
+        if max_evicted_cases < 0:
+            raise RuntimeError(f"{max_evicted_cases} not a valid number of evicted cases. Allowed values goes from 0.")
+        if max_forgotten_cases < 0:
+            raise RuntimeError(f"{max_forgotten_cases} not a valid number of forgotten cases. Allowed values goes from "
+                               f"0.")
+        self.max_cases: int = max_cases
+        self.max_evicted_cases: int = max_evicted_cases
+        self.max_forgotten_cases: int = max_forgotten_cases
+        self.evicted_cases: int = 0
+        self.forgotten_cases: int = 0
+        self.dfa = dfa_cache.get_compiled(ltl_model.formula, ltl_model.backend, ltl_model.parsed_formula)
+        # Open cases with the state of the automaton, cases with a definitive verdict, and verdicts of the dropped
+        # cases, each in order of last update
+        self._cases: OrderedDict[Hashable, int] = OrderedDict()
+        self._decided: OrderedDict[Hashable, TraceState] = OrderedDict()
+        self._evicted: OrderedDict[Hashable, TraceState] = OrderedDict()
+        # Bloom filter of the forgotten cases, None until a case is forgotten or if max_forgotten_cases is 0
+        self._forgotten: Optional[BloomFilter] = None
+        self._columns: Dict[str, int] = {}
+
+        accepting = self.dfa.accepting
+        can_accept = self.dfa.can_reach(accepting)
+        can_reject = self.dfa.can_reach(~accepting)
+        self._verdicts: List[TraceState] = []
+        for state in range(self.dfa.num_states):
+            if accepting[state]:
+                self._verdicts.append(TraceState.POSSIBLY_SATISFIED if can_reject[state] else TraceState.SATISFIED)
+            else:
+                self._verdicts.append(TraceState.POSSIBLY_VIOLATED if can_accept[state] else TraceState.VIOLATED)
+
+    def process_event(self, case_id: Hashable, activity: str) -> TraceState:
+        """
+        Advances the automaton of a case with a new event.
+
+        Args:
+            case_id: the identifier of the case.
+            activity: the activity of the event.
+
+        Returns:
+            the verdict of the case after the event, UNKNOWN if the case was dropped while open or, with
+            max_forgotten_cases, forgotten.
+        """
+        for record in (self._decided, self._evicted):
+            verdict = record.get(case_id)
+            if verdict is not None:
+                record.move_to_end(case_id)
+                return verdict
+
+        column = self._columns.get(activity)
+        if column is None:
+            column = self._columns[activity] = self.dfa.column_of(activity)
+        state = self._cases.pop(case_id, None)
+        if state is None:
+            if self._forgotten is not None and case_id in self._forgotten:
+                return TraceState.UNKNOWN
+            state = self.dfa.initial_state
+        state = int(self.dfa.transitions[state, column])
+        verdict = self._verdicts[state]
+        if verdict in (TraceState.SATISFIED, TraceState.VIOLATED):
+            self._decided[case_id] = verdict
+        else:
+            self._cases[case_id] = state
+        if len(self._cases) + len(self._decided) > self.max_cases:
+            self._evict()
+        return verdict
+
+    def _evict(self) -> None:
+        if self._decided:
+            case_id, verdict = self._decided.popitem(last=False)
+        else:
+            case_id, _ = self._cases.popitem(last=False)
+            verdict = TraceState.UNKNOWN
+        self.evicted_cases += 1
+        self._evicted[case_id] = verdict
+        if len(self._evicted) > self.max_evicted_cases:
+            case_id, _ = self._evicted.popitem(last=False)
+            self.forgotten_cases += 1
+            if self.max_forgotten_cases > 0:
+                if self._forgotten is None:
+                    self._forgotten = BloomFilter(self.max_forgotten_cases)
+                self._forgotten.add(case_id)
+
+    def get_state(self, case_id: Hashable) -> TraceState:
+        """
+        Returns the current verdict of a case, a case never seen is in the initial state of the automaton.
+        """
+        for record in (self._decided, self._evicted):
+            verdict = record.get(case_id)
+            if verdict is not None:
+                return verdict
+        state = self._cases.get(case_id)
+        if state is None:
+            if self._forgotten is not None and case_id in self._forgotten:
+                return TraceState.UNKNOWN
+            state = self.dfa.initial_state
+        return self._verdicts[state]
+
+    def close_case(self, case_id: Hashable) -> TraceState:
+        """
+        Completes a case and releases its state.
+
+        Returns:
+            the final verdict of the case, either SATISFIED or VIOLATED, or UNKNOWN if the case was dropped while open
+            or, with max_forgotten_cases, forgotten.
+        """
+        for record in (self._decided, self._evicted):
+            verdict = record.pop(case_id, None)
+            if verdict is not None:
+                return verdict
+        state = self._cases.pop(case_id, None)
+        if state is None:
+            if self._forgotten is not None and case_id in self._forgotten:
+                return TraceState.UNKNOWN
+            state = self.dfa.initial_state
+        return TraceState.SATISFIED if self.dfa.accepting[state] else TraceState.VIOLATED
+
+    def get_running_cases(self) -> List[Hashable]:
+        """
+        Returns the cases kept in memory, the open ones first.
+        """
+        return list(self._cases) + list(self._decided)
+
+    def reset(self) -> None:
+        self._cases.clear()
+        self._decided.clear()
+        self._evicted.clear()
+        self._forgotten = None
+        self.evicted_cases = 0
+        self.forgotten_cases = 0
+
+    def run(self, close_cases: bool = True) -> pandas.DataFrame:
+        """
+        Simulates the online monitoring of the event log, feeding its events to the monitor in timestamp order.
+
+        Args:
+            close_cases: if True, each case is closed after its last event and its final verdict is reported.
+
+        Returns:
+            A pandas Dataframe with the case id, the activity and the verdict of the case after each event. The cases
+            dropped and forgotten meanwhile are counted in evicted_cases and forgotten_cases.
+        """
+        if self.event_log is None:
+            raise RuntimeError("You must load the log before monitoring the model.")
+        g_log = self.event_log.get_log()
+        activity_key = self.event_log.activity_key
+        timestamp_key = self.event_log.timestamp_key
+
+        events = []
+        for trace in g_log:
+            case_id = trace.attributes[activity_key]
+            for position, event in enumerate(trace):
+                is_last = position == len(trace) - 1
+                events.append((event.get(timestamp_key), len(events), case_id, event[activity_key], is_last))
+        if all(timestamp is not None for timestamp, *_ in events):
+            events.sort(key=lambda x: (x[0], x[1]))
+
+        results = []
+        for _, _, case_id, activity, is_last in events:
+            verdict = self.process_event(case_id, activity)
+            if close_cases and is_last:
+                verdict = self.close_case(case_id)
+            results.append([case_id, activity, verdict])
+        return pandas.DataFrame(results, columns=[self.event_log.case_id_key, activity_key, "state"])
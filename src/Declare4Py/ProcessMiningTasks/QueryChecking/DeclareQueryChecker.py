@@ -8,6 +8,8 @@ from src.Declare4Py.ProcessMiningTasks.AbstractQueryChecking import AbstractQuer
 from src.Declare4Py.ProcessMiningTasks.QueryChecking.DeclareResultsBrowser import DeclareResultsBrowser
 from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel, DeclareModelTemplate
 from src.Declare4Py.Utils.Declare.Checkers import ConstraintChecker
+from src.Declare4Py.Utils.Declare.Subsumption import SubsumptionPlanner
+from src.Declare4Py.Utils.Declare.SupportBounds import SupportBounds
 
 """
 Initializes class QueryCheckingResults
@@ -59,6 +61,8 @@ class DeclareQueryChecker(AbstractQueryChecking, ABC):
         self.target_condition: Optional[str] = target_condition if target_condition is not None else ""
         self.time_condition: Optional[str] = time_condition if time_condition is not None else ""
         self.max_declare_cardinality: int = max_declare_cardinality
+        # Number of candidates of the last run decided from the template hierarchy, without checking them
+        self.saved_checks: int = 0
 
     def run(self) -> DeclareResultsBrowser:
         """
@@ -146,7 +150,7 @@ class DeclareQueryChecker(AbstractQueryChecking, ABC):
         targets_to_check = self.event_log.get_event_attribute_values(self.event_log.activity_key) \
             if self.target is None else [self.target]
         if not isinstance(targets_to_check, list):
-            activations_to_check = targets_to_check.keys()
+            targets_to_check = targets_to_check.keys()
 
         activity_combos = []
         for activation in activations_to_check:
@@ -155,7 +159,9 @@ class DeclareQueryChecker(AbstractQueryChecking, ABC):
                     activity_combos.append((activation, target))
 
         # activity_combos = tuple(filter(lambda c: c[0] != c[1], product(activations_to_check, targets_to_check)))
-        query_checker_results = []
+        # The constraints to check, with the row of the results for each of them
+        constraints = []
+        rows = []
         for template_str in templates_to_check:
             template_str, cardinality = re.search(r'(^.+?)(\d*$)', template_str).groups()
             template = DeclareModelTemplate.get_template_from_string(template_str)
@@ -167,50 +173,45 @@ class DeclareQueryChecker(AbstractQueryChecking, ABC):
             if template.is_binary:
                 constraint['condition'] = (self.activation_condition, self.target_condition, self.time_condition)
                 for couple in activity_combos:
-                    # constraint['activities'] = ', '.join(couple)
-                    constraint['activities'] = couple
-
-                    # constraint_str = self.constraint_checking_with_support(constraint)
-                    constraint_satisfaction = ConstraintChecker().constraint_checking_with_support(constraint,
-                                                                                                   self.event_log,
-                                                                                                   self.consider_vacuity,
-                                                                                                   self.min_support)
-                    if constraint_satisfaction:
-                        # res_value = {
-                        #    "template": template_str, "activation": couple[0], "target": couple[1],
-                        #    "activation_condition": self.activation_condition, "target_condition": self.target_condition,
-                        #    "time_condition": self.time_condition
-                        # }
-                        # self.basic_query_checking_results[constraint_str] = res_value
-                        query_checker_results.append([template_str, couple[0], couple[1], self.activation_condition,
-                                                         self.target_condition, self.time_condition])
-                        if self.return_first:
-                            return DeclareResultsBrowser(query_checker_results)
-
+                    constraints.append({**constraint, 'activities': couple})
+                    rows.append([template_str, couple[0], couple[1], self.activation_condition,
+                                 self.target_condition, self.time_condition])
             else:  # unary template
                 constraint['condition'] = (self.activation_condition, self.time_condition)
                 for activity in activations_to_check:
-                    constraint['activities'] = activity
-
-                    # constraint_str = self.constraint_checking_with_support(constraint)
-                    constraint_satisfaction = ConstraintChecker().constraint_checking_with_support(constraint,
-                                                                                                   self.event_log,
-                                                                                                   self.consider_vacuity,
-                                                                                                   self. min_support)
-
-                    if constraint_satisfaction:
-                        query_checker_results.append([template_str, activity, None, self.activation_condition, None,
-                                                      self.time_condition])
-                        if self.return_first:
-                            return DeclareResultsBrowser(query_checker_results)
-                        # res_value = {
-                        #    "template": template_str, "activation": activity,
-                        #    "activation_condition": self.activation_condition, "time_condition": self.time_condition
-                        # }
-                        # self.basic_query_checking_results[constraint_str] = res_value
+                    constraints.append({**constraint, 'activities': [activity]})
+                    rows.append([template_str, activity, None, self.activation_condition, None, self.time_condition])
+
+        # The constraints whose support is bounded below min_support by the co-occurrence matrix are not checked, the
+        # outcome of the others is inferred when possible from the checked constraints implying them or implied by them
+        bounds = SupportBounds(self.event_log.get_cooccurrence_matrix(), self.consider_vacuity)
+        planner = SubsumptionPlanner(constraints)
+        for idx, constraint in enumerate(constraints):
+            if not bounds.can_reach(constraint, self.min_support):
+                planner.decisions[idx] = False
+
+        def check(idx: int):
+            planner.decide(idx, ConstraintChecker().constraint_checking_with_support(constraints[idx], self.event_log,
+                                                                                     self.consider_vacuity,
+                                                                                     self.min_support))
 
+        query_checker_results = []
+        if self.return_first:
+            # The constraints are checked in order up to the first supported one
+            for idx in range(len(constraints)):
+                if not planner.is_decided(idx):
+                    check(idx)
+                if planner.decisions[idx]:
+                    query_checker_results.append(rows[idx])
+                    break
+            self.saved_checks = planner.num_inferred
+            return DeclareResultsBrowser(query_checker_results)
+
+        round_ids = planner.get_round()
+        while round_ids:
+            for idx in round_ids:
+                check(idx)
+            round_ids = planner.get_round()
+        self.saved_checks = planner.num_inferred
+        query_checker_results = [row for row, supported in zip(rows, planner.decisions) if supported]
         return DeclareResultsBrowser(query_checker_results)
-
-
-
-
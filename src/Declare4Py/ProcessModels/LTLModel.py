@@ -1,8 +1,7 @@
 from abc import ABC
 
-from logaut import ltl2dfa
-
 from src.Declare4Py.ProcessModels.AbstractModel import ProcessModel
+from src.Declare4Py.Utils.LTL.DFACache import dfa_cache
 from pylogics.parsers import parse_ltl
 from src.Declare4Py.Utils.utils import Utils
 from typing import List
@@ -72,8 +71,7 @@ class LTLModel(ProcessModel, ABC):
             raise RuntimeError("You must load the LTL model before checking the model.")
         if self.backend not in ["lydia", "ltlf2dfa"]:
             raise RuntimeError("Only lydia and ltlf2dfa are supported backends.")
-        dfa = ltl2dfa(self.parsed_formula, backend=self.backend)
-        dfa = dfa.minimize()
+        dfa = dfa_cache.get_dfa(self.formula, self.backend, self.parsed_formula)
         if len(dfa.accepting_states) > 0:
             return True
         else:
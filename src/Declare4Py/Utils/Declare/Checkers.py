@@ -1,23 +1,53 @@
 from __future__ import annotations
 
 from abc import ABC
-from datetime import timedelta
 from math import ceil
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from src.Declare4Py.D4PyEventLog import D4PyEventLog
 from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel
 from src.Declare4Py.ProcessModels.DeclareModel import DeclareModelConditionParserUtility, DeclareModelTemplate
 from src.Declare4Py.Utils.Declare.TraceStates import TraceState
 
-glob = {'__builtins__': None}
-
 
 class ConstraintChecker:
 
+    @staticmethod
+    def compile_model(decl_model: DeclareModel, consider_vacuity: bool = False) -> List[Optional[dict]]:
+        """
+        Parses and compiles the conditions of all the constraints of a model once, so that they can be reused for all
+        the traces of a log.
+
+        Parameters
+        ----------
+        :param DeclareModel decl_model: Process mining model
+        :param bool consider_vacuity: True means that vacuously satisfied traces are considered as satisfied, violated otherwise
+
+        Returns
+        -------
+            the compiled rules of each constraint, None for the constraints whose conditions are not properly formatted
+        """
+        compiled_rules = []
+        for idx, constraint in enumerate(decl_model.constraints):
+            rules = {"vacuous_satisfaction": consider_vacuity, "activation": constraint['condition'][0]}
+            if constraint['template'].supports_cardinality:
+                rules["n"] = constraint['n']
+            if constraint['template'].is_binary:
+                rules["correlation"] = constraint['condition'][1]
+            rules["time"] = constraint['condition'][-1]  # time condition is always at last position
+            try:
+                compiled_rules.append(TemplateConstraintChecker.compile_rules(rules))
+            except SyntaxError:
+                # TODO: use python logger
+                print('Condition not properly formatted for constraint "' + decl_model.serialized_constraints[idx]
+                      + '".')
+                compiled_rules.append(None)
+        return compiled_rules
+
     @staticmethod
     def check_trace_conformance(trace: dict, decl_model: DeclareModel, consider_vacuity: bool = False,
-                                concept_name: str = "concept:name") -> List[CheckerResult]:
+                                concept_name: str = "concept:name",
+                                compiled_rules: List[Optional[dict]] = None) -> List[CheckerResult]:
         """
         Checks whether the constraints are fulfillment, violation, pendings, activations etc
 
@@ -26,24 +56,23 @@ class ConstraintChecker:
         :param bool consider_vacuity: True means that vacuously satisfied traces are considered as satisfied, violated otherwise
         :param d4pyEventLog trace: log
         :param DeclareModel decl_model: Process mining model
+        :param compiled_rules: the rules returned by compile_model, if None the conditions are compiled for this trace
         Args:
             concept_name:
             concept_name:
         """
 
+        if compiled_rules is None:
+            compiled_rules = ConstraintChecker.compile_model(decl_model, consider_vacuity)
         # Set containing all constraints that raised SyntaxError in checker functions
-        rules = {"vacuous_satisfaction": consider_vacuity}
         error_constraint_set = set()
         model: DeclareModel = decl_model
         trace_results = []
         for idx, constraint in enumerate(model.constraints):
+            rules = compiled_rules[idx]
+            if rules is None:
+                continue
             constraint_str = model.serialized_constraints[idx]
-            rules["activation"] = constraint['condition'][0]
-            if constraint['template'].supports_cardinality:
-                rules["n"] = constraint['n']
-            if constraint['template'].is_binary:
-                rules["correlation"] = constraint['condition'][1]
-            rules["time"] = constraint['condition'][-1]  # time condition is always at last position
             try:
                 trace_results.append(TemplateConstraintChecker(trace, True, constraint['activities'], rules,
                                                                concept_name).get_template(constraint['template'])())
@@ -71,10 +100,12 @@ class ConstraintChecker:
         tmp_model = DeclareModel()
         tmp_model.constraints.append(constraint)
         tmp_model.set_constraints()
+        compiled_rules = self.compile_model(tmp_model, consider_vacuity)
         sat_ctr = 0
 
         for i, trace in enumerate(event_log.get_log()):
-            trc_res = self.check_trace_conformance(trace, tmp_model, consider_vacuity, event_log.activity_key)
+            trc_res = self.check_trace_conformance(trace, tmp_model, consider_vacuity, event_log.activity_key,
+                                                   compiled_rules)
             if not trc_res:  # Occurring when constraint data conditions are formatted bad
                 break
             # constraint_str, checker_res = next(iter(trc_res.items()))  # trc_res will always have only one element inside
@@ -82,7 +113,7 @@ class ConstraintChecker:
             if checker_res.state == TraceState.SATISFIED:
                 sat_ctr += 1
                 # If the constraint is already above the minimum support, return it directly
-                if sat_ctr / len(event_log.log) >= min_support:
+                if sat_ctr / event_log.get_length() >= min_support:
                     return True #constraint_str
             # If there aren't enough more traces to reach the minimum support, return nothing
             if event_log.get_length() - (i + 1) < ceil(event_log.get_length() * min_support) - sat_ctr:
@@ -94,13 +125,51 @@ class TemplateConstraintChecker(ABC):
 
     def __init__(self, traces: dict, completed: bool, activities: List[str], rules: dict,
                  concept_name: str = "concept:name"):
-        self.declare_parser_utility = DeclareModelConditionParserUtility()
         self.traces: dict = traces
         self.completed: bool = completed
         self.activities: List[str] = activities
-        self.rules: dict = rules
+        self.rules: dict = rules if rules.get("compiled") else self.compile_rules(rules)
         self.concept_name: str = concept_name
 
+    @staticmethod
+    def compile_rules(rules: dict) -> dict:
+        """
+        Compiles the conditions of a constraint into functions f(A, T) of the activation and target events. Conditions
+        that are always true become None, so the checkers can skip their evaluation.
+
+        Parameters
+        ----------
+        rules: dict. textual conditions of the constraint, 'n' and the vacuity flag
+
+        Returns
+        -------
+            a copy of the rules with the compiled 'activation' condition, the conjunction of the activation and time
+            conditions ('activation_time', used by the unary templates) and the conjunction of the correlation and time
+            conditions ('correlation_time', used by the binary templates)
+        """
+        parser = DeclareModelConditionParserUtility()
+        activation = parser.compile_data_cond(rules["activation"])
+        time = parser.compile_time_cond(rules["time"])
+        compiled = dict(rules)
+        compiled["activation"] = activation
+        compiled["activation_time"] = parser.conjunction(activation, time)
+        compiled["correlation_time"] = parser.conjunction(parser.compile_data_cond(rules.get("correlation", "")), time)
+        compiled["compiled"] = True
+        return compiled
+
+    @staticmethod
+    def match_pendings(pendings: list, target, correlation_rules) -> Tuple[list, int]:
+        """
+        Matches the pending activations with a target event in one pass over the list.
+
+        Returns:
+            the activations still pending and the number of activations correlated to the target.
+        """
+        if correlation_rules is None:
+            return [], len(pendings)
+        remaining = [A for A in pendings if not correlation_rules(A, target)]
+        return remaining, len(pendings) - len(remaining)
+
     def get_template(self, template: DeclareModelTemplate):
         """
         We have the classes with each template constraint checker and we invoke them dynamically
@@ -125,13 +194,11 @@ class TemplateConstraintChecker(ABC):
             print(f"The checker function for template {template.templ_str} has not been implemented yet.")
 
     def mpChoice(self) -> CheckerResult:
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation_time"]
         a_or_b_occurs = False
         for A in self.traces:
             if A[self.concept_name] == self.activities[0] or A[self.concept_name] == self.activities[1]:
-                locl = {'A': A, 'T': self.traces[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if activation_rules is None or activation_rules(A, self.traces[0]):
                     a_or_b_occurs = True
                     break
         state = None
@@ -146,17 +213,15 @@ class TemplateConstraintChecker(ABC):
                              state=state)
 
     def mpExclusiveChoice(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation_time"]
         a_occurs = False
         b_occurs = False
         for A in self.traces:
-            locl = {'A': A, 'T': self.traces[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
             if not a_occurs and A[self.concept_name] == self.activities[0]:
-                if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if activation_rules is None or activation_rules(A, self.traces[0]):
                     a_occurs = True
             if not b_occurs and A[self.concept_name] == self.activities[1]:
-                if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if activation_rules is None or activation_rules(A, self.traces[0]):
                     b_occurs = True
             if a_occurs and b_occurs:
                 break
@@ -179,13 +244,11 @@ class TemplateConstraintChecker(ABC):
         event a must occur at least n-times in the trace.
     """
     def mpExistence(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation_time"]
         num_activations = 0
         for A in self.traces:
             if A[self.concept_name] == self.activities[0]:
-                locl = {'A': A, 'T': self.traces[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if activation_rules is None or activation_rules(A, self.traces[0]):
                     num_activations += 1
         n = self.rules["n"]
         state = None
@@ -204,14 +267,12 @@ class TemplateConstraintChecker(ABC):
         event a may occur at most n − times in the trace.
     """
     def mpAbsence(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation_time"]
 
         num_activations = 0
         for A in self.traces:
             if A[self.concept_name] == self.activities[0]:
-                locl = {'A': A, 'T': self.traces[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if activation_rules is None or activation_rules(A, self.traces[0]):
                     num_activations += 1
 
         n = self.rules["n"]
@@ -232,12 +293,11 @@ class TemplateConstraintChecker(ABC):
         that event e is the first event that occurs in the trace.
     """
     def mpInit(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
+        activation_rules = self.rules["activation"]
 
         state = TraceState.VIOLATED
         if self.traces[0][self.concept_name] == self.activities[0]:
-            locl = {'A': self.traces[0]}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules(self.traces[0], None):
                 state = TraceState.SATISFIED
 
         return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
@@ -249,12 +309,11 @@ class TemplateConstraintChecker(ABC):
         that event e is the first event that occurs in the trace.
     """
     def mpEnd(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
+        activation_rules = self.rules["activation"]
 
         state = TraceState.VIOLATED
         if self.traces[-1][self.concept_name] == self.activities[0]:
-            locl = {'A': self.traces[-1]}
-            if eval(activation_rules, glob, locl):
+            if activation_rules is None or activation_rules(self.traces[-1], None):
                 state = TraceState.SATISFIED
 
         return CheckerResult(num_fulfillments=None, num_violations=None, num_pendings=None, num_activations=None,
@@ -264,13 +323,11 @@ class TemplateConstraintChecker(ABC):
         mp-exactly constraint checker
     """
     def mpExactly(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation_time"]
         num_activations = 0
         for A in self.traces:
             if A[self.concept_name] == self.activities[0]:
-                locl = {'A': A, 'T': self.traces[0], 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(activation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if activation_rules is None or activation_rules(A, self.traces[0]):
                     num_activations += 1
         n = self.rules["n"]
         state = None
@@ -293,9 +350,8 @@ class TemplateConstraintChecker(ABC):
     # then event b occurs in the trace as well.
     # Event a activates the constraint.
     def mpRespondedExistence(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         pendings = []
         num_fulfillments = 0
@@ -304,8 +360,7 @@ class TemplateConstraintChecker(ABC):
 
         for event in self.traces:
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     pendings.append(event)
 
         for event in self.traces:
@@ -313,11 +368,8 @@ class TemplateConstraintChecker(ABC):
                 break
 
             if event[self.concept_name] == self.activities[1]:
-                for A in reversed(pendings):
-                    locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        pendings.remove(A)
-                        num_fulfillments += 1
+                pendings, num_matched = self.match_pendings(pendings, event, correlation_rules)
+                num_fulfillments += num_matched
 
         if self.completed:
             num_violations = len(pendings)
@@ -346,9 +398,8 @@ class TemplateConstraintChecker(ABC):
                              num_pendings=num_pendings, num_activations=num_activations, state=state)
 
     def mpResponse(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         pendings = []
         num_fulfillments = 0
@@ -357,16 +408,12 @@ class TemplateConstraintChecker(ABC):
 
         for event in self.traces:
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     pendings.append(event)
 
             if pendings and event[self.concept_name] == self.activities[1]:
-                for A in reversed(pendings):
-                    locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        pendings.remove(A)
-                        num_fulfillments += 1
+                pendings, num_matched = self.match_pendings(pendings, event, correlation_rules)
+                num_fulfillments += num_matched
 
         if self.completed:
             num_violations = len(pendings)
@@ -401,9 +448,8 @@ class TemplateConstraintChecker(ABC):
     # before event a recurs.
     # Event a activates the constraint.
     def mpAlternateResponse(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         pending = None
         num_activations = 0
@@ -412,14 +458,12 @@ class TemplateConstraintChecker(ABC):
 
         for event in self.traces:
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     pending = event
                     num_activations += 1
 
             if event[self.concept_name] == self.activities[1] and pending is not None:
-                locl = {'A': pending, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                if correlation_rules is None or correlation_rules(pending, event):
                     pending = None
                     num_fulfillments += 1
 
@@ -454,9 +498,8 @@ class TemplateConstraintChecker(ABC):
         Returns:
 
         """
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         num_activations = 0
         num_fulfillments = 0
@@ -465,16 +508,12 @@ class TemplateConstraintChecker(ABC):
         for index, event in enumerate(self.traces):
 
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
 
                     if index < len(self.traces) - 1:
                         if self.traces[index + 1][self.concept_name] == self.activities[1]:
-                            locl = {'A': event, 'T': self.traces[index + 1], 'timedelta': timedelta, 'abs': abs,
-                                    'float': float}
-                            if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                            if correlation_rules is None or correlation_rules(event, self.traces[index + 1]):
                                 num_fulfillments += 1
                     else:
                         if not self.completed:
@@ -508,9 +547,8 @@ class TemplateConstraintChecker(ABC):
         Returns:
 
         """
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         num_activations = 0
         num_fulfillments = 0
@@ -521,14 +559,11 @@ class TemplateConstraintChecker(ABC):
                 Ts.append(event)
 
             if event[self.concept_name] == self.activities[1]:
-                locl = {'A': event}
-
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
 
                     for T in Ts:
-                        locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if correlation_rules is None or correlation_rules(event, T):
                             num_fulfillments += 1
                             break
 
@@ -558,9 +593,8 @@ class TemplateConstraintChecker(ABC):
         Returns:
 
         """
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         num_activations = 0
         num_fulfillments = 0
@@ -571,12 +605,10 @@ class TemplateConstraintChecker(ABC):
                 Ts.append(event)
 
             if event[self.concept_name] == self.activities[1]:
-                locl = {'A': event}
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
                     for T in Ts:
-                        locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if correlation_rules is None or correlation_rules(event, T):
                             num_fulfillments += 1
                             break
                     Ts = []
@@ -604,24 +636,19 @@ class TemplateConstraintChecker(ABC):
         Returns:
 
         """
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         num_activations = 0
         num_fulfillments = 0
 
         for index, event in enumerate(self.traces):
             if event[self.concept_name] == self.activities[1]:
-                locl = {'A': event}
-
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
 
                     if index != 0 and self.traces[index - 1][self.concept_name] == self.activities[0]:
-                        locl = {'A': event, 'T': self.traces[index - 1], 'timedelta': timedelta, 'abs': abs,
-                                'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if correlation_rules is None or correlation_rules(event, self.traces[index - 1]):
                             num_fulfillments += 1
 
         num_violations = num_activations - num_fulfillments
@@ -644,9 +671,8 @@ class TemplateConstraintChecker(ABC):
                              num_activations=num_activations, state=state)
 
     def mpNotRespondedExistence(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         pendings = []
         num_fulfillments = 0
@@ -655,8 +681,7 @@ class TemplateConstraintChecker(ABC):
 
         for event in self.traces:
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     pendings.append(event)
 
         for event in self.traces:
@@ -664,11 +689,8 @@ class TemplateConstraintChecker(ABC):
                 break
 
             if event[self.concept_name] == self.activities[1]:
-                for A in reversed(pendings):
-                    locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        pendings.remove(A)
-                        num_violations += 1
+                pendings, num_matched = self.match_pendings(pendings, event, correlation_rules)
+                num_violations += num_matched
 
         if self.completed:
             num_fulfillments = len(pendings)
@@ -695,9 +717,8 @@ class TemplateConstraintChecker(ABC):
                              num_pendings=num_pendings, num_activations=num_activations, state=state)
 
     def mpNotResponse(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         pendings = []
         num_fulfillments = 0
@@ -706,16 +727,12 @@ class TemplateConstraintChecker(ABC):
 
         for event in self.traces:
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     pendings.append(event)
 
             if pendings and event[self.concept_name] == self.activities[1]:
-                for A in reversed(pendings):
-                    locl = {'A': A, 'T': event, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                    if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
-                        pendings.remove(A)
-                        num_violations += 1
+                pendings, num_matched = self.match_pendings(pendings, event, correlation_rules)
+                num_violations += num_matched
 
         if self.completed:
             num_fulfillments = len(pendings)
@@ -742,9 +759,8 @@ class TemplateConstraintChecker(ABC):
                              num_pendings=num_pendings, num_activations=num_activations, state=state)
 
     def mpNotPrecedence(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
 
         num_activations = 0
         num_violations = 0
@@ -755,14 +771,11 @@ class TemplateConstraintChecker(ABC):
                 Ts.append(event)
 
             if event[self.concept_name] == self.activities[1]:
-                locl = {'A': event}
-
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
 
                     for T in Ts:
-                        locl = {'A': event, 'T': T, 'timedelta': timedelta, 'abs': abs, 'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if correlation_rules is None or correlation_rules(event, T):
                             num_violations += 1
                             break
 
@@ -786,24 +799,19 @@ class TemplateConstraintChecker(ABC):
                              num_activations=num_activations, state=state)
 
     def mpNotChainPrecedence(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
         num_activations = 0
         num_violations = 0
 
         for index, event in enumerate(self.traces):
 
             if event[self.concept_name] == self.activities[1]:
-                locl = {'A': event}
-
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
 
                     if index != 0 and self.traces[index - 1][self.concept_name] == self.activities[0]:
-                        locl = {'A': event, 'T': self.traces[index - 1], 'timedelta': timedelta, 'abs': abs,
-                                'float': float}
-                        if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                        if correlation_rules is None or correlation_rules(event, self.traces[index - 1]):
                             num_violations += 1
 
         num_fulfillments = num_activations - num_violations
@@ -826,9 +834,8 @@ class TemplateConstraintChecker(ABC):
                              num_activations=num_activations, state=state)
 
     def mpNotChainResponse(self):
-        activation_rules = self.declare_parser_utility.parse_data_cond(self.rules["activation"])
-        correlation_rules = self.declare_parser_utility.parse_data_cond(self.rules["correlation"])
-        time_rule = self.declare_parser_utility.parse_time_cond(self.rules["time"])
+        activation_rules = self.rules["activation"]
+        correlation_rules = self.rules["correlation_time"]
         num_activations = 0
         num_violations = 0
         num_pendings = 0
@@ -836,16 +843,12 @@ class TemplateConstraintChecker(ABC):
         for index, event in enumerate(self.traces):
 
             if event[self.concept_name] == self.activities[0]:
-                locl = {'A': event}
-
-                if eval(activation_rules, glob, locl):
+                if activation_rules is None or activation_rules(event, None):
                     num_activations += 1
 
                     if index < len(self.traces) - 1:
                         if self.traces[index + 1][self.concept_name] == self.activities[1]:
-                            locl = {'A': event, 'T': self.traces[index + 1], 'timedelta': timedelta, 'abs': abs,
-                                    'float': float}
-                            if eval(correlation_rules, glob, locl) and eval(time_rule, glob, locl):
+                            if correlation_rules is None or correlation_rules(event, self.traces[index + 1]):
                                 num_violations += 1
                     else:
                         if not self.completed:
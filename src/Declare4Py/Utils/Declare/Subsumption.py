@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.Declare4Py.ProcessModels.DeclareModel import DeclareModelTemplate
+
+"""
+Subsumption hierarchy of the Declare templates, used to plan the checks of a set of candidate constraints.
+"""
+
+# Pairs (stronger, weaker, swap): every trace satisfying stronger[a, b] satisfies weaker[a, b], or weaker[b, a] if swap.
+# The activation of the two constraints is the same activity, so the implication also holds without vacuity.
+SUBSUMPTIONS: List[Tuple[DeclareModelTemplate, DeclareModelTemplate, bool]] = [
+    (DeclareModelTemplate.CHAIN_RESPONSE, DeclareModelTemplate.ALTERNATE_RESPONSE, False),
+    (DeclareModelTemplate.ALTERNATE_RESPONSE, DeclareModelTemplate.RESPONSE, False),
+    (DeclareModelTemplate.RESPONSE, DeclareModelTemplate.RESPONDED_EXISTENCE, False),
+    (DeclareModelTemplate.CHAIN_PRECEDENCE, DeclareModelTemplate.ALTERNATE_PRECEDENCE, False),
+    (DeclareModelTemplate.ALTERNATE_PRECEDENCE, DeclareModelTemplate.PRECEDENCE, False),
+    (DeclareModelTemplate.PRECEDENCE, DeclareModelTemplate.RESPONDED_EXISTENCE, True),
+    (DeclareModelTemplate.EXCLUSIVE_CHOICE, DeclareModelTemplate.CHOICE, False),
+    (DeclareModelTemplate.NOT_RESPONDED_EXISTENCE, DeclareModelTemplate.NOT_RESPONSE, False),
+    (DeclareModelTemplate.NOT_RESPONSE, DeclareModelTemplate.NOT_CHAIN_RESPONSE, False),
+    (DeclareModelTemplate.NOT_PRECEDENCE, DeclareModelTemplate.NOT_CHAIN_PRECEDENCE, False),
+]
+
+ConstraintKey = Tuple[str, Optional[int], Tuple[str, ...]]
+
+
+class SubsumptionPlanner:
+    """
+    Plans the checks of a set of candidate constraints along the subsumption hierarchy of the Declare templates. Since
+    a trace satisfying Chain Response[a, b] also satisfies Alternate Response[a, b], Response[a, b] and Responded
+    Existence[a, b], the support of a constraint is at most the support of the constraints it implies: if a constraint
+    is supported, the constraints it implies are supported too, and if it is not, neither are the constraints implying
+    it. Each round proposes, among the related candidates still undecided, the one splitting them best, as in a binary
+    search along a chain of templates; the outcomes of the others are inferred when possible. The hierarchy also covers
+    the cardinalities of Existence, Absence and Exactly and Init and End, which imply Existence1. The conditions of a
+    constraint restrict its activations differently for each template, so the candidates with conditions are not
+    related to any other.
+
+    Args:
+        candidates: the candidate constraints, as in DeclareModel.constraints.
+    """
+
+    def __init__(self, candidates: List[dict]):
+        self.decisions: List[Optional[bool]] = [None] * len(candidates)
+        self.num_inferred: int = 0
+        self.weaker: List[List[int]] = [[] for _ in candidates]
+        self.stronger: List[List[int]] = [[] for _ in candidates]
+        keys: Dict[ConstraintKey, int] = {}
+        for idx, constraint in enumerate(candidates):
+            if not self.is_conditioned(constraint):
+                keys.setdefault(self.get_key(constraint), idx)
+        for idx, constraint in enumerate(candidates):
+            if self.is_conditioned(constraint):
+                continue
+            for key in self.get_weaker_keys(constraint):
+                weaker = keys.get(key)
+                if weaker is not None and weaker != idx:
+                    self.weaker[idx].append(weaker)
+                    self.stronger[weaker].append(idx)
+        # The transitive closures, and the groups of candidates related to each other
+        self.descendants: List[Set[int]] = [self._closure(idx, self.weaker) for idx in range(len(candidates))]
+        self.ancestors: List[Set[int]] = [self._closure(idx, self.stronger) for idx in range(len(candidates))]
+        self.groups: List[List[int]] = []
+        grouped = set()
+        for idx in range(len(candidates)):
+            if idx not in grouped:
+                group = sorted(self._closure(idx, self.weaker, self.stronger) | {idx})
+                grouped.update(group)
+                self.groups.append(group)
+
+    @staticmethod
+    def is_conditioned(constraint: dict) -> bool:
+        return any(condition and condition.strip() for condition in constraint.get('condition', ()))
+
+    @staticmethod
+    def get_key(constraint: dict) -> ConstraintKey:
+        return constraint['template'].templ_str, constraint.get('n'), tuple(constraint['activities'])
+
+    @staticmethod
+    def get_weaker_keys(constraint: dict) -> List[ConstraintKey]:
+        """
+        Returns the keys of the constraints directly implied by a constraint without conditions.
+        """
+        templ_str, n, activities = SubsumptionPlanner.get_key(constraint)
+        if constraint['template'].is_binary:
+            return [(weaker.templ_str, None, activities[::-1] if swap else activities)
+                    for stronger, weaker, swap in SUBSUMPTIONS if stronger.templ_str == templ_str]
+        existence, absence = DeclareModelTemplate.EXISTENCE.templ_str, DeclareModelTemplate.ABSENCE.templ_str
+        if templ_str in (DeclareModelTemplate.INIT.templ_str, DeclareModelTemplate.END.templ_str):
+            return [(existence, 1, activities)]
+        if n is None:
+            return []
+        if templ_str == existence:
+            return [(existence, n - 1, activities)] if n > 1 else []
+        if templ_str == absence:
+            return [(absence, n + 1, activities)]
+        if templ_str == DeclareModelTemplate.EXACTLY.templ_str:
+            return [(existence, n, activities), (absence, n + 1, activities)]
+        return []
+
+    @staticmethod
+    def _closure(idx: int, *adjacencies: List[List[int]]) -> Set[int]:
+        reached = set()
+        stack = [idx]
+        while stack:
+            current = stack.pop()
+            for adjacency in adjacencies:
+                for other in adjacency[current]:
+                    if other not in reached and other != idx:
+                        reached.add(other)
+                        stack.append(other)
+        return reached
+
+    def is_decided(self, idx: int) -> bool:
+        return self.decisions[idx] is not None
+
+    def decide(self, idx: int, supported: bool):
+        """
+        Records the outcome of the check of a candidate and infers the outcome of the undecided candidates implied by
+        it, if it is supported, or implying it otherwise.
+        """
+        self.decisions[idx] = supported
+        for other in self.descendants[idx] if supported else self.ancestors[idx]:
+            if self.decisions[other] is None:
+                self.decisions[other] = supported
+                self.num_inferred += 1
+
+    def get_round(self) -> List[int]:
+        """
+        Returns the candidates to check next, empty once every candidate is decided. Each group of related candidates
+        proposes its undecided candidate with the most undecided candidates both implying it and implied by it, so
+        that either outcome decides as many candidates as possible; a group whose undecided candidates are no longer
+        related proposes all of them.
+        """
+        candidates = []
+        for group in self.groups:
+            undecided = [idx for idx in group if self.decisions[idx] is None]
+            scores = []
+            for idx in undecided:
+                num_ancestors = sum(self.decisions[other] is None for other in self.ancestors[idx])
+                num_descendants = sum(self.decisions[other] is None for other in self.descendants[idx])
+                scores.append((min(num_ancestors, num_descendants), max(num_ancestors, num_descendants)))
+            if not scores or max(scores)[1] == 0:
+                candidates += undecided
+            else:
+                candidates.append(undecided[scores.index(max(scores))])
+        return sorted(candidates)
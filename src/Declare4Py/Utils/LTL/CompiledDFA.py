@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from functools import reduce
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+import numpy as np
+from pythomata.impl.symbolic import SymbolicAutomaton
+
+from src.Declare4Py.Utils.utils import Utils
+
+"""
+Compilation of the symbolic automata produced by logaut into explicit transition tables
+"""
+
+
+class CompiledDFA:
+    """
+    Explicit version of a (minimized) symbolic automaton over the alphabet of the concrete activities.
+
+    An event of a log makes true exactly one proposition, the one of its activity, so the guards of the automaton only
+    need to be evaluated once for each atom of the formula plus once for the "other activity" symbol, i.e. any activity
+    that does not appear in the formula. The sets of states reachable by the symbolic replay are determinized on
+    this finite alphabet, hence the table yields exactly the same verdicts as replaying the symbolic automaton.
+
+    Attributes:
+        backend: the backend that produced the automaton, it determines the case of the atoms.
+        symbols: the atoms of the formula, one column of the transition table each.
+        other_column: the column of the activities not appearing in the formula.
+        transitions: int32 matrix of shape (states, symbols + 1) with the successor of each state.
+        accepting: boolean array telling whether each state is accepting.
+        sink: boolean array telling whether each state is absorbing, i.e. every activity loops on it. Once a trace
+            reaches a sink state its verdict is decided and the rest of the trace can be skipped.
+        initial_state: the initial state, always 0.
+    """
+
+    def __init__(self, dfa: SymbolicAutomaton, backend: str = "lydia"):
+        self.backend: str = backend
+        atoms = set()
+        for state in dfa.states:
+            for _, guard, _ in dfa.get_transitions_from(state):
+                atoms.update(str(symbol) for symbol in guard.free_symbols)
+        self.symbols: List[str] = sorted(atoms)
+        self.symbol_columns: Dict[str, int] = {symbol: col for col, symbol in enumerate(self.symbols)}
+        self.other_column: int = len(self.symbols)
+        interpretations = [{symbol: True} for symbol in self.symbols] + [{}]
+
+        # Subset construction over the concrete alphabet, the empty set is the rejecting dead state
+        initial = frozenset({dfa.initial_state})
+        state_ids: Dict[FrozenSet[int], int] = {initial: 0}
+        frontier = [initial]
+        rows = []
+        while frontier:
+            current = frontier.pop(0)
+            row = []
+            for interpretation in interpretations:
+                successors = frozenset(reduce(set.union, (dfa.get_successors(x, interpretation) for x in current),
+                                              set()))
+                if successors not in state_ids:
+                    state_ids[successors] = len(state_ids)
+                    frontier.append(successors)
+                row.append(state_ids[successors])
+            rows.append(row)
+
+        self.transitions: np.ndarray = np.array(rows, dtype=np.int32)
+        self.accepting: np.ndarray = np.zeros(len(state_ids), dtype=bool)
+        for states, idx in state_ids.items():
+            self.accepting[idx] = any(dfa.is_accepting(state) for state in states)
+        self.sink: np.ndarray = (self.transitions == np.arange(len(state_ids))[:, None]).all(axis=1)
+        self.initial_state: int = 0
+
+    @property
+    def num_states(self) -> int:
+        return self.transitions.shape[0]
+
+    def symbol_of(self, activity: str) -> str:
+        """
+        Returns the proposition corresponding to an activity name, following the naming used by the LTL models.
+        """
+        symbol = Utils.parse_activity(activity)
+        return symbol.lower() if self.backend == 'lydia' else symbol.upper()
+
+    def column_of(self, activity: str) -> int:
+        return self.symbol_columns.get(self.symbol_of(activity), self.other_column)
+
+    def columns_of(self, activities: Sequence[str]) -> np.ndarray:
+        """
+        Maps a vocabulary of activities to the columns of the transition table.
+
+        Args:
+            activities: the vocabulary, e.g. all the distinct activities of a log.
+
+        Returns:
+            an int32 array such that position i contains the column of activities[i].
+        """
+        return np.fromiter((self.column_of(activity) for activity in activities), dtype=np.int32,
+                           count=len(activities))
+
+    def can_reach(self, targets: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean array telling, for each state, whether one of the target states is reachable from it with
+        zero or more events.
+        """
+        reach = np.asarray(targets, dtype=bool).copy()
+        while True:
+            extended = reach | reach[self.transitions].any(axis=1)
+            if (extended == reach).all():
+                return reach
+            reach = extended
+
+    def accepts(self, columns: Sequence[int]) -> bool:
+        """
+        Replays a single trace given as a sequence of columns of the transition table.
+        """
+        state = self.initial_state
+        transitions = self.transitions
+        sink = self.sink
+        for column in columns:
+            state = transitions[state, column]
+            if sink[state]:
+                break
+        return bool(self.accepting[state])
+
+    def accepts_activities(self, activities: Sequence[str]) -> bool:
+        return self.accepts([self.column_of(activity) for activity in activities])
+
+    def accepts_batch(self, columns: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """
+        Replays all the traces of an encoded log at once, advancing every trace of one event at each step.
+
+        Args:
+            columns: the columns of all the events of the log, trace after trace.
+            offsets: array of length traces + 1, the events of trace i are columns[offsets[i]:offsets[i + 1]].
+
+        Returns:
+            a boolean array with the verdict of each trace.
+        """
+        final_states, _ = self.replay_batch(self.transitions, self.initial_state, columns, offsets, self.sink)
+        return self.accepting[final_states]
+
+    @staticmethod
+    def stack(automata: Sequence[CompiledDFA], vocabulary: Sequence[str]):
+        """
+        Builds the transition table of the (disjoint) union of several automata over a common vocabulary of
+        activities, so that all of them can be advanced together by replay_batch.
+
+        Args:
+            automata: the compiled automata, one for each formula.
+            vocabulary: the activities of the log, the column i of the stacked table corresponds to vocabulary[i].
+
+        Returns:
+            the stacked transition table, the initial state of each automaton, the accepting and the sink flags of
+            the states.
+        """
+        tables = []
+        initial_states = np.zeros(len(automata), dtype=np.int32)
+        shift = 0
+        for idx, automaton in enumerate(automata):
+            tables.append(automaton.transitions[:, automaton.columns_of(vocabulary)] + shift)
+            initial_states[idx] = automaton.initial_state + shift
+            shift += automaton.num_states
+        transitions = np.vstack(tables).astype(np.int32) if tables else np.zeros((0, len(vocabulary)), dtype=np.int32)
+        accepting = np.concatenate([automaton.accepting for automaton in automata]) if automata \
+            else np.zeros(0, dtype=bool)
+        sink = np.concatenate([automaton.sink for automaton in automata]) if automata else np.zeros(0, dtype=bool)
+        return transitions, initial_states, accepting, sink
+
+    @staticmethod
+    def replay_batch(transitions: np.ndarray, initial_state, columns: np.ndarray, offsets: np.ndarray,
+                     sink: np.ndarray = None) -> Tuple[np.ndarray, int]:
+        """
+        Returns the state reached by each trace of an encoded log on the given transition table.
+
+        If initial_state is an array of initial states (see stack), every trace advances all of them at once and the
+        states are a matrix of shape (traces, automata). When the sink flags are given, a trace stops being replayed
+        as soon as all its automata are in a sink state.
+
+        Returns:
+            the final states and the number of events actually consumed by the replay.
+        """
+        offsets = np.asarray(offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        starts = offsets[:-1]
+        initial_state = np.asarray(initial_state, dtype=np.int32)
+        states = np.broadcast_to(initial_state, (len(lengths),) + initial_state.shape).copy()
+        active = lengths > 0
+        if sink is not None:
+            finished = sink[states]
+            active &= ~(finished.all(axis=1) if finished.ndim > 1 else finished)
+        active = np.flatnonzero(active)
+        step = 0
+        consumed = 0
+        while active.size:
+            step_columns = columns[starts[active] + step]
+            if states.ndim > 1:
+                step_columns = step_columns[:, None]
+            current = transitions[states[active], step_columns]
+            states[active] = current
+            consumed += active.size
+            step += 1
+            keep = lengths[active] > step
+            if sink is not None:
+                finished = sink[current]
+                keep &= ~(finished.all(axis=1) if finished.ndim > 1 else finished)
+            active = active[keep]
+        return states, consumed
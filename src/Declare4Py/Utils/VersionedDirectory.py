@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from typing import Optional
+
+"""
+Directories whose content is replaced atomically, e.g. the snapshots of the logs
+"""
+
+# File naming the current version of a directory
+POINTER_FILE = "CURRENT"
+
+
+class VersionedDirectory:
+    """
+    A directory whose content is written in a new version subdirectory each time, never modified afterwards, while the
+    file CURRENT names the current version. The pointer is switched with os.replace, so a reader resolving the current
+    version once reads either the whole previous content or the whole new one, and a path to a version always denotes
+    the same content. When a version is published the older ones are removed, except the previous one, which the
+    readers that resolved it just before may still be reading.
+    """
+
+    @staticmethod
+    def create_version(directory: str) -> str:
+        """
+        Creates and returns the subdirectory of a new version, to be filled and then published.
+        """
+        os.makedirs(directory, exist_ok=True)
+        # The names sort as the creation times
+        version_path = os.path.join(directory, f"v{time.time_ns():020d}-{os.getpid()}")
+        os.makedirs(version_path)
+        return version_path
+
+    @staticmethod
+    def publish(version_path: str) -> None:
+        """
+        Makes a version created with create_version the current one and removes the older ones, but the previous one.
+        """
+        directory, version = os.path.split(version_path)
+        tmp_path = os.path.join(directory, f"{POINTER_FILE}.tmp{os.getpid()}")
+        with open(tmp_path, "w") as pointer_file:
+            pointer_file.write(version)
+        os.replace(tmp_path, os.path.join(directory, POINTER_FILE))
+        # The versions newer than the published one may still be being written
+        older = sorted(name for name in os.listdir(directory)
+                       if name.startswith("v") and name < version and os.path.isdir(os.path.join(directory, name)))
+        for name in older[:-1]:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    @staticmethod
+    def discard(version_path: str) -> None:
+        """
+        Removes a version that was not published, e.g. because writing it failed.
+        """
+        shutil.rmtree(version_path, ignore_errors=True)
+
+    @staticmethod
+    def resolve(directory: str) -> Optional[str]:
+        """
+        Returns the path of the current version of a directory, None if it has no published version.
+        """
+        try:
+            with open(os.path.join(directory, POINTER_FILE)) as pointer_file:
+                version = pointer_file.read().strip()
+        except OSError:
+            return None
+        version_path = os.path.join(directory, version)
+        return version_path if version and os.path.isdir(version_path) else None
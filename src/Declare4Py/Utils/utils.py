@@ -1,9 +1,25 @@
 # Generic Utils
 # static methods
+import multiprocessing
 import re
 
 
 class Utils:
+    @staticmethod
+    def get_workers(jobs: int) -> int:
+        """
+        Translates the jobs parameter of the parallel tasks into a number of processes: 0 and 1 run sequentially,
+        -1 uses all the available CPUs.
+        """
+        if jobs == 1 or jobs == 0:
+            return 1
+        elif jobs == -1:
+            return multiprocessing.cpu_count()
+        elif jobs > 1:
+            return jobs
+        else:
+            raise RuntimeError(f"{jobs} not a valid number of jobs. Allowed values goes from -1.")
+
     @staticmethod
     def parse_activity(act: str) -> str:
         """
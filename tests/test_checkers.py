@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import pytest
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessModels.DeclareModel import DeclareModel, DeclareModelTemplate
+from src.Declare4Py.Utils.Declare.Checkers import ConstraintChecker
+from src.Declare4Py.Utils.Declare.IncrementalCheckers import INCREMENTAL_CHECKERS, SinglePassConstraintChecker
+
+"""
+Checks that SinglePassConstraintChecker gives the results of TemplateConstraintChecker, through
+ConstraintChecker.check_trace_conformance, for every template it checks
+"""
+
+TRACES = [["a"], ["b"], ["c"], ["a", "b"], ["b", "a"], ["a", "a", "b"], ["a", "b", "a"], ["a", "c", "b", "a"],
+          ["b", "b", "a", "c", "a"], ["c", "a", "a", "a"]]
+
+TEMPLATES = [DeclareModelTemplate.get_template_from_string(template_str) for template_str in INCREMENTAL_CHECKERS]
+
+# The activation and correlation conditions of the constraints with conditions, checked on the events
+CONDITIONS = {False: ("", ""), True: ("A.cost > 1", "T.cost >= A.cost")}
+
+
+def build_trace(activities):
+    return [{"concept:name": activity, "cost": position % 3} for position, activity in enumerate(activities)]
+
+
+def build_model(with_conditions: bool) -> DeclareModel:
+    activation, correlation = CONDITIONS[with_conditions]
+    model = DeclareModel()
+    for template in TEMPLATES:
+        if not template.is_binary:
+            for n in range(1, 4) if template.supports_cardinality else [None]:
+                constraint = {"template": template, "activities": ["a"], "condition": (activation, "")}
+                if n is not None:
+                    constraint["n"] = n
+                model.constraints.append(constraint)
+        else:
+            # a == b included
+            for activities in (["a", "b"], ["b", "a"], ["a", "a"], ["a", "d"]):
+                model.constraints.append({"template": template, "activities": activities,
+                                          "condition": (activation, correlation, "")})
+    model.set_constraints()
+    return model
+
+
+def as_tuple(result):
+    return (result.state, result.num_activations, result.num_fulfillments, result.num_violations,
+            result.num_pendings)
+
+
+@pytest.mark.parametrize("consider_vacuity", [False, True])
+@pytest.mark.parametrize("with_conditions", [False, True])
+@pytest.mark.parametrize("with_positions", [False, True])
+def test_single_pass_matches_template_checker(consider_vacuity, with_conditions, with_positions):
+    model = build_model(with_conditions)
+    compiled_rules = ConstraintChecker.compile_model(model, consider_vacuity)
+    checker = SinglePassConstraintChecker(model, consider_vacuity, "concept:name", compiled_rules)
+    for activities in TRACES:
+        trace = build_trace(activities)
+        positions = D4PyEventLog.index_activity_positions(activities) if with_positions else None
+        expected = ConstraintChecker.check_trace_conformance(trace, model, consider_vacuity, "concept:name",
+                                                             compiled_rules)
+        results = checker.check_trace_conformance(trace, positions)
+        assert len(results) == len(expected)
+        for constraint_str, result, expected_result in zip(model.serialized_constraints, results, expected):
+            assert as_tuple(result) == as_tuple(expected_result), f"{constraint_str} on {activities}"
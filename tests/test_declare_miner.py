@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from pm4py.objects.log.obj import Event, EventLog, Trace
+
+from src.Declare4Py.D4PyEventLog import D4PyEventLog
+from src.Declare4Py.ProcessMiningTasks.Discovery.DeclareMiner import DeclareMiner
+from src.Declare4Py.Utils.Declare.Checkers import ConstraintChecker
+
+"""
+Checks that the discovery of DeclareMiner, in parallel or updated with new traces, gives the model of the sequential
+check of every candidate constraint
+"""
+
+VARIANTS = [["a", "b", "c"], ["a", "c", "b"], ["a", "b"], ["b", "a", "c"], ["a", "a", "b", "c"], ["c"],
+            ["a", "b", "c", "d"], ["d", "a", "b"]]
+TRACES = [VARIANTS[(idx * 5) % len(VARIANTS)] for idx in range(24)]
+PARAMS = {"min_support": 0.5, "itemsets_support": 0.3}
+
+
+def build_traces(variants, first_case: int = 0):
+    start = datetime(2024, 1, 1)
+    traces = []
+    for case, activities in enumerate(variants, first_case):
+        events = [Event({"concept:name": activity, "time:timestamp": start + timedelta(hours=position)})
+                  for position, activity in enumerate(activities)]
+        traces.append(Trace(events, attributes={"concept:name": str(case)}))
+    return traces
+
+
+def build_log(variants) -> D4PyEventLog:
+    log = EventLog(build_traces(variants), properties={"pm4py:param:activity_key": "concept:name",
+                                                       "pm4py:param:timestamp_key": "time:timestamp"})
+    return D4PyEventLog(log=log)
+
+
+def get_model(miner: DeclareMiner):
+    return list(miner.process_model.serialized_constraints)
+
+
+@pytest.mark.parametrize("consider_vacuity", [False, True])
+def test_run_matches_checking_every_candidate(consider_vacuity):
+    miner = DeclareMiner(build_log(TRACES), consider_vacuity, **PARAMS)
+    miner.run()
+    checker = ConstraintChecker()
+    expected = DeclareMiner(build_log(TRACES), consider_vacuity, **PARAMS)
+    expected.set_model([constraint for constraint in expected.get_candidates(expected.get_frequent_item_sets())
+                        if checker.constraint_checking_with_support(constraint, expected.event_log, consider_vacuity,
+                                                                    PARAMS["min_support"])])
+    assert get_model(miner)
+    assert get_model(miner) == get_model(expected)
+
+
+@pytest.mark.parametrize("consider_vacuity", [False, True])
+def test_parallel_run_matches_run(consider_vacuity):
+    miner = DeclareMiner(build_log(TRACES), consider_vacuity, **PARAMS)
+    miner.run()
+    parallel_miner = DeclareMiner(build_log(TRACES), consider_vacuity, **PARAMS)
+    parallel_miner.run(jobs=2)
+    assert get_model(parallel_miner) == get_model(miner)
+
+
+@pytest.mark.parametrize("consider_vacuity", [False, True])
+@pytest.mark.parametrize("first", [6, 12, 18])
+def test_update_matches_run_on_concatenated_log(consider_vacuity, first):
+    miner = DeclareMiner(build_log(TRACES[:first]), consider_vacuity, **PARAMS)
+    miner.run()
+    miner.update(build_traces(TRACES[first:], first))
+    full_miner = DeclareMiner(build_log(TRACES), consider_vacuity, **PARAMS)
+    full_miner.run()
+    assert list(miner.process_model.activities) == list(full_miner.process_model.activities)
+    assert get_model(miner) == get_model(full_miner)
+
+
+def test_update_after_load_matches_run(tmp_path):
+    miner = DeclareMiner(build_log(TRACES[:12]), False, **PARAMS)
+    miner.run()
+    miner.save(str(tmp_path / "miner"))
+    miner = DeclareMiner.load(str(tmp_path / "miner"))
+    miner.update(build_traces(TRACES[12:], 12))
+    full_miner = DeclareMiner(build_log(TRACES), False, **PARAMS)
+    full_miner.run()
+    assert get_model(miner) == get_model(full_miner)